@@ -21,7 +21,6 @@ from google.adk.auth import AuthCredentialTypes
 from google.adk.auth import OAuth2Auth
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 
 """
 This agent works with agent-engine using the Dev UI and handles its own oauth. 
@@ -45,6 +44,7 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from config.settings import load_settings
+from tools.whoami import session_identity
 settings = load_settings()
 
 SCOPES = [
@@ -74,19 +74,9 @@ def whoami(callback_context: CallbackContext):
         creds = Credentials.from_authorized_user_info(
             callback_context.state["calendar_tool_tokens"], SCOPES
         )
-        user_info_service = build('oauth2', 'v2', credentials=creds)
-        user_info = user_info_service.userinfo().get().execute()
-        user_email = user_info.get('email')
-        callback_context.state['_user_email'] = user_email
-
-        calendar_service = build('calendar', 'v3', credentials=creds)
-        # Get the user's primary calendar to find their timezone
-        calendar_list_entry = calendar_service.calendarList().get(
-            calendarId='primary').execute()
-        user_timezone = calendar_list_entry.get('timeZone')
-        callback_context.state['_user_tz'] = user_timezone
-
-        print(f"User's primary calendar timezone: {user_timezone}")
+        # Email and primary calendar timezone; resolved once per session token, not every turn
+        identity = session_identity(callback_context.state, creds)
+        print(f"User's primary calendar timezone: {identity.timezone}")
 
 
 def prereq_setup(callback_context: CallbackContext):
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Set
+
+from tools.similarity import STOPWORDS
+
+
+# Rough average for English prose with Gemini's tokenizer; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+_TERM_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_NORMALIZE_RE = re.compile(r"[\W_]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (no tokenizer round-trip)."""
+    if not text:
+        return 0
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def terms(text: str) -> Set[str]:
+    return {t for t in _TERM_RE.findall(text.lower()) if len(t) > 2 and t not in STOPWORDS}
+
+
+@dataclass
+class ContextItem:
+    """One source for a prompt: a document or a chat message."""
+    label: str
+    text: str
+    relevance: float = 1.0
+    header: str = ""
+
+
+@dataclass
+class PackedItem:
+    item: ContextItem
+    chunks: List[str] = field(default_factory=list)
+    tokens: int = 0
+    truncated: bool = False
+
+    def render(self, separator: str = "\n[...]\n") -> str:
+        return separator.join(self.chunks)
+
+
+@dataclass
+class _Chunk:
+    item_index: int
+    position: int
+    text: str
+    tokens: int
+    score: float
+
+
+def split_passages(text: str, max_tokens: int = 200) -> List[str]:
+    """
+    Split text into passages of at most ~max_tokens, preferring paragraph and line
+    boundaries, then sentence boundaries, and finally hard character windows.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    passages: List[str] = []
+    current = ""
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            if current:
+                passages.append(current)
+                current = ""
+            continue
+        pieces = [line]
+        if len(line) > max_chars:
+            pieces = [s for s in _SENTENCE_RE.split(line) if s]
+        for piece in pieces:
+            while len(piece) > max_chars:
+                if current:
+                    passages.append(current)
+                    current = ""
+                passages.append(piece[:max_chars])
+                piece = piece[max_chars:]
+            if current and len(current) + len(piece) + 1 > max_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+
+def _fingerprint(text: str) -> str:
+    normalized = _NORMALIZE_RE.sub(" ", text.lower()).strip()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _score_passage(passage: str, query_terms: Set[str], position: int) -> float:
+    passage_terms = terms(passage)
+    if not passage_terms:
+        return 0.0
+    overlap = len(query_terms & passage_terms)
+    # Normalise by length so long passages do not win just by containing more words;
+    # the opening passage usually carries the title/summary, so it gets a small bonus.
+    score = overlap / math.sqrt(len(passage_terms))
+    if position == 0:
+        score += 0.25
+    return score + 0.01 / (1 + position)
+
+
+def pack_context(items: Iterable[ContextItem], query: str, token_budget: int,
+                 chunk_tokens: int = 200, query_terms: Optional[Set[str]] = None) -> List[PackedItem]:
+    """
+    Choose the most relevant passages from `items` so the total stays within token_budget.
+
+    Each item first gets a share of the budget proportional to its relevance and fills it
+    with its best-scoring passages; whatever budget is left goes to the best remaining
+    passages overall. Passages repeated across items (quoted replies, copied sections) are
+    kept only once. Chosen passages are returned in their original order per item.
+    """
+    items = list(items)
+    query_terms = query_terms if query_terms is not None else terms(query)
+    packed = [PackedItem(item=item) for item in items]
+    if not items or token_budget <= 0:
+        return packed
+
+    remaining = token_budget
+    seen: Set[str] = set()
+    per_item: List[List[_Chunk]] = []
+    for index, item in enumerate(items):
+        header_tokens = estimate_tokens(item.header)
+        packed[index].tokens = header_tokens
+        remaining -= header_tokens
+        chunks = []
+        for position, passage in enumerate(split_passages(item.text, chunk_tokens)):
+            fp = _fingerprint(passage)
+            if fp in seen:
+                continue
+            seen.add(fp)
+            score = _score_passage(passage, query_terms, position) * max(item.relevance, 0.01)
+            chunks.append(_Chunk(index, position, passage, estimate_tokens(passage), score))
+        per_item.append(chunks)
+
+    chosen: Set[tuple] = set()
+
+    def take(chunk: _Chunk) -> bool:
+        nonlocal remaining
+        if chunk.tokens > remaining:
+            return False
+        chosen.add((chunk.item_index, chunk.position))
+        packed[chunk.item_index].tokens += chunk.tokens
+        remaining -= chunk.tokens
+        return True
+
+    # Pass 1: relevance-proportional quotas per item
+    total_relevance = sum(max(item.relevance, 0.01) for item in items)
+    budget_for_chunks = max(remaining, 0)
+    for index, chunks in enumerate(per_item):
+        quota = budget_for_chunks * max(items[index].relevance, 0.01) / total_relevance
+        used = 0
+        for chunk in sorted(chunks, key=lambda c: c.score, reverse=True):
+            if used + chunk.tokens <= quota and take(chunk):
+                used += chunk.tokens
+
+    # Pass 2: spend what is left on the best remaining passages overall
+    leftovers = [c for chunks in per_item for c in chunks if (c.item_index, c.position) not in chosen]
+    for chunk in sorted(leftovers, key=lambda c: c.score, reverse=True):
+        if remaining <= 0:
+            break
+        take(chunk)
+
+    for index, chunks in enumerate(per_item):
+        kept = [c for c in chunks if (c.item_index, c.position) in chosen]
+        packed[index].chunks = [c.text for c in sorted(kept, key=lambda c: c.position)]
+        packed[index].truncated = len(kept) < len(chunks)
+    return packed
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import hashlib
+import heapq
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# SimHash fingerprints within this many differing bits count as the same document
+MAX_HAMMING_DISTANCE = 3
+# 4 bands of 16 bits: two fingerprints within 3 bits must agree exactly on at least one band
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+# Bottom-k sample of shingle hashes; near-duplicates share most of their smallest hashes
+_MAX_SHINGLES = 2048
+_MIN_CONTENT_WORDS = 20
+# Bucket members compared per item; keeps pathological buckets (many identical files) linear
+_MAX_BUCKET_PROBES = 8
+
+_EXTENSION_RE = re.compile(r"\.[a-z0-9]{1,5}$")
+_COPY_PREFIX_RE = re.compile(r"^(copy of\s+)+")
+_VERSION_MARKERS_RE = re.compile(
+    r"\(\d+\)|\bv\d+(?:\.\d+)*\b|\brev\d*\b|\b(?:final|draft|latest|updated|revised|copy|clean)\b"
+)
+_SEPARATORS_RE = re.compile(r"[\s_\-.,()\[\]]+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_name(name: str) -> str:
+    """'Copy of Q3 Plan v2 FINAL (1).pptx' -> 'q3 plan'"""
+    normalized = _EXTENSION_RE.sub("", name.lower().strip())
+    normalized = _COPY_PREFIX_RE.sub("", normalized)
+    normalized = _VERSION_MARKERS_RE.sub(" ", normalized)
+    return _SEPARATORS_RE.sub(" ", normalized).strip()
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over word 3-shingles; None when there is too little text to compare."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < _MIN_CONTENT_WORDS:
+        return None
+    hashes = {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + 3]).encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(len(words) - 2)
+    }
+    sample = heapq.nsmallest(_MAX_SHINGLES, hashes)
+    fingerprint = 0
+    half = len(sample) / 2
+    for bit in range(64):
+        mask = 1 << bit
+        if sum(1 for h in sample if h & mask) > half:
+            fingerprint |= mask
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+@dataclass
+class Cluster(Generic[T]):
+    representative: T
+    duplicates: List[T]
+
+
+def cluster_near_duplicates(
+    items: Sequence[T],
+    name: Callable[[T], str],
+    text: Callable[[T], str],
+    prefer: Callable[[T], tuple],
+    identity: Optional[Callable[[T], str]] = None,
+    scope: Optional[Callable[[T], str]] = None,
+) -> List[Cluster[T]]:
+    """
+    Group items that are the same document and keep the best one of each group.
+
+    Items are merged when they share an identity (e.g. a file id) or have SimHash
+    fingerprints within MAX_HAMMING_DISTANCE. A shared normalised name alone is not
+    enough, since generic names ("Agenda", "Notes") are common: same-name items merge
+    when their fingerprints agree, or, when one has no content yet, only within the same
+    non-empty scope (e.g. the owner's address). Candidate pairs come from hash buckets
+    (LSH banding for fingerprints), so the cost is linear in the number of items.
+    The representative is the item with the highest prefer() key; clusters keep the
+    order of their first member.
+    """
+    count = len(items)
+    uf = _UnionFind(count)
+    fingerprints = [simhash(text(item) or "") for item in items]
+
+    def compatible(a: int, b: int) -> bool:
+        return hamming_distance(fingerprints[a], fingerprints[b]) <= MAX_HAMMING_DISTANCE
+
+    if identity is not None:
+        first_by_id: Dict[str, int] = {}
+        for index, item in enumerate(items):
+            key = identity(item)
+            if key:
+                uf.union(first_by_id.setdefault(key, index), index)
+
+    by_name: Dict[str, List[int]] = defaultdict(list)
+    for index, item in enumerate(items):
+        key = normalize_name(name(item) or "")
+        if len(key) >= 3:
+            by_name[key].append(index)
+    for members in by_name.values():
+        # Check content against one fingerprinted member rather than every pair
+        anchor = next((m for m in members if fingerprints[m] is not None), None)
+        # Items without content join a same-scope member, preferring one with content, so
+        # they never bridge two fingerprinted items whose content disagrees
+        scope_anchor: Dict[str, int] = {}
+        for index in members:
+            key = scope(items[index]) if scope is not None else ""
+            if key and (key not in scope_anchor or
+                        fingerprints[scope_anchor[key]] is None and fingerprints[index] is not None):
+                scope_anchor[key] = index
+        for index in members:
+            if fingerprints[index] is not None:
+                if anchor is not None and index != anchor and compatible(anchor, index):
+                    uf.union(anchor, index)
+                continue
+            key = scope(items[index]) if scope is not None else ""
+            if key and scope_anchor[key] != index:
+                uf.union(scope_anchor[key], index)
+
+    buckets: Dict[tuple, List[int]] = defaultdict(list)
+    for index, fp in enumerate(fingerprints):
+        if fp is None:
+            continue
+        for band in range(_BANDS):
+            key = (band, (fp >> (band * _BAND_BITS)) & ((1 << _BAND_BITS) - 1))
+            for other in buckets[key][-_MAX_BUCKET_PROBES:]:
+                if uf.find(other) != uf.find(index) and compatible(other, index):
+                    uf.union(other, index)
+            buckets[key].append(index)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for index in range(count):
+        groups[uf.find(index)].append(index)
+
+    clusters = []
+    for root in sorted(groups):
+        members = [items[i] for i in groups[root]]
+        best = max(members, key=prefer)
+        clusters.append(Cluster(best, [m for m in members if m is not best]))
+    return clusters
@@ -1,34 +1,89 @@
 from __future__ import annotations
 
+import base64
 import os
-from datetime import datetime
-from typing import List, Dict
-from dotenv import load_dotenv
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parseaddr
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-import vertexai
-from vertexai.preview import reasoning_engines
-from vertexai import agent_engines
+from dotenv import load_dotenv
 
-from google.adk.agents import LlmAgent
-from google.adk.tools.tool_context import ToolContext
-from google.adk.agents.callback_context import CallbackContext
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from agents.context_packing import ContextItem, pack_context
+from agents.dedupe import cluster_near_duplicates
+from agents.pipeline import Pipeline, PipelineResult
+from tools.similarity import cosine_similarities
+from config.settings import Settings, load_settings
+from tools.document_extract import DocumentExtractionError, get_cached_text, get_document_text, is_extractable
+from tools.drive_content import download_bytes, download_text
+from tools.calendar_event import EventContext
+from tools.multi_calendar import list_events
+from tools.whoami import resolve_identity, session_identity, token_fingerprint
+
+if TYPE_CHECKING:
+    # Only needed for annotations; the ADK, Vertex AI and the Google API client
+    # are imported lazily so that importing this module stays cheap on cold start.
+    from google.adk.agents import LlmAgent
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.tools.tool_context import ToolContext
+    from google.oauth2.credentials import Credentials
 
 # Load environment variables from .env file (follow sample pattern)
 load_dotenv()
 
 print("loading .env")
 
-# Import centralized settings
-from config.settings import load_settings
+_settings: Optional[Settings] = None
+_gemini_model = None
+_agents: Dict[str, Any] = {}
+
+_SETTINGS_ATTRS = (
+    "google_cloud_project",
+    "google_cloud_location",
+    "staging_bucket",
+    "auth_id",
+    "agent_display_name",
+)
+
+
+def get_settings() -> Settings:
+    """Load settings on first use instead of at import time."""
+    global _settings
+    if _settings is None:
+        _settings = load_settings()
+    return _settings
+
+
+def __getattr__(name: str) -> Any:
+    # PEP 562: keep the historical module attributes (settings, auth_id, root_agent, ...)
+    # available while deferring their construction until something asks for them.
+    if name == "settings":
+        return get_settings()
+    if name in _SETTINGS_ATTRS:
+        return getattr(get_settings(), name)
+    if name in ("root_agent", "prepare_brief", "calendar_lookup"):
+        return _build_agents()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-settings = load_settings()
-google_cloud_project = settings.google_cloud_project
-google_cloud_location = settings.google_cloud_location
-staging_bucket = settings.staging_bucket
-auth_id = settings.auth_id
-agent_display_name = settings.agent_display_name
+
+def _build_service(api: str, version: str, creds: Credentials):
+    from agents.oauth_util import build_google_service
+
+    return build_google_service(api, version, creds)
+
+
+def _get_gemini_model():
+    """Initialise Vertex AI and the Gemini model once per process."""
+    global _gemini_model
+    if _gemini_model is None:
+        import vertexai
+        from vertexai.generative_models import GenerativeModel
+
+        settings = get_settings()
+        vertexai.init(project=settings.google_cloud_project, location=settings.google_cloud_location)
+        _gemini_model = GenerativeModel("gemini-2.5-flash")
+    return _gemini_model
 
 
 def current_datetime(callback_context: CallbackContext):
@@ -39,543 +94,769 @@ def current_datetime(callback_context: CallbackContext):
 
 
 def whoami(callback_context: CallbackContext, creds):
-    user_info_service = build('oauth2', 'v2', credentials=creds)
-    user_info = user_info_service.userinfo().get().execute()
-    user_email = user_info.get('email')
-    callback_context.state['_user_email'] = user_email
-
-    calendar_service = build('calendar', 'v3', credentials=creds)
-    # Get the user's primary calendar to find their timezone
-    calendar_list_entry = calendar_service.calendarList().get(
-        calendarId='primary').execute()
-    user_timezone = calendar_list_entry.get('timeZone')
-    callback_context.state['_user_tz'] = user_timezone
-
-    print(f"User's primary calendar timezone: {user_timezone}")
+    # Email and primary calendar timezone; resolved once per session token, not every turn
+    identity = session_identity(
+        callback_context.state, creds, service_factory=lambda api, version: _build_service(api, version, creds)
+    )
+    print(f"User's primary calendar timezone: {identity.timezone}")
 
 
 def prereq_setup(callback_context: CallbackContext):
+    from google.oauth2.credentials import Credentials
+
     print("**** PREREQ SETUP ****")
-    access_token = callback_context.state[f"temp:{auth_id}"]
+    access_token = callback_context.state[f"temp:{get_settings().auth_id}"]
     creds = Credentials(token=access_token)
     current_datetime(callback_context)
     whoami(callback_context, creds)
 
 
-# Tool: prepare_meeting_brief (wraps our internal utilities)
-def prepare_meeting_brief(tool_context: ToolContext):
-    # Enhanced implementation with attachment processing and Gemini research
-    from datetime import datetime, timedelta, timezone
-    from dataclasses import dataclass
-    from typing import List, Optional, Dict, Any
-    from googleapiclient.discovery import build
-    from google.oauth2.credentials import Credentials
-    import re
-    import vertexai
-    from vertexai.generative_models import GenerativeModel
+# Words that carry no signal when matching meeting titles against documents
+_COMMON_WORDS = frozenset({'meeting', 'call', 'sync', 'review', 'discussion', 'update', 'status', 'weekly', 'daily', 'monthly', 'team', 'project', 'with', 'for', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'from', 'by', 'about', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'up', 'down', 'out', 'off', 'over', 'under', 'again', 'further', 'then', 'once'})
+
+_WORD_RE = re.compile(r'\b\w+\b')
+_DRIVE_FILE_ID_RE = re.compile(r"/file/d/([a-zA-Z0-9-_]+)")
+_DRIVE_URL_RE = re.compile(r"https://drive\.google\.com/[^\s]+")
+
+# Gmail caps batch requests at 100 calls; keep well below to avoid rate-limit errors
+_GMAIL_BATCH_SIZE = 20
+
+_CONTENT_PLACEHOLDER_MARKERS = ("Content preview not available", "Content could not be extracted",
+                                "File too large for content extraction", "No extractable text found",
+                                "Error accessing")
+
+
+@dataclass
+class DriveDocument:
+    id: str
+    name: str
+    link: str
+    content: str = ""
+    mime_type: str = ""
+    source: str = "drive"  # "drive", "gmail", "attachment"
+    relevance_score: float = 0.0
+    last_modified: str = ""
+    size: str = ""
+    owner: str = ""
+    # Drive owner's or Gmail sender's address: the evidence same-name copies without content merge on
+    owner_email: str = ""
+    # Gmail attachments only: where to fetch the body from
+    message_id: str = ""
+    attachment_id: str = ""
+    part_id: str = ""
+    # Drive file version the content was read from (keys the local full-text index)
+    revision: str = ""
+    # Near-identical copies (other versions, re-sent attachments) folded into this entry
+    duplicate_count: int = 0
+
+
+@dataclass
+class GmailAttachment:
+    filename: str
+    mime_type: str
+    size: int
+    attachment_id: str
+    message_id: str
+    part_id: str = ""
+
+
+def _extract_drive_file_ids(event: EventContext) -> List[str]:
+    """Extract Google Drive file IDs from event attachments and description"""
+    file_ids = []
     
-    @dataclass
-    class EventAttendee:
-        email: str
-        response_status: Optional[str] = None
-
-    @dataclass
-    class EventContext:
-        id: str
-        summary: str
-        description: str
-        start_iso: str
-        end_iso: str
-        attendees: List[EventAttendee]
-        recurring_event_id: Optional[str] = None
-        html_link: Optional[str] = None
-        location: Optional[str] = None
-        attachments: List[Dict] = None
-    
-    @dataclass
-    class DriveDocument:
-        id: str
-        name: str
-        link: str
-        content: str = ""
-        mime_type: str = ""
-        source: str = "drive"  # "drive", "gmail", "attachment"
-        relevance_score: float = 0.0
-        last_modified: str = ""
-        size: str = ""
-        owner: str = ""
+    # From attachments
+    for att in event.attachments:
+        file_id = att.get("fileId")
+        if file_id:
+            file_ids.append(file_id)
+        # Also try to extract from fileUrl
+        file_url = att.get("fileUrl", "")
+        if file_url:
+            match = _DRIVE_FILE_ID_RE.search(file_url)
+            if match:
+                file_ids.append(match.group(1))
     
-    @dataclass
-    class GmailAttachment:
-        filename: str
-        mime_type: str
-        size: int
-        attachment_id: str
-        message_id: str
+    # From description URLs
+    drive_urls = _DRIVE_URL_RE.findall(event.description)
+    for url in drive_urls:
+        match = _DRIVE_FILE_ID_RE.search(url)
+        if match:
+            file_ids.append(match.group(1))
     
-    def _to_iso(dt_str: str) -> str:
-        try:
-            return datetime.fromisoformat(dt_str.replace("Z", "+00:00")).astimezone(timezone.utc).isoformat()
-        except Exception:
-            return dt_str
-    
-    def _extract_drive_file_ids(event_data: Dict) -> List[str]:
-        """Extract Google Drive file IDs from event attachments and description"""
-        file_ids = []
+    return list(set(file_ids))  # Remove duplicates
+
+
+def _indexed_drive_documents(index, meeting_title: str, keywords: List[str], attendee_emails: List[str]) -> List[DriveDocument]:
+    """Name and owner matches from the local Drive index, in the order the live queries would find them"""
+    found = index.search_names([meeting_title]) + index.search_names(keywords[:5]) + index.search_owners(attendee_emails[:3])
+    docs, seen = [], set()
+    for f in found:
+        if f.id not in seen:
+            seen.add(f.id)
+            docs.append(DriveDocument(id=f.id, name=f.name or 'Unknown', link=f.link, mime_type=f.mime_type,
+                                      last_modified=f.modified_time, owner=f.owner,
+                                      owner_email=f.owner_emails[0] if f.owner_emails else ""))
+    return docs
+
+
+def _fulltext_documents(fulltext, index, terms: List[str]) -> List[DriveDocument]:
+    """
+    Content matches from the local full-text index, text included. Drive files the metadata
+    index knows were deleted are dropped; ones changed since they were indexed are returned
+    without content so it is read again. Without the metadata index (still seeding or off)
+    Drive hits cannot be checked for deletion or lost access, so only Gmail hits are kept.
+    """
+    docs = []
+    for hit in fulltext.search(terms):
+        content, owner_email = hit.body, ""
+        if hit.source != "gmail":
+            current = index.get(hit.doc_id) if index is not None else None
+            if current is None:
+                continue
+            if current.modified_time != hit.last_modified:
+                content = ""
+            owner_email = current.owner_emails[0] if current.owner_emails else ""
+        docs.append(DriveDocument(id=hit.doc_id, name=hit.title, link=hit.link, content=content, mime_type=hit.mime_type,
+                                  source=hit.source, last_modified=hit.last_modified, message_id=hit.message_id,
+                                  part_id=hit.part_id, revision=hit.revision,
+                                  owner="Gmail" if hit.source == "gmail" else "", owner_email=owner_email))
+    return docs
+
+
+def _search_related_drive_documents(drive_service, meeting_title: str, attendee_emails: List[str], description: str = "",
+                                    index=None, fulltext=None) -> List[DriveDocument]:
+    """
+    Search Google Drive for documents related to the meeting. With a local Drive index,
+    name and owner matches come from it; with a local full-text index, so do content
+    matches among documents already read. Drive fullText queries then only run when the
+    local indexes found fewer than 10 documents.
+    """
+    try:
+        related_docs = []
         
-        # From attachments
-        attachments = event_data.get("attachments", [])
-        for att in attachments:
-            file_id = att.get("fileId")
-            if file_id:
-                file_ids.append(file_id)
-            # Also try to extract from fileUrl
-            file_url = att.get("fileUrl", "")
-            if file_url:
-                match = re.search(r"/file/d/([a-zA-Z0-9-_]+)", file_url)
-                if match:
-                    file_ids.append(match.group(1))
+        # Extract keywords from meeting title and description
+        keywords = []
+        if meeting_title:
+            # Split title into meaningful words
+            title_words = _WORD_RE.findall(meeting_title.lower())
+            keywords.extend([word for word in title_words if len(word) > 3])
         
-        # From description URLs
-        description = event_data.get("description", "") or ""
-        drive_urls = re.findall(r"https://drive\.google\.com/[^\s]+", description)
-        for url in drive_urls:
-            match = re.search(r"/file/d/([a-zA-Z0-9-_]+)", url)
-            if match:
-                file_ids.append(match.group(1))
+        if description:
+            desc_words = _WORD_RE.findall(description.lower())
+            keywords.extend([word for word in desc_words if len(word) > 3])
         
-        return list(set(file_ids))  # Remove duplicates
-    
-    def _search_related_drive_documents(drive_service, meeting_title: str, attendee_emails: List[str], description: str = "") -> List[DriveDocument]:
-        """Search Google Drive for documents related to the meeting"""
-        try:
-            related_docs = []
-            
-            # Extract keywords from meeting title and description
-            keywords = []
-            if meeting_title:
-                # Split title into meaningful words
-                title_words = re.findall(r'\b\w+\b', meeting_title.lower())
-                keywords.extend([word for word in title_words if len(word) > 3])
-            
-            if description:
-                desc_words = re.findall(r'\b\w+\b', description.lower())
-                keywords.extend([word for word in desc_words if len(word) > 3])
-            
-            # Remove common words and duplicates
-            common_words = {'meeting', 'call', 'sync', 'review', 'discussion', 'update', 'status', 'weekly', 'daily', 'monthly', 'team', 'project', 'with', 'for', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'from', 'by', 'about', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'up', 'down', 'out', 'off', 'over', 'under', 'again', 'further', 'then', 'once'}
-            keywords = list(set([kw for kw in keywords if kw not in common_words]))
-            
-            # Search queries to try
-            search_queries = []
-            
-            # Add meeting title as search query
-            if meeting_title:
-                search_queries.append(f"name contains '{meeting_title}'")
-            
-            # Add keyword-based searches
-            for keyword in keywords[:5]:  # Limit to top 5 keywords
-                search_queries.append(f"name contains '{keyword}'")
-                search_queries.append(f"fullText contains '{keyword}'")
-            
-            # Add attendee-based searches (if we have attendee emails)
-            for email in attendee_emails[:3]:  # Limit to top 3 attendees
-                if email:
-                    # Extract name from email for search
-                    name_part = email.split('@')[0].replace('.', ' ').replace('_', ' ')
-                    if name_part:
-                        search_queries.append(f"fullText contains '{name_part}'")
-            
-            # Execute searches
-            for query in search_queries[:10]:  # Limit total queries
-                try:
-                    results = drive_service.files().list(
-                        q=query,
-                        pageSize=10,
-                        fields="files(id,name,mimeType,webViewLink,modifiedTime,size,owners)",
-                        orderBy="modifiedTime desc"
-                    ).execute()
+        # Remove common words and duplicates
+        keywords = list(set([kw for kw in keywords if kw not in _COMMON_WORDS]))
+        
+        # Search queries to try
+        search_queries = []
+        
+        # Add meeting title as search query
+        if meeting_title:
+            search_queries.append(f"name contains '{meeting_title}'")
+        
+        # Add keyword-based searches
+        for keyword in keywords[:5]:  # Limit to top 5 keywords
+            search_queries.append(f"name contains '{keyword}'")
+            search_queries.append(f"fullText contains '{keyword}'")
+        
+        # Add attendee-based searches (if we have attendee emails)
+        for email in attendee_emails[:3]:  # Limit to top 3 attendees
+            if email:
+                # Extract name from email for search
+                name_part = email.split('@')[0].replace('.', ' ').replace('_', ' ')
+                if name_part:
+                    search_queries.append(f"fullText contains '{name_part}'")
+        
+        search_queries = search_queries[:10]  # Limit total queries
+        if index is not None:
+            related_docs = _indexed_drive_documents(index, meeting_title, keywords, attendee_emails)
+            search_queries = [q for q in search_queries if q.startswith("fullText")]
+        if fulltext is not None:
+            name_parts = [e.split('@')[0].replace('.', ' ').replace('_', ' ') for e in attendee_emails[:3] if e]
+            by_id = {doc.id: doc for doc in related_docs}
+            for doc in _fulltext_documents(fulltext, index, keywords[:5] + name_parts):
+                if doc.id in by_id:
+                    by_id[doc.id].content = by_id[doc.id].content or doc.content
+                else:
+                    related_docs.append(doc)
+            if len(related_docs) >= 10:
+                search_queries = []
+        if len(related_docs) >= 15:
+            return related_docs[:15]
+
+        # Execute searches
+        for query in search_queries:
+            try:
+                results = drive_service.files().list(
+                    q=query,
+                    pageSize=10,
+                    fields="files(id,name,mimeType,webViewLink,modifiedTime,size,owners)",
+                    orderBy="modifiedTime desc"
+                ).execute()
+                
+                for file_data in results.get('files', []):
+                    # Skip if we already have this file
+                    if any(doc.id == file_data['id'] for doc in related_docs):
+                        continue
                     
-                    for file_data in results.get('files', []):
-                        # Skip if we already have this file
-                        if any(doc.id == file_data['id'] for doc in related_docs):
-                            continue
-                        
-                        doc = DriveDocument(
-                            id=file_data['id'],
-                            name=file_data.get('name', 'Unknown'),
-                            link=file_data.get('webViewLink', f"https://drive.google.com/file/d/{file_data['id']}/view"),
-                            mime_type=file_data.get('mimeType', ''),
-                            content=""  # Will be filled later if needed
-                        )
-                        related_docs.append(doc)
-                        
-                        # Limit total results
-                        if len(related_docs) >= 15:
-                            break
+                    owners = file_data.get('owners') or [{}]
+                    doc = DriveDocument(
+                        id=file_data['id'],
+                        name=file_data.get('name', 'Unknown'),
+                        link=file_data.get('webViewLink', f"https://drive.google.com/file/d/{file_data['id']}/view"),
+                        mime_type=file_data.get('mimeType', ''),
+                        content="",  # Will be filled later if needed
+                        owner_email=owners[0].get('emailAddress', '')
+                    )
+                    related_docs.append(doc)
                     
+                    # Limit total results
                     if len(related_docs) >= 15:
                         break
-                        
-                except Exception:
-                    continue  # Skip failed queries
-            
-            return related_docs[:15]  # Return top 15 results
-            
-        except Exception as e:
-            return []
-    
-    def _search_gmail_attachments(gmail_service, meeting_title: str, attendee_emails: List[str], description: str = "") -> List[DriveDocument]:
-        """Search Gmail for emails between attendees and extract attachments"""
-        try:
-            gmail_docs = []
-            
-            # Build search queries for Gmail
-            search_queries = []
-            
-            # Search for emails between attendees
-            if len(attendee_emails) >= 2:
-                for i, email1 in enumerate(attendee_emails[:3]):  # Limit to avoid too many queries
-                    for email2 in attendee_emails[i+1:4]:  # Limit combinations
-                        if email1 and email2:
-                            search_queries.append(f"from:{email1} to:{email2}")
-                            search_queries.append(f"from:{email2} to:{email1}")
-            
-            # Search for emails with meeting title keywords
-            if meeting_title:
-                title_words = re.findall(r'\b\w+\b', meeting_title.lower())
-                meaningful_words = [word for word in title_words if len(word) > 3]
-                for word in meaningful_words[:3]:  # Limit keywords
-                    search_queries.append(f'subject:"{word}"')
-                    search_queries.append(f'"{word}"')
-            
-            # Search for emails with attachments
-            search_queries.append("has:attachment")
-            
-            # Execute Gmail searches
-            for query in search_queries[:8]:  # Limit total queries
-                try:
-                    # Search for messages
-                    results = gmail_service.users().messages().list(
-                        userId='me',
-                        q=query,
-                        maxResults=10
-                    ).execute()
-                    
-                    messages = results.get('messages', [])
+                
+                if len(related_docs) >= 15:
+                    break
                     
-                    for message in messages:
-                        try:
-                            # Get message details
-                            msg = gmail_service.users().messages().get(
-                                userId='me',
-                                id=message['id'],
-                                format='full'
-                            ).execute()
-                            
-                            # Extract attachments
-                            payload = msg.get('payload', {})
-                            attachments = []
-                            
-                            def extract_attachments_from_payload(payload):
-                                if 'parts' in payload:
-                                    for part in payload['parts']:
-                                        if part.get('filename'):
-                                            attachment = GmailAttachment(
-                                                filename=part.get('filename', ''),
-                                                mime_type=part.get('mimeType', ''),
-                                                size=part.get('body', {}).get('size', 0),
-                                                attachment_id=part.get('body', {}).get('attachmentId', ''),
-                                                message_id=message['id']
-                                            )
-                                            attachments.append(attachment)
-                                        # Recursively check nested parts
-                                        if 'parts' in part:
-                                            extract_attachments_from_payload(part)
-                                elif payload.get('filename'):
-                                    attachment = GmailAttachment(
-                                        filename=payload.get('filename', ''),
-                                        mime_type=payload.get('mimeType', ''),
-                                        size=payload.get('body', {}).get('size', 0),
-                                        attachment_id=payload.get('body', {}).get('attachmentId', ''),
-                                        message_id=message['id']
-                                    )
-                                    attachments.append(attachment)
-                            
-                            extract_attachments_from_payload(payload)
-                            
-                            # Convert Gmail attachments to DriveDocument format
-                            for attachment in attachments:
-                                if attachment.filename and attachment.size > 0:
-                                    # Create a pseudo Drive link for Gmail attachments
-                                    gmail_link = f"https://mail.google.com/mail/u/0/#inbox/{message['id']}"
-                                    
-                                    doc = DriveDocument(
-                                        id=f"gmail_{attachment.attachment_id}",
-                                        name=attachment.filename,
-                                        link=gmail_link,
-                                        content="",  # Gmail attachments need special handling
-                                        mime_type=attachment.mime_type,
-                                        source="gmail",
-                                        relevance_score=0.0,  # Will be calculated later
-                                        last_modified=msg.get('internalDate', ''),
-                                        size=str(attachment.size),
-                                        owner="Gmail"
-                                    )
-                                    gmail_docs.append(doc)
-                                    
-                                    # Limit results
-                                    if len(gmail_docs) >= 10:
-                                        break
-                            
-                            if len(gmail_docs) >= 10:
-                                break
+            except Exception:
+                continue  # Skip failed queries
+        
+        return related_docs[:15]  # Return top 15 results
+        
+    except Exception as e:
+        return []
+
+
+def _extract_gmail_attachments(payload: Dict, message_id: str) -> List[GmailAttachment]:
+    """Walk a Gmail message payload (including nested parts) and collect its attachments"""
+    attachments = []
+
+    def _walk(payload):
+        if 'parts' in payload:
+            for part in payload['parts']:
+                if part.get('filename'):
+                    attachment = GmailAttachment(
+                        filename=part.get('filename', ''),
+                        mime_type=part.get('mimeType', ''),
+                        size=part.get('body', {}).get('size', 0),
+                        attachment_id=part.get('body', {}).get('attachmentId', ''),
+                        message_id=message_id,
+                        part_id=part.get('partId', '')
+                    )
+                    attachments.append(attachment)
+                # Recursively check nested parts
+                if 'parts' in part:
+                    _walk(part)
+        elif payload.get('filename'):
+            attachment = GmailAttachment(
+                filename=payload.get('filename', ''),
+                mime_type=payload.get('mimeType', ''),
+                size=payload.get('body', {}).get('size', 0),
+                attachment_id=payload.get('body', {}).get('attachmentId', ''),
+                message_id=message_id,
+                part_id=payload.get('partId', '')
+            )
+            attachments.append(attachment)
+
+    _walk(payload)
+    return attachments
+
+
+def _indexed_gmail_documents(index, meeting_title: str, attendee_emails: List[str]) -> List[DriveDocument]:
+    """The lookups _search_gmail_attachments makes, answered from the local Gmail index"""
+    lookups = []
+    for i, email1 in enumerate(attendee_emails[:3]):
+        for email2 in attendee_emails[i+1:4]:
+            if email1 and email2:
+                lookups.append(lambda a=email1, b=email2: index.messages_between(a, b))
+    if meeting_title:
+        words = [word for word in _WORD_RE.findall(meeting_title.lower()) if len(word) > 3]
+        for word in words[:3]:
+            lookups.append(lambda w=word: index.messages_matching(w))
+    lookups.append(index.recent)
+
+    gmail_docs, seen_ids = [], set()
+    for lookup in lookups:
+        for message in lookup():
+            for attachment in message.attachments:
+                doc_id = f"gmail_{message.id}_{attachment.part_id or attachment.filename}"
+                if doc_id in seen_ids:
+                    continue
+                seen_ids.add(doc_id)
+                gmail_docs.append(DriveDocument(
+                    id=doc_id,
+                    name=attachment.filename,
+                    link=f"https://mail.google.com/mail/u/0/#inbox/{message.id}",
+                    mime_type=attachment.mime_type,
+                    source="gmail",
+                    last_modified=str(message.internal_date),
+                    size=str(attachment.size),
+                    owner="Gmail",
+                    owner_email=message.sender,
+                    message_id=message.id,
+                    attachment_id=attachment.attachment_id,
+                    part_id=attachment.part_id
+                ))
+                if len(gmail_docs) >= 10:
+                    return gmail_docs
+    return gmail_docs
+
+
+def _search_gmail_attachments(gmail_service, meeting_title: str, attendee_emails: List[str], description: str = "",
+                              index=None) -> List[DriveDocument]:
+    """Search Gmail for emails between attendees and extract attachments (locally when a Gmail index is ready)"""
+    if index is not None:
+        try:
+            return _indexed_gmail_documents(index, meeting_title, attendee_emails)
+        except Exception as e:
+            print(f"Gmail index lookup failed, searching Gmail: {e}")
+    try:
+        gmail_docs = []
+        seen_ids = set()
+        
+        # Build search queries for Gmail
+        search_queries = []
+        
+        # Search for emails between attendees
+        if len(attendee_emails) >= 2:
+            for i, email1 in enumerate(attendee_emails[:3]):  # Limit to avoid too many queries
+                for email2 in attendee_emails[i+1:4]:  # Limit combinations
+                    if email1 and email2:
+                        search_queries.append(f"from:{email1} to:{email2}")
+                        search_queries.append(f"from:{email2} to:{email1}")
+        
+        # Search for emails with meeting title keywords
+        if meeting_title:
+            title_words = _WORD_RE.findall(meeting_title.lower())
+            meaningful_words = [word for word in title_words if len(word) > 3]
+            for word in meaningful_words[:3]:  # Limit keywords
+                search_queries.append(f'subject:"{word}"')
+                search_queries.append(f'"{word}"')
+        
+        # Search for emails with attachments
+        search_queries.append("has:attachment")
+        
+        # Execute Gmail searches
+        for query in search_queries[:8]:  # Limit total queries
+            try:
+                # Search for messages
+                results = gmail_service.users().messages().list(
+                    userId='me',
+                    q=query,
+                    maxResults=10
+                ).execute()
+                
+                messages = results.get('messages', [])
+                
+                for message in messages:
+                    try:
+                        # Get message details
+                        msg = gmail_service.users().messages().get(
+                            userId='me',
+                            id=message['id'],
+                            format='full'
+                        ).execute()
+                        
+                        # Extract attachments
+                        payload = msg.get('payload', {})
+                        attachments = _extract_gmail_attachments(payload, message['id'])
+                        sender = next((h.get('value', '') for h in payload.get('headers', [])
+                                       if h.get('name', '').lower() == 'from'), '')
+                        sender_email = parseaddr(sender)[1].lower()
+                        
+                        # Convert Gmail attachments to DriveDocument format
+                        for attachment in attachments:
+                            # attachmentId changes on every messages.get, so identify by message and part
+                            doc_id = f"gmail_{message['id']}_{attachment.part_id or attachment.filename}"
+                            if attachment.filename and attachment.size > 0 and doc_id not in seen_ids:
+                                seen_ids.add(doc_id)
+                                # Create a pseudo Drive link for Gmail attachments
+                                gmail_link = f"https://mail.google.com/mail/u/0/#inbox/{message['id']}"
                                 
-                        except Exception:
-                            continue  # Skip problematic messages
-                    
-                    if len(gmail_docs) >= 10:
-                        break
+                                doc = DriveDocument(
+                                    id=doc_id,
+                                    name=attachment.filename,
+                                    link=gmail_link,
+                                    content="",  # Gmail attachments need special handling
+                                    mime_type=attachment.mime_type,
+                                    source="gmail",
+                                    relevance_score=0.0,  # Will be calculated later
+                                    last_modified=msg.get('internalDate', ''),
+                                    size=str(attachment.size),
+                                    owner="Gmail",
+                                    owner_email=sender_email,
+                                    message_id=attachment.message_id,
+                                    attachment_id=attachment.attachment_id,
+                                    part_id=attachment.part_id
+                                )
+                                gmail_docs.append(doc)
+                                
+                                # Limit results
+                                if len(gmail_docs) >= 10:
+                                    break
                         
-                except Exception:
-                    continue  # Skip failed queries
+                        if len(gmail_docs) >= 10:
+                            break
+                            
+                    except Exception:
+                        continue  # Skip problematic messages
+                
+                if len(gmail_docs) >= 10:
+                    break
+                    
+            except Exception:
+                continue  # Skip failed queries
+        
+        return gmail_docs[:10]  # Return top 10 Gmail attachments
+        
+    except Exception as e:
+        return []
+
+
+def _fetch_gmail_attachment_contents(gmail_service, docs: List[DriveDocument], user: str = "") -> None:
+    """Fill in text for Gmail attachments: cached text first, then batched attachments.get calls"""
+    settings = get_settings()
+    pending = []
+    for doc in docs:
+        if not (is_extractable(doc.mime_type) or doc.mime_type.startswith("text/")):
+            doc.content = f"File type '{doc.mime_type}' - Content preview not available"
+        elif int(doc.size or 0) > settings.gmail_attachment_max_bytes:
+            doc.content = f"File too large for content extraction ({doc.size} bytes). Please review the attachment directly."
+        else:
+            cached = get_cached_text(_gmail_cache_key(doc), user)
+            if cached is None:
+                pending.append(doc)
+            else:
+                doc.content = cached or "No extractable text found in this file."
+
+    for start in range(0, len(pending), _GMAIL_BATCH_SIZE):
+        chunk = pending[start:start + _GMAIL_BATCH_SIZE]
+        bodies: Dict[str, bytes] = {}
+        errors: Dict[str, Exception] = {}
+
+        def _on_response(request_id, response, exception):
+            if exception is not None:
+                errors[request_id] = exception
+            else:
+                data = response.get("data", "")
+                bodies[request_id] = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+        batch = gmail_service.new_batch_http_request(callback=_on_response)
+        for i, doc in enumerate(chunk):
+            batch.add(
+                gmail_service.users().messages().attachments().get(
+                    userId="me", messageId=doc.message_id, id=doc.attachment_id),
+                request_id=str(i),
+            )
+        batch.execute()
+
+        for i, doc in enumerate(chunk):
+            if str(i) not in bodies:
+                doc.content = f"Content could not be extracted: {errors.get(str(i), 'no data returned')}"
+                continue
+            try:
+                text = get_document_text(
+                    _gmail_cache_key(doc), doc.mime_type, lambda data=bodies[str(i)]: data,
+                    max_pages=settings.document_extract_max_pages, user=user,
+                )
+                doc.content = text or "No extractable text found in this file."
+            except Exception as e:
+                doc.content = f"Content could not be extracted: {str(e)}"
+
+
+def _gmail_cache_key(doc: DriveDocument) -> str:
+    # Messages are immutable, so (messageId, partId) always names the same bytes
+    return f"gmail:{doc.message_id}:{doc.part_id or doc.name}"
+
+
+_SOURCE_PREFERENCE = {"attachment": 2, "drive": 1, "gmail": 0}
+
+
+def _has_real_content(doc: DriveDocument) -> bool:
+    return bool(doc.content) and not any(marker in doc.content for marker in _CONTENT_PLACEHOLDER_MARKERS)
+
+
+def _collapse_duplicate_documents(docs: List[DriveDocument]) -> List[DriveDocument]:
+    """Keep one entry per document when the same file shows up under several names or sources"""
+    clusters = cluster_near_duplicates(
+        docs,
+        name=lambda d: d.name,
+        text=lambda d: d.content if _has_real_content(d) else "",
+        prefer=lambda d: (_has_real_content(d), d.relevance_score, _SOURCE_PREFERENCE.get(d.source, 0)),
+        identity=lambda d: d.id,
+        # Same-name documents without content to compare merge only on the same owner (a Drive
+        # file's owner, a Gmail attachment's sender), whichever source they came from
+        scope=lambda d: d.owner_email.lower(),
+    )
+    collapsed = []
+    for cluster in clusters:
+        doc = cluster.representative
+        doc.duplicate_count += sum(1 + d.duplicate_count for d in cluster.duplicates)
+        collapsed.append(doc)
+    return collapsed
+
+
+def _calculate_document_relevance(docs: List[DriveDocument], meeting_title: str, meeting_description: str, attendee_emails: List[str]) -> List[DriveDocument]:
+    """Calculate relevance scores for documents based on meeting context"""
+    try:
+        # Score titles and content against the meeting context in one vectorised pass each
+        meeting_text = f"{meeting_title} {meeting_description}"
+        title_scores = cosine_similarities(meeting_text, [doc.name for doc in docs])
+        content_scores = cosine_similarities(meeting_text, [doc.content if _has_real_content(doc) else "" for doc in docs])
+        
+        # Calculate relevance for each document
+        for doc, title_score, content_score in zip(docs, title_scores, content_scores):
+            score = 0.0
             
-            return gmail_docs[:10]  # Return top 10 Gmail attachments
+            # Title matching
+            score += title_score * 6.0  # Higher weight for title matches
             
-        except Exception as e:
-            return []
-    
-    def _calculate_document_relevance(docs: List[DriveDocument], meeting_title: str, meeting_description: str, attendee_emails: List[str]) -> List[DriveDocument]:
-        """Calculate relevance scores for documents based on meeting context"""
-        try:
-            # Extract keywords from meeting context
-            meeting_text = f"{meeting_title} {meeting_description}".lower()
-            meeting_words = set(re.findall(r'\b\w+\b', meeting_text))
+            # Content matching (if available)
+            score += content_score * 4.0
             
-            # Remove common words
-            common_words = {'meeting', 'call', 'sync', 'review', 'discussion', 'update', 'status', 'weekly', 'daily', 'monthly', 'team', 'project', 'with', 'for', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'from', 'by', 'about', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'up', 'down', 'out', 'off', 'over', 'under', 'again', 'further', 'then', 'once'}
-            meeting_words = meeting_words - common_words
+            # Source preference
+            if doc.source == "attachment":
+                score += 3.0  # Highest priority for direct attachments
+            elif doc.source == "gmail":
+                score += 2.0  # High priority for Gmail attachments
+            elif doc.source == "drive":
+                score += 1.0  # Standard priority for Drive search
             
-            # Calculate relevance for each document
-            for doc in docs:
-                score = 0.0
-                
-                # Title matching
-                doc_title_words = set(re.findall(r'\b\w+\b', doc.name.lower()))
-                title_overlap = len(meeting_words.intersection(doc_title_words))
-                score += title_overlap * 2.0  # Higher weight for title matches
-                
-                # Content matching (if available)
-                if doc.content:
-                    doc_content_words = set(re.findall(r'\b\w+\b', doc.content.lower()))
-                    content_overlap = len(meeting_words.intersection(doc_content_words))
-                    score += content_overlap * 1.0
-                
-                # Source preference
-                if doc.source == "attachment":
-                    score += 3.0  # Highest priority for direct attachments
-                elif doc.source == "gmail":
-                    score += 2.0  # High priority for Gmail attachments
-                elif doc.source == "drive":
-                    score += 1.0  # Standard priority for Drive search
-                
-                # File type preference
-                if "document" in doc.mime_type or "presentation" in doc.mime_type:
-                    score += 1.5
-                elif "spreadsheet" in doc.mime_type:
-                    score += 1.0
-                elif "pdf" in doc.mime_type:
-                    score += 0.5
-                
-                # Attendee relevance (if document name contains attendee names)
-                for email in attendee_emails:
-                    if email:
-                        name_part = email.split('@')[0].replace('.', ' ').replace('_', ' ')
-                        if name_part.lower() in doc.name.lower():
-                            score += 1.0
-                
-                doc.relevance_score = score
+            # File type preference
+            if "document" in doc.mime_type or "presentation" in doc.mime_type:
+                score += 1.5
+            elif "spreadsheet" in doc.mime_type:
+                score += 1.0
+            elif "pdf" in doc.mime_type:
+                score += 0.5
             
-            # Sort by relevance score
-            docs.sort(key=lambda x: x.relevance_score, reverse=True)
-            return docs
+            # Attendee relevance (if document name contains attendee names)
+            for email in attendee_emails:
+                if email:
+                    name_part = email.split('@')[0].replace('.', ' ').replace('_', ' ')
+                    if name_part.lower() in doc.name.lower():
+                        score += 1.0
             
-        except Exception:
-            return docs  # Return original list if scoring fails
-    
-    def _build_comprehensive_document_table(documents: List[DriveDocument]) -> str:
-        """Build a comprehensive table of relevant documents and resources"""
-        if not documents:
-            return "## 📋 Relevant Documents & Resources\n\nNo relevant documents found for this meeting."
+            doc.relevance_score = score
+        
+        # Sort by relevance score
+        docs.sort(key=lambda x: x.relevance_score, reverse=True)
+        return docs
         
-        # Create the table header
-        table_header = """## 📋 Relevant Documents & Resources
+    except Exception:
+        return docs  # Return original list if scoring fails
+
+
+def _build_comprehensive_document_table(documents: List[DriveDocument]) -> str:
+    """Build a comprehensive table of relevant documents and resources"""
+    if not documents:
+        return "## 📋 Relevant Documents & Resources\n\nNo relevant documents found for this meeting."
+    
+    # Create the table header
+    table_header = """## 📋 Relevant Documents & Resources
 
 | Document Name | Type | Source | Relevance | Last Modified | Size | Link |
 |---------------|------|--------|-----------|---------------|------|------|"""
+    
+    table_rows = []
+    
+    for doc in documents[:15]:  # Show top 15 most relevant documents
+        # Format document name (truncate if too long)
+        doc_name = doc.name[:50] + "..." if len(doc.name) > 50 else doc.name
+        if doc.duplicate_count:
+            doc_name += f" (+{doc.duplicate_count} {'copy' if doc.duplicate_count == 1 else 'copies'})"
         
-        table_rows = []
+        # Format file type
+        file_type = "Unknown"
+        if "document" in doc.mime_type:
+            file_type = "📄 Document"
+        elif "spreadsheet" in doc.mime_type:
+            file_type = "📊 Spreadsheet"
+        elif "presentation" in doc.mime_type:
+            file_type = "📽️ Presentation"
+        elif "pdf" in doc.mime_type:
+            file_type = "📕 PDF"
+        elif "image" in doc.mime_type:
+            file_type = "🖼️ Image"
+        elif "text" in doc.mime_type:
+            file_type = "📝 Text"
+        else:
+            file_type = f"📎 {doc.mime_type.split('/')[-1].upper()}"
         
-        for doc in documents[:15]:  # Show top 15 most relevant documents
-            # Format document name (truncate if too long)
-            doc_name = doc.name[:50] + "..." if len(doc.name) > 50 else doc.name
-            
-            # Format file type
-            file_type = "Unknown"
-            if "document" in doc.mime_type:
-                file_type = "📄 Document"
-            elif "spreadsheet" in doc.mime_type:
-                file_type = "📊 Spreadsheet"
-            elif "presentation" in doc.mime_type:
-                file_type = "📽️ Presentation"
-            elif "pdf" in doc.mime_type:
-                file_type = "📕 PDF"
-            elif "image" in doc.mime_type:
-                file_type = "🖼️ Image"
-            elif "text" in doc.mime_type:
-                file_type = "📝 Text"
-            else:
-                file_type = f"📎 {doc.mime_type.split('/')[-1].upper()}"
-            
-            # Format source
-            source_emoji = {
-                "attachment": "📎 Direct",
-                "gmail": "📧 Gmail",
-                "drive": "💾 Drive"
-            }.get(doc.source, "❓ Unknown")
-            
-            # Format relevance score
-            relevance_stars = "⭐" * min(5, int(doc.relevance_score))
-            if doc.relevance_score >= 4:
-                relevance_display = f"{relevance_stars} High"
-            elif doc.relevance_score >= 2:
-                relevance_display = f"{relevance_stars} Medium"
-            else:
-                relevance_display = f"{relevance_stars} Low"
-            
-            # Format last modified
-            last_modified = "Unknown"
-            if doc.last_modified:
-                try:
-                    if doc.source == "gmail":
-                        # Gmail uses internal date format
-                        import time
-                        timestamp = int(doc.last_modified) / 1000
-                        last_modified = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
-                    else:
-                        # Drive uses ISO format
-                        last_modified = datetime.fromisoformat(doc.last_modified.replace('Z', '+00:00')).strftime("%Y-%m-%d")
-                except:
-                    last_modified = "Unknown"
-            
-            # Format size
-            size_display = "Unknown"
-            if doc.size:
-                try:
-                    size_bytes = int(doc.size)
-                    if size_bytes < 1024:
-                        size_display = f"{size_bytes} B"
-                    elif size_bytes < 1024 * 1024:
-                        size_display = f"{size_bytes // 1024} KB"
-                    else:
-                        size_display = f"{size_bytes // (1024 * 1024)} MB"
-                except:
-                    size_display = doc.size
-            
-            # Create table row
-            row = f"| {doc_name} | {file_type} | {source_emoji} | {relevance_display} | {last_modified} | {size_display} | [Open]({doc.link}) |"
-            table_rows.append(row)
+        # Format source
+        source_emoji = {
+            "attachment": "📎 Direct",
+            "gmail": "📧 Gmail",
+            "drive": "💾 Drive"
+        }.get(doc.source, "❓ Unknown")
         
-        # Combine header and rows
-        table_content = table_header + "\n" + "\n".join(table_rows)
+        # Format relevance score
+        relevance_stars = "⭐" * min(5, int(doc.relevance_score))
+        if doc.relevance_score >= 4:
+            relevance_display = f"{relevance_stars} High"
+        elif doc.relevance_score >= 2:
+            relevance_display = f"{relevance_stars} Medium"
+        else:
+            relevance_display = f"{relevance_stars} Low"
         
-        # Add summary statistics
-        source_counts = {}
-        for doc in documents:
-            source_counts[doc.source] = source_counts.get(doc.source, 0) + 1
+        # Format last modified
+        last_modified = "Unknown"
+        if doc.last_modified:
+            try:
+                if doc.source == "gmail":
+                    # Gmail uses internal date format
+                    timestamp = int(doc.last_modified) / 1000
+                    last_modified = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+                else:
+                    # Drive uses ISO format
+                    last_modified = datetime.fromisoformat(doc.last_modified.replace('Z', '+00:00')).strftime("%Y-%m-%d")
+            except:
+                last_modified = "Unknown"
         
-        summary = f"\n\n**📊 Summary:** {len(documents)} relevant documents found"
-        if source_counts:
-            summary += " ("
-            summary_parts = []
-            for source, count in source_counts.items():
-                source_name = {"attachment": "Direct attachments", "gmail": "Gmail attachments", "drive": "Drive documents"}.get(source, source)
-                summary_parts.append(f"{count} {source_name}")
-            summary += ", ".join(summary_parts) + ")"
+        # Format size
+        size_display = "Unknown"
+        if doc.size:
+            try:
+                size_bytes = int(doc.size)
+                if size_bytes < 1024:
+                    size_display = f"{size_bytes} B"
+                elif size_bytes < 1024 * 1024:
+                    size_display = f"{size_bytes // 1024} KB"
+                else:
+                    size_display = f"{size_bytes // (1024 * 1024)} MB"
+            except:
+                size_display = doc.size
         
-        return table_content + summary
+        # Create table row
+        row = f"| {doc_name} | {file_type} | {source_emoji} | {relevance_display} | {last_modified} | {size_display} | [Open]({doc.link}) |"
+        table_rows.append(row)
+    
+    # Combine header and rows
+    table_content = table_header + "\n" + "\n".join(table_rows)
+    
+    # Add summary statistics
+    source_counts = {}
+    for doc in documents:
+        source_counts[doc.source] = source_counts.get(doc.source, 0) + 1
     
-    def _get_drive_document_content(drive_service, file_id: str) -> DriveDocument:
-        """Get Drive document metadata and content"""
+    summary = f"\n\n**📊 Summary:** {len(documents)} relevant documents found"
+    if source_counts:
+        summary += " ("
+        summary_parts = []
+        for source, count in source_counts.items():
+            source_name = {"attachment": "Direct attachments", "gmail": "Gmail attachments", "drive": "Drive documents"}.get(source, source)
+            summary_parts.append(f"{count} {source_name}")
+        summary += ", ".join(summary_parts) + ")"
+    
+    return table_content + summary
+
+
+def _extract_document_text(drive_service, file_meta: Dict[str, Any], mime_type: str, user: str = "") -> str:
+    """Download a PDF/Office file and extract its text on the extraction process pool"""
+    settings = get_settings()
+    file_id = file_meta["id"]
+    size = int(file_meta.get("size") or 0)
+    if size > settings.document_extract_max_bytes:
+        return f"File too large for content extraction ({size} bytes). Please review the document directly."
+
+    def fetch() -> bytes:
+        data, truncated = download_bytes(drive_service, file_id, max_bytes=settings.document_extract_max_bytes)
+        if truncated:
+            # PDF and Office containers cannot be parsed from a prefix
+            raise DocumentExtractionError("file exceeds the extraction size limit")
+        return data
+
+    # The version changes on every revision, so edited files are extracted again
+    cache_key = f"{file_id}:{file_meta['version']}" if file_meta.get("version") else None
+    text = get_document_text(
+        cache_key, mime_type, fetch,
+        max_pages=settings.document_extract_max_pages, user=user,
+    )
+    return text or "No extractable text found in this file."
+
+
+def _get_drive_document_content(drive_service, file_id: str, user: str = "") -> DriveDocument:
+    """Get Drive document metadata and content"""
+    try:
+        # Get file metadata
+        file_meta = drive_service.files().get(
+            fileId=file_id, fields="id,name,mimeType,webViewLink,size,version,modifiedTime,owners(emailAddress)"
+        ).execute()
+        
+        doc = DriveDocument(
+            id=file_id,
+            name=file_meta.get("name", "Unknown"),
+            link=file_meta.get("webViewLink", f"https://drive.google.com/file/d/{file_id}/view"),
+            mime_type=file_meta.get("mimeType", ""),
+            last_modified=file_meta.get("modifiedTime", ""),
+            revision=str(file_meta.get("version", "")),
+            owner_email=(file_meta.get("owners") or [{}])[0].get("emailAddress", "")
+        )
+        
+        # Try to get content for various file types, streaming at most the configured byte ceiling
+        max_bytes = get_settings().drive_download_max_bytes
         try:
-            # Get file metadata
-            file_meta = drive_service.files().get(fileId=file_id, fields="id,name,mimeType,webViewLink").execute()
-            
-            doc = DriveDocument(
-                id=file_id,
-                name=file_meta.get("name", "Unknown"),
-                link=file_meta.get("webViewLink", f"https://drive.google.com/file/d/{file_id}/view"),
-                mime_type=file_meta.get("mimeType", "")
-            )
-            
-            # Try to get content for various file types
-            try:
-                if "document" in doc.mime_type or "google-apps.document" in doc.mime_type:
-                    # Google Docs
-                    content = drive_service.files().export(fileId=file_id, mimeType="text/plain").execute()
-                    doc.content = content.decode('utf-8')[:3000]  # Increased limit for better analysis
-                elif "spreadsheet" in doc.mime_type or "google-apps.spreadsheet" in doc.mime_type:
-                    # Google Sheets
-                    content = drive_service.files().export(fileId=file_id, mimeType="text/csv").execute()
-                    doc.content = content.decode('utf-8')[:3000]
-                elif "presentation" in doc.mime_type or "google-apps.presentation" in doc.mime_type:
-                    # Google Slides
-                    content = drive_service.files().export(fileId=file_id, mimeType="text/plain").execute()
-                    doc.content = content.decode('utf-8')[:3000]
-                elif "text" in doc.mime_type:
-                    # Plain text files
-                    content = drive_service.files().get_media(fileId=file_id).execute()
-                    doc.content = content.decode('utf-8')[:3000]
-                elif "pdf" in doc.mime_type:
-                    # For PDFs, we can't extract content via Drive API easily
-                    doc.content = "PDF file - Content extraction not available via Drive API. Please review the document directly."
-                else:
-                    doc.content = f"File type '{doc.mime_type}' - Content preview not available"
-            except Exception as e:
-                doc.content = f"Content could not be extracted: {str(e)}"
-            
-            return doc
-            
+            if is_extractable(doc.mime_type):
+                # PDF and Office files (checked first: their MIME types also contain "document" etc.)
+                doc.content = _extract_document_text(drive_service, file_meta, doc.mime_type, user)
+            elif "document" in doc.mime_type or "google-apps.document" in doc.mime_type:
+                # Google Docs
+                doc.content = download_text(drive_service, file_id, "text/plain", max_bytes).text
+            elif "spreadsheet" in doc.mime_type or "google-apps.spreadsheet" in doc.mime_type:
+                # Google Sheets
+                doc.content = download_text(drive_service, file_id, "text/csv", max_bytes).text
+            elif "presentation" in doc.mime_type or "google-apps.presentation" in doc.mime_type:
+                # Google Slides
+                doc.content = download_text(drive_service, file_id, "text/plain", max_bytes).text
+            elif "text" in doc.mime_type:
+                # Plain text files
+                doc.content = download_text(drive_service, file_id, max_bytes=max_bytes).text
+            else:
+                doc.content = f"File type '{doc.mime_type}' - Content preview not available"
         except Exception as e:
-            return DriveDocument(
-                id=file_id,
-                name="Unknown Document",
-                link=f"https://drive.google.com/file/d/{file_id}/view",
-                content=f"Error accessing document: {str(e)}"
-            )
+            doc.content = f"Content could not be extracted: {str(e)}"
+        
+        return doc
+        
+    except Exception as e:
+        return DriveDocument(
+            id=file_id,
+            name="Unknown Document",
+            link=f"https://drive.google.com/file/d/{file_id}/view",
+            content=f"Error accessing document: {str(e)}"
+        )
+
+
+def _analyze_attachments_with_gemini(attachments: List[DriveDocument], meeting_title: str) -> str:
+    """Use Gemini to analyze meeting attachments and provide insights"""
+    if not attachments:
+        return "No attachments to analyze."
     
-    def _analyze_attachments_with_gemini(attachments: List[DriveDocument], meeting_title: str) -> str:
-        """Use Gemini to analyze meeting attachments and provide insights"""
-        try:
-            if not attachments:
-                return "No attachments to analyze."
-            
-            # Initialize Vertex AI and Gemini
-            vertexai.init(project=google_cloud_project, location=google_cloud_location)
-            model = GenerativeModel("gemini-2.5-flash")
-            
-            # Prepare attachment content for analysis
-            attachment_info = ""
-            for doc in attachments:
-                attachment_info += f"\n**Document: {doc.name}**\n"
-                attachment_info += f"Type: {doc.mime_type}\n"
-                if doc.content and "Content extraction not available" not in doc.content and "Error accessing" not in doc.content:
-                    attachment_info += f"Content Preview:\n{doc.content}\n"
-                else:
-                    attachment_info += f"Content: {doc.content}\n"
-                attachment_info += "---\n"
-            
-            analysis_prompt = f"""
+    # Initialize Vertex AI and Gemini
+    model = _get_gemini_model()
+    
+    # Pack the most relevant passages of each document into the prompt budget
+    items = []
+    for doc in attachments:
+        header = f"\n**Document: {doc.name}**\nType: {doc.mime_type}\n"
+        if _has_real_content(doc):
+            items.append(ContextItem(label=doc.name, text=doc.content, relevance=doc.relevance_score, header=header))
+        else:
+            items.append(ContextItem(label=doc.name, text="", relevance=doc.relevance_score,
+                                     header=f"{header}Content: {doc.content}\n"))
+    packed = pack_context(items, meeting_title, get_settings().gemini_document_token_budget)
+
+    attachment_info = ""
+    for entry in packed:
+        if entry.item.text and not entry.chunks:
+            continue  # Out of budget; better-ranked documents used it
+        attachment_info += entry.item.header
+        if entry.chunks:
+            label = "Relevant Excerpts" if entry.truncated else "Content"
+            attachment_info += f"{label}:\n{entry.render()}\n"
+        attachment_info += "---\n"
+    
+    analysis_prompt = f"""
 Analyze these meeting attachments for the upcoming meeting "{meeting_title}":
 
 {attachment_info}
@@ -591,54 +872,39 @@ Please provide a comprehensive analysis including:
 
 Format your response in clear markdown sections. Be specific and actionable in your analysis.
 """
-            
-            response = model.generate_content(analysis_prompt)
-            return response.text
-            
-        except Exception as e:
-            return f"Attachment analysis unavailable: {str(e)}"
     
-    def _get_historical_context(calendar_service, event_context: EventContext) -> str:
-        """Get historical context for recurring meetings"""
-        try:
-            if not event_context.recurring_event_id:
-                return "This is not a recurring meeting - no historical context available."
-            
-            # Search for past instances of this recurring meeting
-            from datetime import datetime, timedelta, timezone
-            
-            # Look back 60 days for previous instances
-            now = datetime.now(timezone.utc)
-            time_min = (now - timedelta(days=60)).isoformat()
-            time_max = now.isoformat()
-            
-            events_result = calendar_service.events().list(
-                calendarId="primary",
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True,
-                orderBy="startTime"
-            ).execute()
-            
-            # Find previous instances of this recurring meeting
-            past_instances = []
-            for item in events_result.get("items", []):
-                if (item.get("recurringEventId") == event_context.recurring_event_id and 
-                    item.get("id") != event_context.id):
-                    past_instances.append(item)
-            
-            if not past_instances:
-                return "No previous instances of this recurring meeting found in the last 60 days."
-            
-            # Get the most recent instance
-            most_recent = past_instances[-1] if past_instances else None
-            if not most_recent:
-                return "No previous instances found."
-            
-            recent_date = most_recent.get("start", {}).get("dateTime", "Unknown date")
-            recent_description = most_recent.get("description", "No description available")
-            
-            historical_summary = f"""
+    response = model.generate_content(analysis_prompt)
+    return response.text
+
+
+def _get_historical_context(creds: Credentials, event_context: EventContext) -> str:
+    """Get historical context for recurring meetings"""
+    if not event_context.recurring_event_id:
+        return "This is not a recurring meeting - no historical context available."
+    
+    # Search for past instances of this recurring meeting
+    # Look back 60 days for previous instances, on the calendar the meeting is on
+    now = datetime.now(timezone.utc)
+    past_events = list_events(
+        creds, now - timedelta(days=60), now, calendars=[event_context.calendar_id],
+        service_factory=lambda: _build_service("calendar", "v3", creds),
+    )
+    
+    # Find previous instances of this recurring meeting
+    past_instances = [
+        e for e in past_events
+        if e.recurring_event_id == event_context.recurring_event_id and e.id != event_context.id
+    ]
+    
+    if not past_instances:
+        return "No previous instances of this recurring meeting found in the last 60 days."
+    
+    # Get the most recent instance
+    most_recent = past_instances[-1]
+    recent_date = "Unknown date" if most_recent.all_day else most_recent.local_start().isoformat()
+    recent_description = most_recent.description or "No description available"
+    
+    historical_summary = f"""
 ## 📚 Historical Context (Recurring Meeting)
 
 **Previous Instance**: {recent_date}
@@ -648,77 +914,152 @@ Format your response in clear markdown sections. Be specific and actionable in y
 
 *Note: For detailed notes from previous sessions, check your meeting notes repository or shared documents.*
 """
-            return historical_summary
-            
-        except Exception as e:
-            return f"Historical context unavailable: {str(e)}"
-    
-    def _get_chat_context(meeting_title: str, attendee_emails: List[str], creds: Credentials) -> str:
-        """Get chat context from Slack and/or Google Chat based on meeting title and attendees"""
-        chat_sections = []
+    return historical_summary
+
+
+def _get_env(name: str, default: str = "") -> str:
+    # Read chat settings directly from the environment (AgentSpace compatible)
+    return os.getenv(name, default)
+
+
+def _fetch_slack_messages(meeting_title: str, slack_bot_token: str,
+                          attendee_emails: Optional[List[str]] = None) -> List[Dict[str, str]]:
+    """Last week of messages from the channels most likely about the meeting (title slug, keywords, attendees)."""
+    try:
+        from tools.slack_fetcher import fetch_slack_messages
+
+        messages = fetch_slack_messages(meeting_title, lookback_days=7, max_messages=40,
+                                        attendee_emails=attendee_emails, token=slack_bot_token)
+    except Exception:
+        return []  # Slack integration is optional
+    return [
+        {'ts': m.ts, 'user': m.user, 'text': m.text, 'channel': m.channel, 'permalink': m.permalink}
+        for m in messages
+    ]
+
+
+def _fetch_google_chat_messages(creds: Credentials, meeting_title: str) -> List[Dict[str, str]]:
+    """Inline Google Chat fetching"""
+    try:
+        from googleapiclient.errors import HttpError
         
-        # Load settings directly with environment variables (AgentSpace compatible)
-        import os
+        service = _build_service('chat', 'v1', creds)
         
-        def _get_env(name: str, default: str = "") -> str:
-            return os.getenv(name, default)
+        # Get all spaces
+        spaces_result = service.spaces().list().execute()
+        spaces_data = spaces_result.get('spaces', [])
         
-        # Get chat integration settings - Default to enabling Google Chat
-        google_chat_enabled = _get_env("GOOGLE_CHAT_ENABLED", "true").lower() == "true"
-        chat_integration_preference = _get_env("CHAT_INTEGRATION_PREFERENCE", "both")
+        all_messages = []
+        cutoff_time = datetime.now(timezone.utc) - timedelta(days=7)
         
-        # Slack Integration
-        if chat_integration_preference in ["slack", "both"]:
-            try:
-                # Inline Slack integration (AgentSpace compatible)
-                slack_bot_token = _get_env("SLACK_BOT_TOKEN", "")
-                
-                slack_messages = []
-                if slack_bot_token:
-                    try:
-                        from slack_sdk import WebClient
-                        from slack_sdk.errors import SlackApiError
-                        
-                        client = WebClient(token=slack_bot_token)
-                        channel_cand = f"#{meeting_title.lower().replace(' ', '-')}"
+        # Find relevant spaces and get messages
+        title_words = set(word.lower().strip() for word in meeting_title.split() if len(word) > 2)
+        
+        for space_data in spaces_data:
+            space_name = space_data.get('name', '')
+            space_display_name = space_data.get('displayName', '')
+            space_type = space_data.get('type', '')
+            
+            # Check if space is relevant
+            is_relevant = False
+            if space_type == 'DM':
+                is_relevant = True  # Check all DMs
+            else:
+                # Check if space name contains meeting keywords
+                space_words = set(word.lower().strip() for word in space_display_name.split())
+                if title_words.intersection(space_words):
+                    is_relevant = True
+            
+            if is_relevant:
+                try:
+                    # Get messages from this space
+                    messages_result = service.spaces().messages().list(
+                        parent=space_name,
+                        pageSize=20,
+                        orderBy='createTime desc'
+                    ).execute()
+                    
+                    messages_data = messages_result.get('messages', [])
+                    
+                    for msg_data in messages_data:
+                        # Parse message creation time
+                        create_time_str = msg_data.get('createTime', '')
+                        try:
+                            create_time = datetime.fromisoformat(create_time_str.replace('Z', '+00:00'))
+                            if create_time < cutoff_time:
+                                continue  # Skip old messages
+                        except ValueError:
+                            continue
                         
-                        # Get channels
-                        res = client.conversations_list(limit=1000)
-                        channels = res.get("channels", [])
+                        # Extract message details
+                        sender_info = msg_data.get('sender', {})
+                        sender_name = (
+                            sender_info.get('displayName', '') or 
+                            sender_info.get('name', '').split('/')[-1] or 
+                            'Unknown'
+                        )
                         
-                        # Find matching channel
-                        channel_id = None
-                        for ch in channels:
-                            if ch.get("name", "").lower() == channel_cand.strip("#"):
-                                channel_id = ch.get("id")
-                                break
+                        all_messages.append({
+                            'sender': sender_name,
+                            'text': msg_data.get('text', ''),
+                            'create_time': create_time_str,
+                            'space': space_display_name
+                        })
                         
-                        # Get messages if channel found
-                        if channel_id:
-                            res = client.conversations_history(channel=channel_id, limit=20)
-                            for m in res.get("messages", []):
-                                slack_messages.append({
-                                    'ts': m.get("ts", ""),
-                                    'user': m.get("user", ""),
-                                    'text': m.get("text", ""),
-                                    'channel': channel_cand,
-                                    'permalink': f"https://slack.com/app_redirect?channel={channel_id}&message_ts={m.get('ts','')}"
-                                })
-                                
-                    except Exception:
-                        pass  # Slack integration is optional
+                except HttpError:
+                    continue  # Skip spaces we can't access
+        
+        # Sort by creation time and limit results
+        # Basic relevance check, scored for all messages at once
+        scores = cosine_similarities(meeting_title, [m['text'] for m in all_messages])
+        all_messages = [m for m, score in zip(all_messages, scores) if score > 0 or len(m['text'].strip()) > 10]
+        
+        all_messages.sort(key=lambda m: m['create_time'], reverse=True)
+        return all_messages[:20]
+        
+    except Exception:
+        return []
+
+
+def _pack_messages(items: List[ContextItem], meeting_title: str) -> str:
+    """Fit the most relevant messages into the chat prompt budget, keeping their order"""
+    # Messages arrive newest first; weight by similarity to the meeting, leaning towards recent ones
+    scores = cosine_similarities(meeting_title, [item.text for item in items])
+    for i, (item, score) in enumerate(zip(items, scores)):
+        item.relevance = (1.0 + score) / (1 + 0.05 * i)
+    packed = pack_context(items, meeting_title, get_settings().gemini_chat_token_budget)
+    return "".join(f"{entry.item.header}{entry.render(' [...] ')}\n" for entry in packed if entry.chunks)
+
+
+def _get_chat_context(meeting_title: str, attendee_emails: List[str], creds: Credentials) -> str:
+    """Get chat context from Slack and/or Google Chat based on meeting title and attendees"""
+    chat_sections = []
+    
+    # Get chat integration settings - Default to enabling Google Chat
+    google_chat_enabled = _get_env("GOOGLE_CHAT_ENABLED", "true").lower() == "true"
+    chat_integration_preference = _get_env("CHAT_INTEGRATION_PREFERENCE", "both")
+    
+    # Slack Integration
+    if chat_integration_preference in ["slack", "both"]:
+        try:
+            # Inline Slack integration (AgentSpace compatible)
+            slack_bot_token = _get_env("SLACK_BOT_TOKEN", "")
+            
+            slack_messages = (_fetch_slack_messages(meeting_title, slack_bot_token, attendee_emails)
+                              if slack_bot_token else [])
+            
+            if slack_messages:
+                # Analyze messages with AI for relevance
+                model = _get_gemini_model()
                 
-                if slack_messages:
-                    # Analyze messages with AI for relevance
-                    vertexai.init(project=google_cloud_project, location=google_cloud_location)
-                    model = GenerativeModel("gemini-2.5-flash")
-                    
-                    messages_text = ""
-                    for msg in slack_messages[:10]:  # Limit to most recent 10 messages
-                        messages_text += f"**@{msg['user']}**: {msg['text']}\n"
-                    
-                    slack_analysis_prompt = f"""
-Analyze these recent Slack messages from the channel related to the meeting "{meeting_title}":
+                messages_text = _pack_messages(
+                    [ContextItem(label=msg['user'], text=msg['text'], header=f"**@{msg['user']}** ({msg['channel']}): ")
+                     for msg in slack_messages],
+                    meeting_title,
+                )
+                
+                slack_analysis_prompt = f"""
+Analyze these recent Slack messages from the channels related to the meeting "{meeting_title}":
 
 {messages_text}
 
@@ -730,33 +1071,33 @@ Please provide:
 
 Keep the response concise and focused on meeting preparation.
 """
-                    
-                    response = model.generate_content(slack_analysis_prompt)
-                    
-                    slack_section = f"""
+                
+                response = model.generate_content(slack_analysis_prompt)
+                
+                slack_section = f"""
 ## 💬 Slack Context
 
-**Channel**: {slack_messages[0]['channel'] if slack_messages else "Unknown"}
+**Channels**: {", ".join(dict.fromkeys(msg['channel'] for msg in slack_messages))}
 **Recent Messages**: {len(slack_messages)} messages in the last 7 days
 
 {response.text}
 
 **Direct Links**:
 {chr(10).join([f"- [Message from @{msg['user']}]({msg['permalink']})" for msg in slack_messages[:3]])}
-"""
-                    chat_sections.append(slack_section)
-                else:
-                    # Try to infer channel name from meeting title
-                    potential_channels = []
-                    title_words = meeting_title.lower().split()
-                    
-                    # Common patterns for channel naming
-                    for word in title_words:
-                        if len(word) > 3:  # Skip short words
-                            potential_channels.append(f"#{word}")
-                            potential_channels.append(f"#{word.replace(' ', '-')}")
-                    
-                    slack_section = f"""
+"""
+                chat_sections.append(slack_section)
+            else:
+                # Try to infer channel name from meeting title
+                potential_channels = []
+                title_words = meeting_title.lower().split()
+                
+                # Common patterns for channel naming
+                for word in title_words:
+                    if len(word) > 3:  # Skip short words
+                        potential_channels.append(f"#{word}")
+                        potential_channels.append(f"#{word.replace(' ', '-')}")
+                
+                slack_section = f"""
 ## 💬 Slack Context
 
 No recent messages found in channels related to "{meeting_title}".
@@ -766,10 +1107,10 @@ No recent messages found in channels related to "{meeting_title}".
 
 *Note: Slack integration requires proper bot token configuration.*
 """
-                    chat_sections.append(slack_section)
-                    
-            except Exception as e:
-                slack_section = f"""
+                chat_sections.append(slack_section)
+                
+        except Exception as e:
+            slack_section = f"""
 ## 💬 Slack Context
 
 Unable to fetch Slack context: {str(e)}
@@ -779,113 +1120,26 @@ Unable to fetch Slack context: {str(e)}
 - Bot permissions to read channels
 - Channel naming that matches meeting title patterns
 """
-                chat_sections.append(slack_section)
-        
-        # Google Chat Integration
-        if chat_integration_preference in ["google_chat", "both"] and google_chat_enabled:
-            try:
-                # Inline Google Chat integration (AgentSpace compatible)
-                from datetime import datetime, timedelta
-                
-                def _fetch_google_chat_messages():
-                    """Inline Google Chat fetching"""
-                    try:
-                        from googleapiclient.discovery import build
-                        from googleapiclient.errors import HttpError
-                        
-                        service = build('chat', 'v1', credentials=creds)
-                        
-                        # Get all spaces
-                        spaces_result = service.spaces().list().execute()
-                        spaces_data = spaces_result.get('spaces', [])
-                        
-                        all_messages = []
-                        cutoff_time = datetime.now() - timedelta(days=7)
-                        
-                        # Find relevant spaces and get messages
-                        title_words = set(word.lower().strip() for word in meeting_title.split() if len(word) > 2)
-                        
-                        for space_data in spaces_data:
-                            space_name = space_data.get('name', '')
-                            space_display_name = space_data.get('displayName', '')
-                            space_type = space_data.get('type', '')
-                            
-                            # Check if space is relevant
-                            is_relevant = False
-                            if space_type == 'DM':
-                                is_relevant = True  # Check all DMs
-                            else:
-                                # Check if space name contains meeting keywords
-                                space_words = set(word.lower().strip() for word in space_display_name.split())
-                                if title_words.intersection(space_words):
-                                    is_relevant = True
-                            
-                            if is_relevant:
-                                try:
-                                    # Get messages from this space
-                                    messages_result = service.spaces().messages().list(
-                                        parent=space_name,
-                                        pageSize=20,
-                                        orderBy='createTime desc'
-                                    ).execute()
-                                    
-                                    messages_data = messages_result.get('messages', [])
-                                    
-                                    for msg_data in messages_data:
-                                        # Parse message creation time
-                                        create_time_str = msg_data.get('createTime', '')
-                                        try:
-                                            create_time = datetime.fromisoformat(create_time_str.replace('Z', '+00:00'))
-                                            if create_time < cutoff_time:
-                                                continue  # Skip old messages
-                                        except ValueError:
-                                            continue
-                                        
-                                        # Extract message details
-                                        sender_info = msg_data.get('sender', {})
-                                        sender_name = (
-                                            sender_info.get('displayName', '') or 
-                                            sender_info.get('name', '').split('/')[-1] or 
-                                            'Unknown'
-                                        )
-                                        
-                                        message_text = msg_data.get('text', '')
-                                        
-                                        # Basic relevance check
-                                        message_words = set(word.lower().strip() for word in message_text.split())
-                                        if title_words.intersection(message_words) or len(message_text.strip()) > 10:
-                                            all_messages.append({
-                                                'sender': sender_name,
-                                                'text': message_text,
-                                                'create_time': create_time_str,
-                                                'space': space_display_name
-                                            })
-                                        
-                                except HttpError:
-                                    continue  # Skip spaces we can't access
-                        
-                        # Sort by creation time and limit results
-                        all_messages.sort(key=lambda m: m['create_time'], reverse=True)
-                        return all_messages[:20]
-                        
-                    except Exception:
-                        return []
+            chat_sections.append(slack_section)
+    
+    # Google Chat Integration
+    if chat_integration_preference in ["google_chat", "both"] and google_chat_enabled:
+        try:
+            # Get messages from Google Chat
+            chat_messages = _fetch_google_chat_messages(creds, meeting_title)
+            
+            if chat_messages:
+                # Analyze messages with AI for relevance
+                model = _get_gemini_model()
                 
-                # Get messages from Google Chat
-                chat_messages = _fetch_google_chat_messages()
+                spaces_mentioned = {msg['space'] for msg in chat_messages}
+                messages_text = _pack_messages(
+                    [ContextItem(label=msg['sender'], text=msg['text'], header=f"**{msg['sender']}** (in {msg['space']}): ")
+                     for msg in chat_messages],
+                    meeting_title,
+                )
                 
-                if chat_messages:
-                    # Analyze messages with AI for relevance
-                    vertexai.init(project=google_cloud_project, location=google_cloud_location)
-                    model = GenerativeModel("gemini-2.5-flash")
-                    
-                    messages_text = ""
-                    spaces_mentioned = set()
-                    for msg in chat_messages[:10]:  # Limit to most recent 10 messages
-                        messages_text += f"**{msg['sender']}** (in {msg['space']}): {msg['text']}\n"
-                        spaces_mentioned.add(msg['space'])
-                    
-                    chat_analysis_prompt = f"""
+                chat_analysis_prompt = f"""
 Analyze these recent Google Chat messages related to the meeting "{meeting_title}":
 
 {messages_text}
@@ -898,10 +1152,10 @@ Please provide:
 
 Keep the response concise and focused on meeting preparation.
 """
-                    
-                    response = model.generate_content(chat_analysis_prompt)
-                    
-                    chat_section = f"""
+                
+                response = model.generate_content(chat_analysis_prompt)
+                
+                chat_section = f"""
 ## 💬 Google Chat Context
 
 **Spaces involved**: {', '.join(list(spaces_mentioned)[:3])}
@@ -912,9 +1166,9 @@ Keep the response concise and focused on meeting preparation.
 **Message Timeline**:
 {chr(10).join([f"- **{msg['sender']}**: {msg['text'][:100]}{'...' if len(msg['text']) > 100 else ''} _(in {msg['space']})_" for msg in chat_messages[:3]])}
 """
-                    chat_sections.append(chat_section)
-                else:
-                    chat_section = f"""
+                chat_sections.append(chat_section)
+            else:
+                chat_section = f"""
 ## 💬 Google Chat Context
 
 No recent Google Chat messages found related to "{meeting_title}" with the meeting attendees.
@@ -924,11 +1178,11 @@ No recent Google Chat messages found related to "{meeting_title}" with the meeti
 - Group chats involving attendees
 - Conversations mentioning meeting topics
 """
-                    chat_sections.append(chat_section)
-                    
-            except Exception as e:
-                error_details = str(e)
-                chat_section = f"""
+                chat_sections.append(chat_section)
+                
+        except Exception as e:
+            error_details = str(e)
+            chat_section = f"""
 ## 💬 Google Chat Context
 
 ❌ **Error:** Unable to fetch Google Chat context
@@ -948,11 +1202,11 @@ No recent Google Chat messages found related to "{meeting_title}" with the meeti
 
 **Next Steps:** Reauthenticate with Google Chat permissions
 """
-                chat_sections.append(chat_section)
-        
-        # If no integrations are configured or add debug info
-        if not chat_sections:
-            debug_info = f"""
+            chat_sections.append(chat_section)
+    
+    # If no integrations are configured or add debug info
+    if not chat_sections:
+        debug_info = f"""
 ## 💬 Chat Context
 
 No chat integrations are currently enabled.
@@ -968,12 +1222,12 @@ No chat integrations are currently enabled.
 
 *Current preference: {chat_integration_preference}*
 """
-            chat_sections.append(debug_info)
-        
-        # Always add debug section when Google Chat is enabled but no messages found
-        if google_chat_enabled and chat_integration_preference in ["google_chat", "both"]:
-            if not any("Google Chat Context" in section for section in chat_sections):
-                debug_section = f"""
+        chat_sections.append(debug_info)
+    
+    # Always add debug section when Google Chat is enabled but no messages found
+    if google_chat_enabled and chat_integration_preference in ["google_chat", "both"]:
+        if not any("Google Chat Context" in section for section in chat_sections):
+            debug_section = f"""
 ## 💬 Google Chat Debug
 
 **Configuration Status:** ✅ Google Chat is enabled
@@ -987,92 +1241,67 @@ No chat integrations are currently enabled.
 - No Google Chat conversations found related to this meeting
 - Google Chat API access denied
 """
-                chat_sections.append(debug_section)
-        
-        return "\n".join(chat_sections)
+            chat_sections.append(debug_section)
     
-    def _build_calendar_overview(all_events: List[Dict], current_time: datetime) -> str:
-        """Build a calendar overview showing upcoming meetings"""
-        try:
-            if len(all_events) <= 1:
-                return ""
-            
-            # Categorize events by timeframe
-            today_events = []
-            tomorrow_events = []
-            week_events = []
-            
-            today_start = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
-            tomorrow_start = today_start + timedelta(days=1)
-            week_end = today_start + timedelta(days=7)
-            
-            for event in all_events[1:]:  # Skip first event (main meeting)
-                start_str = event.get("start", {}).get("dateTime") or event.get("start", {}).get("date")
-                if not start_str:
-                    continue
-                    
-                try:
-                    event_time = datetime.fromisoformat(start_str.replace("Z", "+00:00"))
-                    
-                    if today_start <= event_time < tomorrow_start:
-                        today_events.append(event)
-                    elif tomorrow_start <= event_time < tomorrow_start + timedelta(days=1):
-                        tomorrow_events.append(event)
-                    elif event_time < week_end:
-                        week_events.append(event)
-                except:
-                    continue
-            
-            overview_sections = []
-            
-            # Today's remaining meetings
-            if today_events:
-                overview_sections.append(f"**📅 Today ({current_time.strftime('%A, %B %d')})** - {len(today_events)} more meeting(s):")
-                for event in today_events[:3]:  # Show up to 3
-                    start_str = event.get("start", {}).get("dateTime") or event.get("start", {}).get("date")
-                    summary = event.get("summary", "No title")
-                    try:
-                        event_time = datetime.fromisoformat(start_str.replace("Z", "+00:00"))
-                        time_str = event_time.strftime("%I:%M %p")
-                    except:
-                        time_str = "Time TBD"
-                    overview_sections.append(f"  - {time_str}: {summary}")
-            
-            # Tomorrow's meetings
-            if tomorrow_events:
-                tomorrow_date = (current_time + timedelta(days=1)).strftime('%A, %B %d')
-                overview_sections.append(f"**📅 Tomorrow ({tomorrow_date})** - {len(tomorrow_events)} meeting(s):")
-                for event in tomorrow_events[:3]:  # Show up to 3
-                    start_str = event.get("start", {}).get("dateTime") or event.get("start", {}).get("date")
-                    summary = event.get("summary", "No title")
-                    try:
-                        event_time = datetime.fromisoformat(start_str.replace("Z", "+00:00"))
-                        time_str = event_time.strftime("%I:%M %p")
-                    except:
-                        time_str = "Time TBD"
-                    overview_sections.append(f"  - {time_str}: {summary}")
-            
-            # Week summary
-            total_week_meetings = len(today_events) + len(tomorrow_events) + len(week_events) + 1  # +1 for current meeting
-            if total_week_meetings > 1:
-                overview_sections.append(f"**📊 This Week Summary:** {total_week_meetings} total meetings")
-            
-            if overview_sections:
-                return "## 📅 Calendar Context\n\n" + "\n".join(overview_sections) + "\n"
-            else:
-                return ""
-                
-        except Exception:
-            return ""
+    return "\n".join(chat_sections)
+
+
+def _build_calendar_overview(all_events: List[EventContext], current_time: datetime) -> str:
+    """Build a calendar overview showing upcoming meetings"""
+    if len(all_events) <= 1:
+        return ""
     
-    def _research_with_gemini(meeting_title: str, description: str, attendees: List[str]) -> str:
-        """Use Gemini to research meeting context and provide insights"""
-        try:
-            # Initialize Vertex AI and Gemini
-            vertexai.init(project=google_cloud_project, location=google_cloud_location)
-            model = GenerativeModel("gemini-2.5-flash")
-            
-            research_prompt = f"""
+    # Categorize events by timeframe (epoch seconds, parsed once when the events were listed)
+    today_start = current_time.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    tomorrow_start = today_start + 86400
+    day_after_start = tomorrow_start + 86400
+    week_end = today_start + 7 * 86400
+    
+    today_events = []
+    tomorrow_events = []
+    week_events = []
+    for event in all_events[1:]:  # Skip first event (main meeting)
+        if event.all_day:  # Only timed meetings are listed
+            continue
+        if today_start <= event.start_ts < tomorrow_start:
+            today_events.append(event)
+        elif tomorrow_start <= event.start_ts < day_after_start:
+            tomorrow_events.append(event)
+        elif event.start_ts < week_end:
+            week_events.append(event)
+    
+    def _line(event: EventContext) -> str:
+        return f"  - {event.local_start().strftime('%I:%M %p')}: {event.summary or 'No title'}"
+    
+    overview_sections = []
+    
+    # Today's remaining meetings
+    if today_events:
+        overview_sections.append(f"**📅 Today ({current_time.strftime('%A, %B %d')})** - {len(today_events)} more meeting(s):")
+        overview_sections.extend(_line(event) for event in today_events[:3])  # Show up to 3
+    
+    # Tomorrow's meetings
+    if tomorrow_events:
+        tomorrow_date = (current_time + timedelta(days=1)).strftime('%A, %B %d')
+        overview_sections.append(f"**📅 Tomorrow ({tomorrow_date})** - {len(tomorrow_events)} meeting(s):")
+        overview_sections.extend(_line(event) for event in tomorrow_events[:3])  # Show up to 3
+    
+    # Week summary
+    total_week_meetings = len(today_events) + len(tomorrow_events) + len(week_events) + 1  # +1 for current meeting
+    if total_week_meetings > 1:
+        overview_sections.append(f"**📊 This Week Summary:** {total_week_meetings} total meetings")
+    
+    if overview_sections:
+        return "## 📅 Calendar Context\n\n" + "\n".join(overview_sections) + "\n"
+    return ""
+
+
+def _research_with_gemini(meeting_title: str, description: str, attendees: List[str]) -> str:
+    """Use Gemini to research meeting context and provide insights"""
+    # Initialize Vertex AI and Gemini
+    model = _get_gemini_model()
+    
+    research_prompt = f"""
 Analyze this upcoming meeting and provide helpful context and insights:
 
 Meeting: {meeting_title}
@@ -1088,145 +1317,257 @@ Please provide:
 
 Keep the response concise but informative, formatted in markdown.
 """
-            
-            response = model.generate_content(research_prompt)
-            return response.text
-            
-        except Exception as e:
-            return f"AI research unavailable: {str(e)}"
-    
-    # Get OAuth credentials from tool context
-    if not hasattr(tool_context, "state"):
-        return {"panel_markdown": "Error: No authentication state available."}
-    
-    token_key = f"temp:{auth_id}"
-    access_token = tool_context.state.get(token_key)
-    if not access_token:
-        return {"panel_markdown": "Error: No access token available. Please authenticate first."}
     
-    creds = Credentials(token=access_token)
-    calendar_service = build("calendar", "v3", credentials=creds)
-    drive_service = build("drive", "v3", credentials=creds)
-    
-    # Initialize Gmail service for email and attachment search
+    response = model.generate_content(research_prompt)
+    return response.text
+
+
+# Brief generation pipeline: each source or analysis step is a stage; independent
+# stages run concurrently and a failing source degrades to its fallback section.
+_BRIEF_PIPELINE = Pipeline("meeting_brief", max_workers=32)
+
+_CALENDAR_PENDING = "⏳ Your calendar is taking longer than usual to respond. Please try again in a moment."
+
+_NO_UPCOMING_MEETINGS = "## 📅 Calendar Overview\n\nNo upcoming meetings found in your calendar for the next 7 days.\n\n💡 **What I can help with:**\n- Schedule analysis and optimization\n- Meeting preparation for future events\n- Calendar management insights"
+
+
+@_BRIEF_PIPELINE.stage(inputs=("creds", "now"), timeout=30)
+def _upcoming_events(creds: Credentials, now: datetime) -> List[EventContext]:
+    # Get upcoming events across the user's calendars - next 7 days for broader calendar insights
+    return list_events(
+        creds, now, now + timedelta(days=7), selection=get_settings().calendar_selection, max_results=50,
+        service_factory=lambda: _build_service("calendar", "v3", creds),
+    )
+
+
+@_BRIEF_PIPELINE.stage(inputs=("upcoming_events",), outputs=("event_context", "attendee_emails"))
+def _main_event(upcoming_events: List[EventContext]) -> Dict[str, Any]:
+    # Same choice as get_next_meeting: skip declined meetings and all-day entries
+    meetings = [e for e in upcoming_events if e.self_response_status != "declined" and not e.all_day]
+    if not meetings:
+        raise LookupError("No upcoming meetings")
+
+    # events.list already returns the full event, so the first one needs no second fetch
+    event_context = meetings[0]
+    return {
+        "event_context": event_context,
+        "attendee_emails": [att.email for att in event_context.attendees if att.email],
+    }
+
+
+def _remember_document_text(creds: Credentials, docs: List[DriveDocument]) -> None:
+    """Add newly read document text to the local full-text index for later related-document searches"""
     try:
-        gmail_service = build("gmail", "v1", credentials=creds)
+        from tools.fulltext_index import index_for
+
+        fulltext = index_for(creds)
+        if fulltext is None:
+            return
+        for doc in docs:
+            if not _has_real_content(doc):
+                continue
+            gmail = doc.source == "gmail"
+            # Gmail messages never change, so the message id is the attachment's revision
+            revision = doc.message_id if gmail else doc.revision or doc.last_modified
+            if revision:
+                fulltext.add(doc.id, revision, doc.name, doc.content, source="gmail" if gmail else "drive",
+                             link=doc.link, mime_type=doc.mime_type, last_modified=doc.last_modified,
+                             message_id=doc.message_id, part_id=doc.part_id)
     except Exception as e:
-        gmail_service = None  # Gmail integration is optional
+        print(f"Full-text indexing failed: {e}")
 
-    # Get upcoming events - expanded to next 7 days for broader calendar insights
-    now = datetime.now(timezone.utc)
-    time_min = now.isoformat()
-    time_max = (now + timedelta(days=7)).isoformat()
+
+@_BRIEF_PIPELINE.stage(inputs=("creds", "event_context", "user_key"), timeout=60, fallback=lambda e: [])
+def _attachment_documents(creds: Credentials, event_context: EventContext, user_key: str) -> List[DriveDocument]:
+    # Process direct Drive attachments from meeting
+    drive_service = _build_service("drive", "v3", creds)
+    docs = []
+    for file_id in _extract_drive_file_ids(event_context):
+        doc = _get_drive_document_content(drive_service, file_id, user_key)
+        doc.source = "attachment"  # Mark as direct attachment
+        docs.append(doc)
+    return docs
+
+
+@_BRIEF_PIPELINE.stage(inputs=("creds", "event_context", "attendee_emails"), timeout=30, fallback=lambda e: [])
+def _drive_documents(creds: Credentials, event_context: EventContext, attendee_emails: List[str]) -> List[DriveDocument]:
+    # Search for related documents in Google Drive
+    drive_service = _build_service("drive", "v3", creds)
+    from tools import drive_index, fulltext_index
 
     try:
-        events_result = (
-            calendar_service.events()
-            .list(calendarId="primary", timeMin=time_min, timeMax=time_max, singleEvents=True, orderBy="startTime", maxResults=50)
-            .execute()
-        )
-        items = events_result.get("items", [])
-        if not items:
-            return {"panel_markdown": "## 📅 Calendar Overview\n\nNo upcoming meetings found in your calendar for the next 7 days.\n\n💡 **What I can help with:**\n- Schedule analysis and optimization\n- Meeting preparation for future events\n- Calendar management insights"}
+        index = drive_index.index_for(creds, service_factory=lambda: _build_service("drive", "v3", creds))
+    except Exception as e:
+        print(f"Drive index unavailable: {e}")
+        index = None
+    try:
+        fulltext = fulltext_index.index_for(creds)
+    except Exception as e:
+        print(f"Full-text index unavailable: {e}")
+        fulltext = None
+    return _search_related_drive_documents(drive_service, event_context.summary, attendee_emails,
+                                           event_context.description or "", index=index, fulltext=fulltext)
 
-        # Get the first upcoming event with full details
-        event_id = items[0]["id"]
-        ev = calendar_service.events().get(calendarId="primary", eventId=event_id).execute()
-        
-        attendees_raw = ev.get("attendees", [])
-        attendees = [
-            EventAttendee(email=a.get("email", ""), response_status=a.get("responseStatus")) for a in attendees_raw
-        ]
-        start = ev.get("start", {}).get("dateTime") or ev.get("start", {}).get("date") or ""
-        end = ev.get("end", {}).get("dateTime") or ev.get("end", {}).get("date") or ""
-
-        event_context = EventContext(
-            id=ev.get("id", ""),
-            summary=ev.get("summary", ""),
-            description=ev.get("description", ""),
-            start_iso=_to_iso(start),
-            end_iso=_to_iso(end),
-            attendees=attendees,
-            recurring_event_id=ev.get("recurringEventId"),
-            html_link=ev.get("htmlLink"),
-            location=ev.get("location"),
-            attachments=ev.get("attachments", [])
-        )
-        
-        # Process comprehensive document search
-        all_documents = []
-        
-        # 1. Process direct Drive attachments from meeting
-        file_ids = _extract_drive_file_ids(ev)
-        for file_id in file_ids:
-            doc = _get_drive_document_content(drive_service, file_id)
-            doc.source = "attachment"  # Mark as direct attachment
-            all_documents.append(doc)
-        
-        # 2. Search for related documents in Google Drive
-        attendee_emails = [att.email for att in attendees if att.email]
-        related_drive_docs = _search_related_drive_documents(
-            drive_service, 
-            event_context.summary, 
-            attendee_emails, 
-            event_context.description or ""
-        )
-        all_documents.extend(related_drive_docs)
-        
-        # 3. Search for Gmail attachments between attendees
-        if gmail_service:
-            gmail_docs = _search_gmail_attachments(
-                gmail_service,
-                event_context.summary,
-                attendee_emails,
-                event_context.description or ""
-            )
-            all_documents.extend(gmail_docs)
-        
-        # 4. Calculate relevance scores and sort documents
-        all_documents = _calculate_document_relevance(
-            all_documents,
-            event_context.summary,
-            event_context.description or "",
-            attendee_emails
-        )
-        
-        # 5. Get content for top documents (limit to avoid API limits)
-        for doc in all_documents[:10]:  # Process top 10 most relevant documents
-            if not doc.content and doc.source != "gmail":  # Skip Gmail docs (content extraction complex)
-                try:
-                    content_doc = _get_drive_document_content(drive_service, doc.id)
-                    doc.content = content_doc.content
-                except Exception:
-                    pass  # Skip if content extraction fails
-        
-        # Get comprehensive analysis including historical and chat context
-        attendee_emails = [att.email for att in attendees if att.email]
-        ai_insights = _research_with_gemini(event_context.summary, event_context.description or "", attendee_emails)
-        attachment_analysis = _analyze_attachments_with_gemini(all_documents[:5], event_context.summary)  # Analyze top 5 documents
-        historical_context = _get_historical_context(calendar_service, event_context)
-        chat_context = _get_chat_context(event_context.summary, attendee_emails, creds)
-        
-        # Build comprehensive document table
+
+@_BRIEF_PIPELINE.stage(inputs=("creds", "event_context", "attendee_emails"), timeout=30, fallback=lambda e: [])
+def _gmail_documents(creds: Credentials, event_context: EventContext, attendee_emails: List[str]) -> List[DriveDocument]:
+    # Search for Gmail attachments between attendees (Gmail integration is optional)
+    gmail_service = _build_service("gmail", "v1", creds)
+    from tools.gmail_index import index_for
+
+    try:
+        index = index_for(creds, service_factory=lambda: _build_service("gmail", "v1", creds))
+    except Exception as e:
+        print(f"Gmail index unavailable: {e}")
+        index = None
+    return _search_gmail_attachments(gmail_service, event_context.summary, attendee_emails,
+                                     event_context.description or "", index=index)
+
+
+@_BRIEF_PIPELINE.stage(
+    inputs=("creds", "attachment_documents", "drive_documents", "gmail_documents", "event_context", "attendee_emails",
+            "user_key"),
+    timeout=60,
+)
+def _ranked_documents(creds: Credentials, attachment_documents: List[DriveDocument], drive_documents: List[DriveDocument],
+                      gmail_documents: List[DriveDocument], event_context: EventContext,
+                      attendee_emails: List[str], user_key: str) -> List[DriveDocument]:
+    # Fold copies of the same file together, then calculate relevance scores and sort documents
+    all_documents = _calculate_document_relevance(
+        _collapse_duplicate_documents(attachment_documents + drive_documents + gmail_documents),
+        event_context.summary,
+        event_context.description or "",
+        attendee_emails
+    )
+
+    # Get content for top documents (limit to avoid API limits)
+    top_documents = all_documents[:10]  # Process top 10 most relevant documents
+    drive_service = _build_service("drive", "v3", creds)
+    for doc in top_documents:
+        if not doc.content and doc.source != "gmail":
+            try:
+                content_doc = _get_drive_document_content(drive_service, doc.id, user_key)
+                doc.content = content_doc.content
+                doc.revision, doc.last_modified = content_doc.revision, content_doc.last_modified
+            except Exception:
+                pass  # Skip if content extraction fails
+
+    gmail_top = [doc for doc in top_documents if doc.source == "gmail" and not doc.content and doc.attachment_id]
+    if gmail_top:
+        try:
+            _fetch_gmail_attachment_contents(_build_service("gmail", "v1", creds), gmail_top, user_key)
+        except Exception as e:
+            print(f"Gmail attachment retrieval failed: {e}")
+
+    _remember_document_text(creds, top_documents)
+
+    # Re-score the top documents now that their content is known, and drop copies only
+    # recognisable by content (renamed files)
+    all_documents[:10] = _calculate_document_relevance(
+        top_documents, event_context.summary, event_context.description or "", attendee_emails
+    )
+    return _collapse_duplicate_documents(all_documents)
+
+
+@_BRIEF_PIPELINE.stage(
+    inputs=("event_context", "attendee_emails"), timeout=90, max_concurrency=8,
+    fallback=lambda e: f"AI research unavailable: {str(e)}",
+)
+def _ai_insights(event_context: EventContext, attendee_emails: List[str]) -> str:
+    return _research_with_gemini(event_context.summary, event_context.description or "", attendee_emails)
+
+
+@_BRIEF_PIPELINE.stage(
+    inputs=("ranked_documents", "event_context"), timeout=90, max_concurrency=8,
+    fallback=lambda e: f"Attachment analysis unavailable: {str(e)}",
+)
+def _attachment_analysis(ranked_documents: List[DriveDocument], event_context: EventContext) -> str:
+    # Only the top 10 have content fetched; the packer splits the prompt budget between them
+    return _analyze_attachments_with_gemini(ranked_documents[:10], event_context.summary)
+
+
+@_BRIEF_PIPELINE.stage(
+    inputs=("creds", "event_context"), timeout=30,
+    fallback=lambda e: f"Historical context unavailable: {str(e)}",
+)
+def _historical_context(creds: Credentials, event_context: EventContext) -> str:
+    return _get_historical_context(creds, event_context)
+
+
+@_BRIEF_PIPELINE.stage(
+    inputs=("creds", "event_context", "attendee_emails"), timeout=120,
+    fallback=lambda e: f"## 💬 Chat Context\n\nUnable to fetch chat context: {str(e)}\n",
+)
+def _chat_context(creds: Credentials, event_context: EventContext, attendee_emails: List[str]) -> str:
+    return _get_chat_context(event_context.summary, attendee_emails, creds)
+
+
+@_BRIEF_PIPELINE.stage(inputs=("upcoming_events", "now"), fallback=lambda e: "")
+def _calendar_overview(upcoming_events: List[EventContext], now: datetime) -> str:
+    return _build_calendar_overview(upcoming_events, now)
+
+
+# Sections whose stage output carries its own markdown header
+_SECTION_HEADERS = {
+    "calendar_overview": "## 📅 Calendar Context",
+    "historical_context": "## 📚 Historical Context",
+    "chat_context": "## 💬 Chat Context",
+    "ranked_documents": "## 📋 Relevant Documents & Resources",
+}
+
+_SECTION_LABELS = {
+    "calendar_overview": "calendar overview",
+    "historical_context": "historical context",
+    "chat_context": "chat context",
+    "ranked_documents": "related documents",
+    "attachment_analysis": "document analysis",
+    "ai_insights": "AI research",
+}
+
+
+def _pending_section(name: str) -> str:
+    body = "⏳ *Still loading - omitted to keep this brief fast. Ask again in a moment for the full version.*"
+    header = _SECTION_HEADERS.get(name)
+    return f"{header}\n\n{body}" if header else body
+
+
+def _render_brief(result: PipelineResult) -> str:
+    incomplete = set(result.incomplete)
+
+    def section(name: str, default: Any) -> Any:
+        return _pending_section(name) if name in incomplete else result.get(name, default)
+
+    event_context = result.get("event_context")
+    all_documents = result.get("ranked_documents", [])
+    calendar_overview = section("calendar_overview", "")
+    historical_context = section("historical_context", "")
+    chat_context = section("chat_context", "")
+    attachment_analysis = section("attachment_analysis", "Attachment analysis unavailable.")
+    ai_insights = section("ai_insights", "AI research unavailable.")
+
+    # Build comprehensive document table
+    if "ranked_documents" in incomplete:
+        document_table = _pending_section("ranked_documents")
+    else:
         document_table = _build_comprehensive_document_table(all_documents)
-        
-        # Build enhanced meeting brief with legacy attachments section for direct attachments only
-        attachments_section = ""
-        direct_attachments = [doc for doc in all_documents if doc.source == "attachment"]
-        if direct_attachments:
-            attachments_section = "\n## 📎 Direct Meeting Attachments\n"
-            for doc in direct_attachments:
-                attachments_section += f"\n### [{doc.name}]({doc.link})\n"
-                attachments_section += f"**Type:** {doc.mime_type}\n"
-                if doc.content and doc.content != "Content could not be extracted":
-                    # Show first few lines of content
-                    content_preview = doc.content[:300] + "..." if len(doc.content) > 300 else doc.content
-                    attachments_section += f"**Preview:** {content_preview}\n"
-        
-        # Add calendar overview section
-        calendar_overview = _build_calendar_overview(items, now)
-        
-        markdown = f"""# 📅 Meeting Brief
+
+    omitted = [label for name, label in _SECTION_LABELS.items() if name in incomplete]
+    omitted_note = f"\n*⏳ Omitted to meet the latency budget: {', '.join(omitted)}*" if omitted else ""
+
+    # Build enhanced meeting brief with legacy attachments section for direct attachments only
+    attachments_section = ""
+    direct_attachments = [doc for doc in all_documents if doc.source == "attachment"]
+    if direct_attachments:
+        attachments_section = "\n## 📎 Direct Meeting Attachments\n"
+        for doc in direct_attachments:
+            attachments_section += f"\n### [{doc.name}]({doc.link})\n"
+            attachments_section += f"**Type:** {doc.mime_type}\n"
+            if doc.content and doc.content != "Content could not be extracted":
+                # Show first few lines of content
+                content_preview = doc.content[:300] + "..." if len(doc.content) > 300 else doc.content
+                attachments_section += f"**Preview:** {content_preview}\n"
+
+    markdown = f"""# 📅 Meeting Brief
 
 ## {event_context.summary}
 
@@ -1260,34 +1601,247 @@ Keep the response concise but informative, formatted in markdown.
 {ai_insights}
 
 ---
-*📊 Brief generated automatically by Enhanced Meeting Prep Agent with comprehensive document search, Gmail integration, and AI analysis*
+*📊 Brief generated automatically by Enhanced Meeting Prep Agent with comprehensive document search, Gmail integration, and AI analysis*{omitted_note}
 """
-        
-        return {"panel_markdown": markdown}
-        
+    return markdown
+
+
+_LATE_BRIEF_TTL_SECONDS = 15 * 60
+_LATE_BRIEF_MAX_BYTES = 16 * 1024 * 1024
+
+
+def _late_briefs():
+    # Complete briefs rendered after a deadline-bounded run, keyed by event id per user. Looked up
+    # on each call: the agent module is pickled by value and the cache object holds locks
+    from tools.cache import get_cache
+
+    return get_cache("late_briefs", _LATE_BRIEF_TTL_SECONDS, _LATE_BRIEF_MAX_BYTES)
+
+
+def get_cached_brief(user_key: str, event_id: str) -> Optional[str]:
+    """Return the complete brief that finished after an earlier partial one, if still fresh."""
+    return _late_briefs().get(event_id, user=user_key)
+
+
+def _brief_deadline(mode: str) -> Optional[float]:
+    settings = get_settings()
+    if mode == "interactive":
+        seconds = settings.brief_deadline_interactive_seconds
+    elif mode == "scheduled":
+        seconds = settings.brief_deadline_scheduled_seconds
+    else:
+        raise ValueError(f"Unknown brief mode: {mode}")
+    return seconds if seconds > 0 else None
+
+
+def _cache_user(creds: Credentials) -> str:
+    """
+    Partition of the user's entries in the shared caches: their email, which outlives
+    access-token rotation; the token fingerprint only when the email cannot be resolved.
+    """
+    try:
+        email = resolve_identity(creds, service_factory=lambda api, version: _build_service(api, version, creds)).email
+    except Exception as e:
+        print(f"Could not resolve the user's email for caching: {e}")
+        email = None
+    return email or token_fingerprint(creds)
+
+
+def generate_meeting_brief(creds: Credentials, mode: str = "interactive", backfill: bool = False,
+                           user_key: str = "") -> Dict[str, str]:
+    """
+    Build the brief for the next upcoming meeting within the latency budget for `mode`
+    ("interactive" or "scheduled"). Sources that miss the budget are rendered as pending.
+    With backfill=True the run keeps going in the background and the complete brief is
+    cached for the next request about the same event (see get_cached_brief).
+
+    user_key (the user's email) partitions the late-brief and document-text caches;
+    it is resolved from creds when not given.
+    """
+    user_key = user_key or _cache_user(creds)
+    def store_complete(full: PipelineResult) -> None:
+        event_context = full.get("event_context")
+        if event_context is not None:
+            _late_briefs().set(event_context.id, _render_brief(full), user=user_key)
+            print(f"Late brief cached for event {event_context.id}: {full.summary()}")
+
+    result = _BRIEF_PIPELINE.run(
+        {"creds": creds, "now": datetime.now(timezone.utc), "user_key": user_key},
+        deadline=_brief_deadline(mode),
+        on_complete=store_complete if backfill else None,
+    )
+    print(result.summary())
+
+    if "upcoming_events" not in result.outputs:
+        if "upcoming_events" in result.incomplete:
+            return {"panel_markdown": _CALENDAR_PENDING}
+        return {"panel_markdown": f"Error accessing calendar: {result.metrics['upcoming_events'].error}"}
+    if not result.get("upcoming_events"):
+        return {"panel_markdown": _NO_UPCOMING_MEETINGS}
+    if "event_context" not in result.outputs:
+        if "main_event" in result.incomplete:
+            return {"panel_markdown": _CALENDAR_PENDING}
+        if result.metrics["main_event"].error.startswith("LookupError"):
+            return {"panel_markdown": _NO_UPCOMING_MEETINGS}
+        return {"panel_markdown": f"Error accessing calendar: {result.metrics['main_event'].error}"}
+
+    if result.incomplete:
+        cached = get_cached_brief(user_key, result.get("event_context").id)
+        if cached is not None:
+            return {"panel_markdown": cached}
+    return {"panel_markdown": _render_brief(result)}
+
+
+# Tool: prepare_meeting_brief (wraps our internal utilities)
+def prepare_meeting_brief(tool_context: ToolContext):
+    # Get OAuth credentials from tool context
+    if not hasattr(tool_context, "state"):
+        return {"panel_markdown": "Error: No authentication state available."}
+    
+    token_key = f"temp:{get_settings().auth_id}"
+    access_token = tool_context.state.get(token_key)
+    if not access_token:
+        return {"panel_markdown": "Error: No access token available. Please authenticate first."}
+    
+    from google.oauth2.credentials import Credentials
+
+    creds = Credentials(token=access_token)
+    user_key = tool_context.state.get("_user_email") or ""
+    return generate_meeting_brief(creds, mode="interactive", backfill=True, user_key=user_key)
+
+
+def _parse_local_datetime(value: str, tz_name: str) -> datetime:
+    """ISO 8601 time; values without an offset are taken to be in the user's timezone."""
+    from tools.free_slots import parse_datetime
+
+    return parse_datetime(value, tz_name)
+
+
+def _tool_credentials(tool_context: ToolContext) -> Tuple[Optional[Credentials], str]:
+    """(credentials, error) for the signed-in user of a calendar tool call."""
+    if not hasattr(tool_context, "state"):
+        return None, "No authentication state available."
+    access_token = tool_context.state.get(f"temp:{get_settings().auth_id}")
+    if not access_token:
+        return None, "No access token available. Please authenticate first."
+
+    from google.oauth2.credentials import Credentials
+
+    return Credentials(token=access_token), ""
+
+
+def _calendar_events_between(creds: Credentials, start_time: str, end_time: str,
+                             tz_name: str) -> Tuple[datetime, datetime, List[EventContext]]:
+    range_start = _parse_local_datetime(start_time, tz_name)
+    range_end = _parse_local_datetime(end_time, tz_name)
+    if range_end <= range_start:
+        raise ValueError("end_time must be after start_time.")
+    events = list_events(
+        creds, range_start, range_end, selection=get_settings().calendar_selection,
+        service_factory=lambda: _build_service("calendar", "v3", creds),
+    )
+    return range_start, range_end, events
+
+
+# Tool: list_meetings (calendar-only answers, no brief pipeline)
+def list_meetings(start_time: str, end_time: str, attendee: str, keyword: str, tool_context: ToolContext):
+    """
+    Count and list meetings between start_time and end_time (ISO 8601, e.g. 2025-06-02T00:00:00).
+
+    attendee filters to meetings with a matching attendee email (a name or part of the
+    address is fine) and keyword to a matching title, description or location; pass ""
+    to skip a filter. Declined meetings are left out. Returns the total count, counts per
+    day and the meetings themselves, with times in the user's timezone.
+    """
+    creds, error = _tool_credentials(tool_context)
+    if creds is None:
+        return {"error": error}
+    tz_name = tool_context.state.get("_user_tz") or "UTC"
+    try:
+        _, _, events = _calendar_events_between(creds, start_time, end_time, tz_name)
+    except ValueError as e:
+        return {"error": f"Invalid time range: {e}"}
+    except Exception as e:
+        return {"error": f"Error accessing calendar: {e}"}
+
+    from tools.calendar_queries import query_events
+
+    return query_events(events, tz_name, attendee=attendee, keyword=keyword)
+
+
+# Tool: get_next_meeting (the next meeting without preparing a brief)
+def get_next_meeting(tool_context: ToolContext):
+    """The user's next meeting in the coming 7 days (title, time, attendees, location, link)."""
+    creds, error = _tool_credentials(tool_context)
+    if creds is None:
+        return {"error": error}
+    tz_name = tool_context.state.get("_user_tz") or "UTC"
+    now = datetime.now(timezone.utc)
+    try:
+        events = list_events(
+            creds, now, now + timedelta(days=7), selection=get_settings().calendar_selection,
+            service_factory=lambda: _build_service("calendar", "v3", creds),
+        )
+    except Exception as e:
+        return {"error": f"Error accessing calendar: {e}"}
+    upcoming = [e for e in events if e.self_response_status != "declined" and not e.all_day]
+    if not upcoming:
+        return {"next_meeting": None, "message": "No upcoming meetings in the next 7 days."}
+
+    from tools.calendar_queries import event_summary
+    from tools.free_slots import zone_for
+
+    meeting = event_summary(upcoming[0], zone_for(tz_name))
+    meeting["description"] = upcoming[0].description[:500]
+    return {"timeZone": tz_name, "next_meeting": meeting}
+
+
+# Tool: get_schedule_insights (conflict detection over the user's calendars)
+def get_schedule_insights(start_time: str, end_time: str, tool_context: ToolContext):
+    """
+    Find scheduling conflicts between start_time and end_time (ISO 8601, e.g. 2025-06-02T00:00:00).
+
+    Returns overlapping meetings (double_booked when the user accepted more than one),
+    back-to-back meeting chains, free focus-time gaps inside working hours and total
+    busy minutes, with times in the user's timezone.
+    """
+    creds, error = _tool_credentials(tool_context)
+    if creds is None:
+        return {"error": error}
+    tz_name = tool_context.state.get("_user_tz") or "UTC"
+    try:
+        range_start, range_end, events = _calendar_events_between(creds, start_time, end_time, tz_name)
+    except ValueError as e:
+        return {"error": f"Invalid time range: {e}"}
     except Exception as e:
-        return {"panel_markdown": f"Error accessing calendar: {str(e)}"}
+        return {"error": f"Error accessing calendar: {e}"}
+
+    from tools.schedule_insights import analyze_schedule
 
+    return analyze_schedule(events, range_start, range_end, timezone_name=tz_name).to_dict(tz_name)
 
-# Define sub-agent that owns the tool (follow sample pattern)
-prepare_brief = LlmAgent(
-    name="prepare_brief",
-    model=settings.sub_agent_model,
-    description="Gathers Calendar/Drive/Slack context and prepares a concise meeting brief.",
-    instruction="""
+
+_PREPARE_BRIEF_INSTRUCTION = """
 You specialize in preparing meeting briefs. Always use the provided tool to gather
 and compose the brief. Do not greet. Keep the output concise and actionable.
-    """,
-    tools=[prepare_meeting_brief],
-    before_agent_callback=prereq_setup,
-)
+    """
+
+_CALENDAR_LOOKUP_INSTRUCTION = """
+You answer questions about the user's calendar from calendar data alone. Do not greet.
+The current time is {_time} and the user's timezone is {_user_tz}; turn relative dates
+("today", "tomorrow", "this week") into start_time/end_time in that timezone.
+
+- Counting, listing or finding meetings (by day, date range, attendee or topic): use list_meetings.
+  Pass "" for the attendee or keyword filter you do not need.
+- "What's my next meeting?" / "When is my next meeting?": use get_next_meeting.
+- Conflicts, double bookings, back-to-back meetings, busy time or free focus time: use get_schedule_insights.
 
+Answer from the tool results only, with times in the user's timezone. Keep it short.
+If the user wants the meeting prepared (documents, chat context, briefing), say that a
+full brief can be prepared.
+    """
 
-# Root agent delegates to the sub-agent (follow sample pattern)
-root_agent = LlmAgent(
-    model=settings.root_agent_model,
-    name="root_agent",
-    instruction="""
+_ROOT_AGENT_INSTRUCTION = """
 You are a comprehensive meeting preparation and calendar management assistant. You help users with a wide range of calendar and meeting-related tasks.
 
 **Core Capabilities:**
@@ -1298,48 +1852,94 @@ You are a comprehensive meeting preparation and calendar management assistant. Y
 - **Chat Integration**: Search Google Chat and Slack conversations for meeting context
 - **Schedule Insights**: Provide patterns, conflicts, and optimization suggestions
 
-**For ANY calendar or meeting question**, always use the "prepare_brief" sub-agent to get comprehensive calendar data, then provide the specific information requested.
+**Routing:** pick the cheapest sub-agent that can answer.
 
-**Types of questions to handle with prepare_brief tool:**
-- Today's/tomorrow's schedule
-- Weekly meeting overview
-- Meeting patterns and analysis
-- Schedule conflicts and busy periods
-- Meeting attendee information
+Use the "calendar_lookup" sub-agent for questions answered by calendar data alone:
+- Today's/tomorrow's schedule, weekly meeting overview, meeting counts
+- Finding meetings by date, date range, attendee or topic
+- When the next meeting is and who is attending
+- Schedule conflicts, double bookings, back-to-back meetings, busy periods and focus time
+
+Use the "prepare_brief" sub-agent only when the user wants a meeting prepared or needs
+context beyond the calendar:
+- Preparing or briefing for a meeting
 - Document and attachment summaries
-- Time management suggestions
+- Related Google Chat / Slack discussions, AI insights and history of a recurring meeting
+
+**Example routing for common questions:**
 
-**Example responses for common questions:**
+*"What meetings do I have today?"* → calendar_lookup
 
-*"What meetings do I have today?"*
-→ ALWAYS use prepare_brief tool and extract today's meetings from the calendar context
+*"How many meetings do I have today?"* → calendar_lookup
 
-*"How many meetings do I have today?"*
-→ ALWAYS use prepare_brief tool and count today's meetings
+*"Show my schedule this week"* → calendar_lookup
 
-*"Show my schedule this week"*
-→ ALWAYS use prepare_brief tool and provide a week overview based on calendar data
+*"Find meetings with [person]"* → calendar_lookup
 
-*"What's my next meeting about?"*
-→ ALWAYS use prepare_brief tool to get details about the upcoming meeting
+*"Do I have any conflicts tomorrow?"* → calendar_lookup
 
-*"Find meetings with [person]"*
-→ ALWAYS use prepare_brief tool and analyze attendee information
+*"What's my next meeting about?"* → prepare_brief (full context on the meeting)
 
-*"Do I have any conflicts tomorrow?"*
-→ ALWAYS use prepare_brief tool and analyze the schedule for conflicts
+*"Prepare me for my next meeting"* → prepare_brief
 
 **Always be proactive**: If someone asks a simple calendar question, offer to prepare a meeting brief or provide additional helpful context.
 
 Never greet the user again if you already did previously. Always provide actionable, specific information.
-    """,
-    sub_agents=[prepare_brief],
-)
+    """
+
+
+def _build_agents() -> Dict[str, LlmAgent]:
+    """Construct the ADK agents on first access (importing the ADK is the slow part)."""
+    if not _agents:
+        from google.adk.agents import LlmAgent
+
+        settings = get_settings()
+
+        # Define sub-agent that owns the tool (follow sample pattern)
+        prepare_brief = LlmAgent(
+            name="prepare_brief",
+            model=settings.sub_agent_model,
+            description="Gathers Calendar/Drive/Slack context and prepares a concise meeting brief.",
+            instruction=_PREPARE_BRIEF_INSTRUCTION,
+            tools=[prepare_meeting_brief],
+            before_agent_callback=prereq_setup,
+        )
+
+        # Calendar-only questions skip the document/chat/Gemini pipeline entirely
+        calendar_lookup = LlmAgent(
+            name="calendar_lookup",
+            model=settings.sub_agent_model,
+            description="Answers schedule questions (counts, lists, attendees, date ranges, conflicts) from calendar data.",
+            instruction=_CALENDAR_LOOKUP_INSTRUCTION,
+            tools=[list_meetings, get_next_meeting, get_schedule_insights],
+            before_agent_callback=prereq_setup,
+        )
+
+        # Root agent delegates to the sub-agent (follow sample pattern)
+        root_agent = LlmAgent(
+            model=settings.root_agent_model,
+            name="root_agent",
+            instruction=_ROOT_AGENT_INSTRUCTION,
+            sub_agents=[calendar_lookup, prepare_brief],
+        )
+
+        _agents.update(prepare_brief=prepare_brief, calendar_lookup=calendar_lookup, root_agent=root_agent)
+    return _agents
 
 
 def deploy_agent_engine_app():
+    import vertexai
+    from vertexai import agent_engines
+    from vertexai.preview import reasoning_engines
+
+    settings = get_settings()
+    google_cloud_project = settings.google_cloud_project
+    google_cloud_location = settings.google_cloud_location
+    staging_bucket = settings.staging_bucket
+    agent_display_name = settings.agent_display_name
+
     app = reasoning_engines.AdkApp(
-        agent=root_agent,
+        agent=_build_agents()["root_agent"],
         enable_tracing=True,
     )
 
@@ -1353,7 +1953,8 @@ def deploy_agent_engine_app():
         "agent_engine": app,
         "display_name": agent_display_name,
         "requirements": "requirements.txt",
-        # "extra_packages": [".env"]
+        # Local packages the pickled agent imports at runtime
+        "extra_packages": ["agents", "config", "tools"],
     }
 
     existing_agents = list(
@@ -1,7 +1,13 @@
+import os
+import threading
+
 from google.oauth2.credentials import Credentials
 from typing import Any
 
 
+_thread_services = threading.local()
+
+
 def get_google_creds_from_tool_context(tool_context: Any, auth_id: str) -> Credentials:
     """
     Retrieve a short-lived access token that AgentSpace places in the tool context state
@@ -17,3 +23,30 @@ def get_google_creds_from_tool_context(tool_context: Any, auth_id: str) -> Crede
             f"Missing access token in tool_context.state['{token_key}']; ensure AgentSpace OAuth is configured."
         )
     return Credentials(token=access_token)
+
+
+def _service_kwargs(creds: Credentials) -> dict:
+    # Read on every build, so from the environment rather than a full load_settings()
+    if os.getenv("GOOGLE_HTTP_POOLED", "true").lower() != "true":
+        return {"credentials": creds}
+    from tools.http_transport import authorized_http
+
+    return {"http": authorized_http(creds)}
+
+
+def build_google_service(api: str, version: str, creds: Credentials):
+    """
+    Service objects are kept one per worker thread, rebuilt whenever the access token
+    changes. Their requests go through the shared pooled transport, so connections to
+    googleapis.com are reused across threads, APIs and briefs.
+    """
+    from googleapiclient.discovery import build
+
+    cache = getattr(_thread_services, "cache", None)
+    token = getattr(creds, "token", None)
+    if cache is None or cache.get("_token") != token:
+        cache = _thread_services.cache = {"_token": token}
+    key = (api, version)
+    if key not in cache:
+        cache[key] = build(api, version, **_service_kwargs(creds))
+    return cache[key]
@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Cache a stage's outputs for ttl_seconds, keyed by key(inputs)."""
+    ttl_seconds: float
+    key: Callable[[Dict[str, Any]], Hashable]
+
+
+@dataclass
+class Stage:
+    """
+    One step of a pipeline. The function is called with its declared inputs as keyword
+    arguments. A stage with a single output returns that value; a stage with several
+    outputs returns a dict keyed by output name.
+
+    If the stage raises or times out, fallback(error) supplies its outputs instead;
+    without a fallback the outputs stay missing and dependent stages are skipped.
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    max_concurrency: Optional[int] = None
+    cache: Optional[CachePolicy] = None
+    fallback: Optional[Callable[[BaseException], Any]] = None
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    status: str = "pending"  # pending, running, ok, cached, failed, timeout, skipped
+    queued_ms: float = 0.0
+    duration_ms: float = 0.0
+    error: str = ""
+
+
+@dataclass
+class PipelineResult:
+    outputs: Dict[str, Any]
+    metrics: Dict[str, StageMetrics]
+    elapsed_ms: float = 0.0
+    deadline_hit: bool = False
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.outputs.get(name, default)
+
+    @property
+    def failed(self) -> List[str]:
+        return [m.name for m in self.metrics.values() if m.status in ("failed", "timeout", "skipped")]
+
+    @property
+    def incomplete(self) -> List[str]:
+        """Stages that had not settled when the result was taken (only after a deadline)."""
+        return [m.name for m in self.metrics.values() if m.status in ("pending", "running")]
+
+    def summary(self) -> str:
+        parts = [f"{m.name}={m.status}:{m.duration_ms:.0f}ms" for m in self.metrics.values()]
+        return f"pipeline {self.elapsed_ms:.0f}ms [" + ", ".join(parts) + "]"
+
+
+class PipelineError(RuntimeError):
+    pass
+
+
+class _StageTimeout(TimeoutError):
+    pass
+
+
+# While a stage is queued its timeout has not started, so the run loop checks back this often
+_START_POLL_SECONDS = 0.05
+
+
+class _Task:
+    """One stage invocation on its own thread; holds a worker slot from start until it ends or is abandoned."""
+
+    def __init__(self) -> None:
+        self.future: Future = Future()
+        self.started: Optional[float] = None  # perf_counter once the stage is actually running
+        self.holds_slot = False
+        self.lock = threading.Lock()
+
+
+class Pipeline:
+    """
+    A small DAG runner. Stages declare the values they consume and produce; run() starts
+    every stage as soon as its inputs are available, so independent sources run in
+    parallel and the critical path is only as long as the slowest dependency chain.
+
+    The max_workers slots, per-stage concurrency limits and the stage cache are shared by
+    every run of the same pipeline, so limits apply across concurrent briefs. A stage's
+    timeout counts from when it gets its slots, not from when it was queued; a stage that
+    times out gives its worker slot back, so hung calls cannot starve later runs.
+    """
+
+    def __init__(self, name: str, max_workers: int = 16):
+        self.name = name
+        self.max_workers = max_workers
+        self._stages: Dict[str, Stage] = {}
+        self._producers: Dict[str, str] = {}
+        self._init_runtime()
+
+    def _init_runtime(self) -> None:
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.max_workers)
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._cache: Dict[Tuple[str, Hashable], Tuple[float, Dict[str, Any]]] = {}
+
+    # Locks and worker threads cannot be pickled (Agent Engine pickles the agent on deploy)
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"name": self.name, "max_workers": self.max_workers,
+                "_stages": self._stages, "_producers": self._producers}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._init_runtime()
+
+    @property
+    def stages(self) -> List[Stage]:
+        return list(self._stages.values())
+
+    def add(self, stage: Stage) -> Stage:
+        if stage.name in self._stages:
+            raise PipelineError(f"Duplicate stage name: {stage.name}")
+        outputs = stage.outputs or (stage.name,)
+        for out in outputs:
+            if out in self._producers:
+                raise PipelineError(f"Output '{out}' of stage '{stage.name}' is already produced by '{self._producers[out]}'")
+        stage.inputs = tuple(stage.inputs)
+        stage.outputs = tuple(outputs)
+        self._stages[stage.name] = stage
+        for out in stage.outputs:
+            self._producers[out] = stage.name
+        try:
+            self._check_acyclic()
+        except PipelineError:
+            del self._stages[stage.name]
+            for out in stage.outputs:
+                del self._producers[out]
+            raise
+        return stage
+
+    def stage(self, name: Optional[str] = None, *, inputs=(), outputs=(), timeout: Optional[float] = None,
+              max_concurrency: Optional[int] = None, cache: Optional[CachePolicy] = None,
+              fallback: Optional[Callable[[BaseException], Any]] = None):
+        """Decorator form of add()."""
+        def register(func: Callable[..., Any]) -> Callable[..., Any]:
+            self.add(Stage(
+                name=name or func.__name__.lstrip("_"),
+                func=func,
+                inputs=tuple(inputs),
+                outputs=tuple(outputs),
+                timeout=timeout,
+                max_concurrency=max_concurrency,
+                cache=cache,
+                fallback=fallback,
+            ))
+            return func
+        return register
+
+    def _check_acyclic(self) -> None:
+        visiting, done = set(), set()
+
+        def visit(stage_name: str) -> None:
+            if stage_name in done:
+                return
+            if stage_name in visiting:
+                raise PipelineError(f"Cycle detected at stage '{stage_name}'")
+            visiting.add(stage_name)
+            for inp in self._stages[stage_name].inputs:
+                producer = self._producers.get(inp)
+                if producer:
+                    visit(producer)
+            visiting.discard(stage_name)
+            done.add(stage_name)
+
+        for stage_name in self._stages:
+            visit(stage_name)
+
+    def _get_semaphore(self, stage: Stage) -> Optional[threading.BoundedSemaphore]:
+        if not stage.max_concurrency:
+            return None
+        with self._lock:
+            sem = self._semaphores.get(stage.name)
+            if sem is None:
+                sem = self._semaphores[stage.name] = threading.BoundedSemaphore(stage.max_concurrency)
+            return sem
+
+    def _cache_get(self, stage: Stage, key: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get((stage.name, key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._cache[(stage.name, key)]
+                return None
+            return value
+
+    def _cache_put(self, stage: Stage, key: Hashable, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[(stage.name, key)] = (time.monotonic() + stage.cache.ttl_seconds, value)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    @staticmethod
+    def _as_outputs(stage: Stage, value: Any) -> Dict[str, Any]:
+        if len(stage.outputs) == 1:
+            return {stage.outputs[0]: value}
+        if not isinstance(value, dict) or any(out not in value for out in stage.outputs):
+            raise PipelineError(f"Stage '{stage.name}' must return a dict with keys {list(stage.outputs)}")
+        return {out: value[out] for out in stage.outputs}
+
+    def _submit(self, stage: Stage, kwargs: Dict[str, Any]) -> _Task:
+        task = _Task()
+        threading.Thread(target=self._invoke, args=(task, stage, kwargs, time.perf_counter()),
+                         name=f"{self.name}-{stage.name}", daemon=True).start()
+        return task
+
+    def _invoke(self, task: _Task, stage: Stage, kwargs: Dict[str, Any], submitted: float) -> None:
+        # Runs on the stage's thread; the future never holds an exception so timings survive failures
+        self._slots.acquire()
+        with task.lock:
+            task.holds_slot = True
+        sem = self._get_semaphore(stage)
+        if sem is not None:
+            sem.acquire()
+        started = task.started = time.perf_counter()
+        try:
+            outputs, error = self._as_outputs(stage, stage.func(**kwargs)), None
+        except Exception as e:
+            outputs, error = None, e
+        finally:
+            if sem is not None:
+                sem.release()
+            self._release_slot(task)
+        task.future.set_result((outputs, error, (started - submitted) * 1000, (time.perf_counter() - started) * 1000))
+
+    def _release_slot(self, task: _Task) -> None:
+        """Give back the task's worker slot, once: when it ends, or earlier when its run abandons it."""
+        with task.lock:
+            held, task.holds_slot = task.holds_slot, False
+        if held:
+            self._slots.release()
+
+    def run(self, inputs: Optional[Dict[str, Any]] = None, deadline: Optional[float] = None,
+            on_complete: Optional[Callable[[PipelineResult], None]] = None) -> PipelineResult:
+        """
+        Run every stage whose inputs can be satisfied and return the collected outputs.
+
+        With a deadline (seconds from now) the result is returned once the budget is spent:
+        stages still in flight are reported as "running" and stages that never started as
+        "pending". If on_complete is given, the remaining stages keep going in the
+        background and on_complete receives the full result when they are done.
+        """
+        run = _PipelineRun(self, inputs or {})
+        until = time.perf_counter() + deadline if deadline is not None else None
+        if run.advance(until):
+            result = run.result()
+            if on_complete is not None:
+                on_complete(result)
+            return result
+
+        partial = run.result(deadline_hit=True)
+        if on_complete is not None:
+            def finish_in_background() -> None:
+                run.advance(None)
+                try:
+                    on_complete(run.result())
+                except Exception as e:
+                    print(f"Pipeline '{self.name}' completion callback failed: {e}")
+
+            threading.Thread(target=finish_in_background, name=f"{self.name}-late", daemon=True).start()
+        return partial
+
+
+class _PipelineRun:
+    """Mutable state of one pipeline run; only ever advanced by one thread at a time."""
+
+    def __init__(self, pipeline: Pipeline, inputs: Dict[str, Any]):
+        self.pipeline = pipeline
+        self.started = time.perf_counter()
+        self.values: Dict[str, Any] = dict(inputs)
+        self.metrics = {name: StageMetrics(name=name) for name in pipeline._stages}
+        self.pending = dict(pipeline._stages)
+        self.running: Dict[Future, Tuple[Stage, _Task, Optional[Hashable]]] = {}
+
+    def result(self, deadline_hit: bool = False) -> PipelineResult:
+        # Snapshot, so a run that continues in the background does not mutate what callers hold
+        return PipelineResult(
+            outputs=dict(self.values),
+            metrics={name: replace(m) for name, m in self.metrics.items()},
+            elapsed_ms=(time.perf_counter() - self.started) * 1000,
+            deadline_hit=deadline_hit,
+        )
+
+    def _finish(self, stage: Stage, status: str, outputs: Optional[Dict[str, Any]] = None,
+                error: Optional[BaseException] = None) -> None:
+        m = self.metrics[stage.name]
+        m.status = status
+        if error is not None:
+            m.error = f"{type(error).__name__}: {error}"
+            if stage.fallback is not None:
+                try:
+                    outputs = self.pipeline._as_outputs(stage, stage.fallback(error))
+                except Exception as fallback_error:
+                    m.error += f" (fallback failed: {fallback_error})"
+        if outputs:
+            self.values.update(outputs)
+
+    def _resolvable(self, name: str) -> bool:
+        # An input is still obtainable if it is present, or its producer has not finished yet
+        if name in self.values:
+            return True
+        producer = self.pipeline._producers.get(name)
+        return producer is not None and self.metrics[producer].status in ("pending", "running")
+
+    def _schedule(self) -> None:
+        for stage in list(self.pending.values()):
+            if all(inp in self.values for inp in stage.inputs):
+                del self.pending[stage.name]
+                kwargs = {inp: self.values[inp] for inp in stage.inputs}
+                key = None
+                if stage.cache is not None:
+                    try:
+                        key = stage.cache.key(kwargs)
+                        cached = self.pipeline._cache_get(stage, key)
+                    except Exception:
+                        key, cached = None, None
+                    if cached is not None:
+                        self._finish(stage, "cached", cached)
+                        continue
+                self.metrics[stage.name].status = "running"
+                task = self.pipeline._submit(stage, kwargs)
+                self.running[task.future] = (stage, task, key)
+            elif not all(self._resolvable(inp) for inp in stage.inputs):
+                del self.pending[stage.name]
+                missing = [inp for inp in stage.inputs if not self._resolvable(inp)]
+                self._finish(stage, "skipped", error=PipelineError(f"missing inputs: {', '.join(missing)}"))
+
+    def advance(self, until: Optional[float]) -> bool:
+        """Drive the run until every stage has settled (True) or `until` passes (False)."""
+        while self.pending or self.running:
+            self._schedule()
+
+            if not self.running:
+                if self.pending:
+                    # Nothing in flight can produce the remaining inputs; loop again to mark them skipped
+                    continue
+                break
+
+            now = time.perf_counter()
+            if until is not None and now >= until:
+                return False
+            deadlines = []
+            for stage, task, _ in self.running.values():
+                if stage.timeout:
+                    started = task.started
+                    deadlines.append(started + stage.timeout if started is not None else now + _START_POLL_SECONDS)
+            if until is not None:
+                deadlines.append(until)
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+            done, _ = wait(list(self.running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                stage, _, key = self.running.pop(future)
+                outputs, error, queued_ms, duration_ms = future.result()
+                self.metrics[stage.name].queued_ms = queued_ms
+                self.metrics[stage.name].duration_ms = duration_ms
+                if error is not None:
+                    self._finish(stage, "failed", error=error)
+                else:
+                    if key is not None:
+                        self.pipeline._cache_put(stage, key, outputs)
+                    self._finish(stage, "ok", outputs)
+
+            now = time.perf_counter()
+            for future, (stage, task, _) in list(self.running.items()):
+                started = task.started
+                if stage.timeout and started is not None and now >= started + stage.timeout:
+                    # The thread cannot be interrupted: its result is discarded and its worker
+                    # slot freed now, so it no longer counts against later stages and runs
+                    self.running.pop(future)
+                    self.pipeline._release_slot(task)
+                    self.metrics[stage.name].duration_ms = stage.timeout * 1000
+                    self._finish(stage, "timeout", error=_StageTimeout(f"stage exceeded {stage.timeout:.1f}s"))
+        return True
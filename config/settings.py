@@ -26,6 +26,33 @@ class Settings:
     brief_lead_minutes: int
     historical_lookback_days: int
 
+    # Latency budgets (seconds) for a whole brief; 0 waits for every source
+    brief_deadline_interactive_seconds: float
+    brief_deadline_scheduled_seconds: float
+
+    # Gemini prompt budgets (estimated tokens) for packed document / chat context
+    gemini_document_token_budget: int
+    gemini_chat_token_budget: int
+
+    # Ceiling on bytes streamed from Drive per file when extracting content
+    drive_download_max_bytes: int
+
+    # Local PDF / Office text extraction
+    document_extract_max_bytes: int
+    document_extract_max_pages: int
+    gmail_attachment_max_bytes: int
+
+    # Calendars to read: "primary", "selected", "all" or comma-separated calendar IDs
+    calendar_selection: str
+
+    # Local Drive metadata index (kept current from the Drive changes feed), full-text index
+    # of documents already read and Gmail attachment index (kept current from mailbox
+    # history); all live in drive_index_dir ("" = temp dir)
+    drive_index_enabled: bool
+    fulltext_index_enabled: bool
+    gmail_index_enabled: bool
+    drive_index_dir: str
+
     # Slack
     slack_bot_token: str
     slack_signing_secret: str
@@ -46,6 +73,19 @@ def load_settings() -> Settings:
         sub_agent_model=_get_env("SUB_AGENT_MODEL", default="gemini-2.5-flash"),
         brief_lead_minutes=int(_get_env("BRIEF_LEAD_MINUTES", default="30")),
         historical_lookback_days=int(_get_env("HISTORICAL_LOOKBACK_DAYS", default="90")),
+        brief_deadline_interactive_seconds=float(_get_env("BRIEF_DEADLINE_INTERACTIVE_SECONDS", default="25")),
+        brief_deadline_scheduled_seconds=float(_get_env("BRIEF_DEADLINE_SCHEDULED_SECONDS", default="0")),
+        gemini_document_token_budget=int(_get_env("GEMINI_DOCUMENT_TOKEN_BUDGET", default="8000")),
+        gemini_chat_token_budget=int(_get_env("GEMINI_CHAT_TOKEN_BUDGET", default="2000")),
+        drive_download_max_bytes=int(_get_env("DRIVE_DOWNLOAD_MAX_BYTES", default="1048576")),
+        document_extract_max_bytes=int(_get_env("DOCUMENT_EXTRACT_MAX_BYTES", default="26214400")),
+        document_extract_max_pages=int(_get_env("DOCUMENT_EXTRACT_MAX_PAGES", default="50")),
+        gmail_attachment_max_bytes=int(_get_env("GMAIL_ATTACHMENT_MAX_BYTES", default="10485760")),
+        calendar_selection=_get_env("CALENDAR_SELECTION", default="primary"),
+        drive_index_enabled=_get_env("DRIVE_INDEX_ENABLED", default="true").lower() == "true",
+        fulltext_index_enabled=_get_env("FULLTEXT_INDEX_ENABLED", default="true").lower() == "true",
+        gmail_index_enabled=_get_env("GMAIL_INDEX_ENABLED", default="true").lower() == "true",
+        drive_index_dir=_get_env("DRIVE_INDEX_DIR", default=""),
         slack_bot_token=_get_env("SLACK_BOT_TOKEN", default=""),
         slack_signing_secret=_get_env("SLACK_SIGNING_SECRET", default=""),
         google_chat_enabled=_get_env("GOOGLE_CHAT_ENABLED", default="false").lower() == "true",
@@ -1,6 +1,5 @@
 import os.path
 from datetime import datetime
-from typing import Dict
 from typing import List
 from dotenv import load_dotenv
 
@@ -14,6 +13,13 @@ from google.adk.agents.callback_context import CallbackContext
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 
+# Shared slot engine lives in the repo's tools package
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from tools.free_busy import query_busy
+from tools.free_slots import fetch_attendee_timezones, parse_datetime, suggest_meeting_slots
+from tools.whoami import session_identity
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -34,19 +40,9 @@ def current_datetime(callback_context: CallbackContext):
 
 
 def whoami(callback_context: CallbackContext, creds):
-  user_info_service = build('oauth2', 'v2', credentials=creds)
-  user_info = user_info_service.userinfo().get().execute()
-  user_email = user_info.get('email')
-  callback_context.state['_user_email'] = user_email
-
-  calendar_service = build('calendar', 'v3', credentials=creds)
-  # Get the user's primary calendar to find their timezone
-  calendar_list_entry = calendar_service.calendarList().get(
-      calendarId='primary').execute()
-  user_timezone = calendar_list_entry.get('timeZone')
-  callback_context.state['_user_tz'] = user_timezone
-
-  print(f"User's primary calendar timezone: {user_timezone}")
+  # Email and primary calendar timezone; resolved once per session token, not every turn
+  identity = session_identity(callback_context.state, creds)
+  print(f"User's primary calendar timezone: {identity.timezone}")
 
 
 def prereq_setup(callback_context: CallbackContext):
@@ -60,19 +56,18 @@ def prereq_setup(callback_context: CallbackContext):
 def check_free_busy(attendee_emails: List[str],
                     start_time: str,
                     end_time: str,
+                    duration_minutes: int,
                     tool_context: ToolContext,
                     ):
 
   print("check_free_busy in progress...")
 
   try:
-    formatted_attendee_emails: List[Dict[str, str]] = []
     if not isinstance(attendee_emails, list):
       raise TypeError("Input must be a list.")
     for email in attendee_emails:
       if not isinstance(email, str):
         raise TypeError("Each element in the input list must be a string.")
-      formatted_attendee_emails.append({"id": email})
       print("Email: " + email)
 
     service = None
@@ -89,19 +84,23 @@ def check_free_busy(attendee_emails: List[str],
       # Catch any other unexpected errors during the build process
       print(f"An unexpected error occurred: {e}")
 
-    # service = build('calendar', 'v3')
-    free_busy_request_body = {
-        'timeMin': start_time,
-        'timeMax': end_time,
-        'items': formatted_attendee_emails
-    }
-    print(f"Request Body: {free_busy_request_body}")
+    # Times without an offset are in the user's timezone
+    user_tz = tool_context.state.get("_user_tz") or "UTC"
+
+    # Sharded by attendees and time window, run concurrently, cached briefly per attendee
+    freebusy_result = query_busy(creds, attendee_emails,
+                                 parse_datetime(start_time, user_tz), parse_datetime(end_time, user_tz))
 
-    freebusy_result = service.freebusy().query(
-        body=free_busy_request_body).execute()
+    print(f"Busy calendars: {len(freebusy_result.busy)}, errors: {freebusy_result.errors}")
 
-    print(f"Response Body: {freebusy_result}")
-    return freebusy_result
+    # Compute the common free slots here instead of leaving it to the model
+    attendee_timezones = fetch_attendee_timezones(service, attendee_emails, user_tz)
+    slots = suggest_meeting_slots(freebusy_result, start_time, end_time,
+                                  duration_minutes=duration_minutes,
+                                  attendee_timezones=attendee_timezones,
+                                  default_tz=user_tz)
+    print(f"Free slots: {slots}")
+    return slots
 
   except Exception as e:
     print(f'An error occurred: {e}')
@@ -133,8 +132,9 @@ check_availability = LlmAgent(
                 - Whatever format they provide, use ISO8601 format internally
                 - Confirm if they want to proceed with scheduling a meeting. If yes, move to the next step.
             - Check Attendee Availability
-                - If you have the attendeeEmails use the check_free_busy tool to get busy timeslots. Make sure date and time are ISO8601
-                - Once you have the busy timeslots, identify the free timeslots. We are looking for overlapping free timeslots that apply to ALL attendees√√√
+                - If you have the attendeeEmails use the check_free_busy tool. Make sure date and time are ISO8601 and pass the meeting length in minutes as duration_minutes (default to 30 if not given)
+                - The tool returns free_slots that are already free for ALL attendees within each attendee's working hours, ranked best first. Use them as-is; do not recompute availability
+                - Mention any unavailable_calendars whose availability could not be checked
                 - If there are no overlapping free timeslots for all attendees during the provided timeframe, tell the user and suggest alternative times using the same dates when they are all free
                 - Inform User:
                     - Present up to 5 overlapping free timeslots as a bulleted list formatted in their timezone. 
@@ -1,8 +1,6 @@
 import os.path
 from datetime import datetime
-from typing import Dict
 from typing import List
-import time
 import json
 
 from dotenv import load_dotenv
@@ -25,6 +23,13 @@ from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 
+# Shared slot engine lives in the repo's tools package
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from tools.free_busy import query_busy
+from tools.free_slots import fetch_attendee_timezones, parse_datetime, suggest_meeting_slots
+from tools.whoami import session_identity
+
 """
 This agent works with agent-engine using the Dev UI and handles it's own oauth. 
 The other agent (agent.py) is designed to work with Agentspace directly
@@ -57,9 +62,7 @@ vertexai.init(
 
 
 def current_datetime(callback_context: CallbackContext):
-  callback_context.state['_tz'] = time.tzname[time.daylight]
-  print("*** Server Timezone: "+time.tzname[time.daylight])
-# get current date time
+  # get current date time
   now = datetime.now()
   formatted_time = now.strftime("%Y-%m-%d %H:%M:%S")
   callback_context.state["_time"] = formatted_time
@@ -71,11 +74,10 @@ def whoami(callback_context: CallbackContext):
     creds = Credentials.from_authorized_user_info(
         callback_context.state["calendar_tool_tokens"], SCOPES
     )
-    user_info_service = build('oauth2', 'v2', credentials=creds)
-    user_info = user_info_service.userinfo().get().execute()
-    user_email = user_info.get('email')
-    # return user_email
-    callback_context.state['my_email'] = user_email
+    # Resolved once per session token, not every turn; the timezone is the user's primary calendar's
+    session_identity(callback_context.state, creds, email_key='my_email')
+  elif "_user_tz" not in callback_context.state:
+    callback_context.state["_user_tz"] = "UTC"
 
 
 def prereq_setup(callback_context: CallbackContext):
@@ -172,17 +174,16 @@ def auth_user(tool_context: ToolContext):
 def check_free_busy(attendeeEmails: List[str],
     startTime: str,
     endTime: str,
+    durationMinutes: int,
     tool_context: ToolContext,
 ):
 
   try:
-    formatted_attendee_emails: List[Dict[str, str]] = []
     if not isinstance(attendeeEmails, list):
       raise TypeError("Input must be a list.")
     for email in attendeeEmails:
       if not isinstance(email, str):
         raise TypeError("Each element in the input list must be a string.")
-      formatted_attendee_emails.append({"id": email})
 
     if "calendar_tool_tokens" in tool_context.state:
       creds = Credentials.from_authorized_user_info(
@@ -190,16 +191,23 @@ def check_free_busy(attendeeEmails: List[str],
       )
 
     service = build('calendar', 'v3', credentials=creds)
-    freebusy_request_body = {
-        'timeMin': startTime,
-        'timeMax': endTime,
-        # 'timeZone': 'America/New_York',
-        'items': formatted_attendee_emails
-    }
-    freebusy_result = service.freebusy().query(body=freebusy_request_body).execute()
+    # Times without an offset are in the user's timezone
+    user_tz = tool_context.state.get("_user_tz") or "UTC"
+
+    # Sharded by attendees and time window, run concurrently, cached briefly per attendee
+    freebusy_result = query_busy(creds, attendeeEmails,
+                                 parse_datetime(startTime, user_tz), parse_datetime(endTime, user_tz))
+
+    print(freebusy_result.errors)
 
-    print(freebusy_result)
-    return freebusy_result
+    # Compute the common free slots here instead of leaving it to the model
+    attendee_timezones = fetch_attendee_timezones(service, attendeeEmails, user_tz)
+    slots = suggest_meeting_slots(freebusy_result, startTime, endTime,
+                                  duration_minutes=durationMinutes,
+                                  attendee_timezones=attendee_timezones,
+                                  default_tz=user_tz)
+    print(slots)
+    return slots
 
   except Exception as e:
     print(f'An error occurred: {e}')
@@ -215,7 +223,7 @@ check_availability = LlmAgent(
         Assumptions:
          - Their working hours are 9AM-5PM in their timezone on weekdays (no weekends) and they only want to schedule during those times unless explicitly told otherwise. 
          Do not check weekends for availability. You accept both single dates and date ranges.
-         - The timezone is {_tz}
+         - The timezone is {_user_tz}
          - The current datetime is {_time}
          - My email is {my_email} and you should add it to attendeeEmails by default
          - You can use date ranges and relative dates, no need for exact dates
@@ -230,8 +238,9 @@ check_availability = LlmAgent(
                 - Whatever format they provide, use ISO8601 format internally
                 - Confirm if they want to proceed with scheduling a meeting. If yes, move to the next step.
             - Check Attendee Availability
-                - If you have the attendeeEmails use the checkFreeBusy tool to get busy timeslots. Make sure date and time are ISO8601
-                - Once you have the busy timeslots, identify the free timeslots. We are looking for overlapping free timeslots that apply to ALL attendees√√√
+                - If you have the attendeeEmails use the checkFreeBusy tool. Make sure date and time are ISO8601 and pass the meeting length in minutes as durationMinutes (default to 30 if not given)
+                - The tool returns free_slots that are already free for ALL attendees within each attendee's working hours, ranked best first. Use them as-is; do not recompute availability
+                - Mention any unavailable_calendars whose availability could not be checked
                 - If there are no overlapping free timeslots for all attendees during the provided timeframe, tell the user and suggest alternative times using the same dates when they are all free
                 - Inform User:
                     - Present up to 5 overlapping free timeslots as a bulleted list formatted in their timezone. 
@@ -0,0 +1,76 @@
+"""
+Measure how long it takes to import the agent modules in a fresh interpreter.
+
+Agent Engine cold starts pay this cost before the first request is served, so
+keep an eye on it when adding module-level imports.
+
+Usage:
+    python scripts/bench_import_time.py
+    python scripts/bench_import_time.py --runs 10 agents.meeting_prep_agent tools.calendar_fetcher
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_MODULES = ["agents.meeting_prep_agent"]
+
+# Heavy dependencies that should only be imported when they are actually used
+HEAVY_MODULES = ["vertexai", "google.adk", "googleapiclient"]
+
+_PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(f"{{elapsed:.6f}}|{{','.join(loaded)}}")
+"""
+
+
+def _measure(module: str, env: dict) -> tuple[float, str]:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed, loaded = out.stdout.strip().splitlines()[-1].split("|")
+    return float(elapsed), loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("PYTHONPATH", REPO_ROOT)
+
+    for module in args.modules:
+        timings = []
+        loaded = ""
+        wall_start = time.perf_counter()
+        for _ in range(args.runs):
+            elapsed, loaded = _measure(module, env)
+            timings.append(elapsed)
+        wall = time.perf_counter() - wall_start
+        print(
+            f"{module}: median {statistics.median(timings) * 1000:.1f} ms, "
+            f"min {min(timings) * 1000:.1f} ms over {args.runs} runs "
+            f"(wall {wall:.1f}s); heavy modules loaded: {loaded or 'none'}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+import pytest
+
+from tools.cache import MemoryBackend, set_default_backend
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _memory_cache_backend():
+    # The default SQLite backend would carry cache entries from one test run into the next
+    set_default_backend(MemoryBackend())
+    yield
+    set_default_backend(None)
@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from tools.async_clients import AsyncApiError, AsyncGoogleClient, AsyncSlackClient
+from tools.multi_calendar import list_events_async
+
+CREDS = SimpleNamespace(token="tok")
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_google_pages_and_retries_rate_limits():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params.get("pageToken"))
+        assert request.headers["Authorization"] == "Bearer tok"
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        if request.url.params.get("pageToken") is None:
+            return httpx.Response(200, json={"files": [{"id": "a"}], "nextPageToken": "p2"})
+        return httpx.Response(200, json={"files": [{"id": "b"}]})
+
+    async def run():
+        async with _client(handler) as http:
+            return await AsyncGoogleClient(CREDS, http).list_files(q="name contains 'x'")
+
+    assert [f["id"] for f in asyncio.run(run())] == ["a", "b"]
+    assert calls == [None, None, "p2"]
+
+
+def test_slack_cursor_pagination_and_errors():
+    def handler(request):
+        form = dict(httpx.QueryParams(request.content.decode()))
+        if request.url.path.endswith("conversations.members"):
+            return httpx.Response(200, json={"ok": False, "error": "channel_not_found"})
+        if form.get("cursor") == "c2":
+            return httpx.Response(200, json={"ok": True, "channels": [{"id": "C2"}]})
+        return httpx.Response(200, json={"ok": True, "channels": [{"id": "C1"}],
+                                         "response_metadata": {"next_cursor": "c2"}})
+
+    async def run():
+        async with _client(handler) as http:
+            slack = AsyncSlackClient("xoxb", http)
+            channels = await slack.conversations_list()
+            with pytest.raises(AsyncApiError, match="channel_not_found"):
+                await slack.conversations_members("C9")
+            return channels
+
+    assert [c["id"] for c in asyncio.run(run())] == ["C1", "C2"]
+
+
+def test_slack_rate_limits_pause_the_shared_budget_and_identical_calls_coalesce():
+    from tools.slack_rate_limit import limiter_for
+
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"ok": True, "channels": [{"id": "C1"}]})
+
+    async def run():
+        async with _client(handler) as http:
+            # Separate clients, as separate briefs would have, sharing one workspace token
+            return await asyncio.gather(*(AsyncSlackClient("xoxb-async-429", http).conversations_list()
+                                          for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert all([c["id"] for c in channels] == ["C1"] for channels in results)
+    assert calls == ["/api/conversations.list"] * 2  # One request, retried once
+    paused_until = limiter_for("xoxb-async-429")._buckets["conversations.list"][2]
+    assert paused_until > 0  # Every caller of the method was held back
+
+
+def test_hundreds_of_calls_in_flight_on_one_loop():
+    in_flight = peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[-1]})
+
+    async def run():
+        async with _client(handler) as http:
+            google = AsyncGoogleClient(CREDS, http)
+            return await asyncio.gather(*(google.get_message(f"m{i}") for i in range(300)))
+
+    results = asyncio.run(run())
+    assert [r["id"] for r in results] == [f"m{i}" for i in range(300)]
+    assert peak >= 200
+
+
+def test_list_events_async_merges_calendars():
+    start = datetime(2025, 6, 2, 9, tzinfo=timezone.utc)
+
+    def event(event_id, hours):
+        s = start + timedelta(hours=hours)
+        return {"id": event_id, "start": {"dateTime": s.isoformat()},
+                "end": {"dateTime": (s + timedelta(minutes=30)).isoformat()}}
+
+    events = {"primary": [event("p1", 1), event("p2", 4)], "team": [event("t1", 2)]}
+
+    def handler(request):
+        if request.url.path.endswith("calendarList"):
+            return httpx.Response(200, json={"items": [{"id": "me@x.com", "primary": True},
+                                                       {"id": "team", "selected": True}, {"id": "hidden"}]})
+        calendar_id = request.url.path.split("/calendars/")[1].split("/")[0]
+        return httpx.Response(200, json={"items": events[calendar_id]})
+
+    async def run():
+        async with _client(handler) as http:
+            return await list_events_async(CREDS, start, start + timedelta(days=1),
+                                           client=AsyncGoogleClient(CREDS, http))
+
+    assert [e.id for e in asyncio.run(run())] == ["p1", "t1", "p2"]
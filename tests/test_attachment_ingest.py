@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from tools import attachment_ingest
+from tools.attachment_ingest import ingest_event_attachments
+
+
+class _Req:
+    def __init__(self, drive, kind, **params):
+        self.drive, self.kind, self.params = drive, kind, params
+
+    def execute(self):
+        self.drive.calls.append(self.kind)
+        return self.drive.respond(self.kind, self.params)
+
+
+class _FakeDrive:
+    """Folders, shortcuts and files in memory; counts HTTP calls (a batch counts once)."""
+
+    def __init__(self, file_ids):
+        self.files_by_id = {fid: {"id": fid, "name": f"Doc {fid}", "mimeType": "text/plain"} for fid in file_ids}
+        self.folders = {}  # (parent, name) -> id
+        self.shortcuts = []  # (parent, target)
+        self.calls = []
+
+    def files(self):
+        return self
+
+    def list(self, q, fields, pageSize, pageToken=None):
+        return _Req(self, "list", q=q)
+
+    def get(self, fileId, fields):
+        return _Req(self, "get", fileId=fileId)
+
+    def create(self, body, fields):
+        return _Req(self, "create", body=body)
+
+    def respond(self, kind, params):
+        if kind == "get":
+            return self.files_by_id[params["fileId"]]
+        if kind == "create":
+            body = params["body"]
+            if "shortcutDetails" in body:
+                self.shortcuts.append((body["parents"][0], body["shortcutDetails"]["targetId"]))
+                return {"id": f"s{len(self.shortcuts)}"}
+            folder_id = f"f{len(self.folders)}"
+            self.folders[((body.get("parents") or [""])[0], body["name"])] = folder_id
+            return {"id": folder_id}
+        q = params["q"]
+        if "shortcut" in q:
+            return {"files": [{"id": "s", "shortcutDetails": {"targetId": t}} for p, t in self.shortcuts if f"'{p}'" in q]}
+        return {"files": [{"id": i} for (p, n), i in self.folders.items() if f"name = '{n}'" in q and f"'{p}'" in q or
+                          (not p and f"name = '{n}'" in q and " in parents" not in q)]}
+
+    def new_batch_http_request(self, callback):
+        drive = self
+
+        class _Batch:
+            def __init__(self):
+                self.requests = []
+
+            def add(self, request, request_id):
+                self.requests.append((request_id, request))
+
+            def execute(self):
+                drive.calls.append("batch")
+                for request_id, request in self.requests:
+                    callback(request_id, drive.respond(request.kind, request.params), None)
+
+        return _Batch()
+
+
+@pytest.fixture(autouse=True)
+def _env(monkeypatch):
+    for name, value in {"GOOGLE_CLOUD_PROJECT": "p", "STAGING_BUCKET": "gs://b", "AUTH_ID": "a"}.items():
+        monkeypatch.setenv(name, value)
+    attachment_ingest.clear_folder_cache()
+    yield
+    attachment_ingest.clear_folder_cache()
+
+
+def test_reingest_is_batched_and_creates_no_duplicate_shortcuts():
+    file_ids = [f"file{i}" for i in range(20)]
+    drive = _FakeDrive(file_ids)
+    context = SimpleNamespace(state={"temp:a": "token", "_user_email": "me@example.com"})
+    event = {"id": "evt1", "attachments": [{"fileId": fid} for fid in file_ids]}
+
+    refs = ingest_event_attachments(context, event, service=drive)
+    assert [r.title for r in refs] == [f"Doc {fid}" for fid in file_ids]
+    assert len(drive.shortcuts) == 20
+    # Root + event folder lookups/creates, one metadata batch, one shortcut batch
+    assert drive.calls.count("batch") == 2 and "get" not in drive.calls
+
+    drive.calls.clear()
+    event["attachments"].append({"fileUrl": "https://drive.google.com/file/d/new/view"})
+    drive.files_by_id["new"] = {"id": "new", "name": "Doc new", "mimeType": "text/plain"}
+    ingest_event_attachments(context, event, service=drive)
+
+    # Folders come from the cache: one shortcut listing, one metadata batch, one batch for the new shortcut
+    assert drive.calls == ["batch", "list", "batch"]
+    assert len(drive.shortcuts) == 21 and len(set(drive.shortcuts)) == 21
+
+
+def test_failed_folder_lookups_are_not_cached(monkeypatch):
+    results = iter([(None, False), ("f1", True)])
+    monkeypatch.setattr(attachment_ingest, "_ensure_folder", lambda service, name, parent: next(results))
+
+    assert attachment_ingest._cached_folder(None, "u", "Meeting Attachments", None) == (None, False)
+    assert attachment_ingest._cached_folder(None, "u", "Meeting Attachments", None) == ("f1", True)
+    assert attachment_ingest._cached_folder(None, "u", "Meeting Attachments", None) == ("f1", False)
+
+
+def test_folder_ids_survive_access_token_rotation():
+    drive = _FakeDrive(["file0"])
+    event = {"id": "evt1", "attachments": [{"fileId": "file0"}]}
+    ingest_event_attachments(SimpleNamespace(state={"temp:a": "token", "_user_email": "me@example.com"}), event,
+                             service=drive)
+
+    drive.calls.clear()
+    rotated = SimpleNamespace(state={"temp:a": "rotated", "_user_email": "me@example.com"})
+    ingest_event_attachments(rotated, event, service=drive)
+
+    # Same user, new access token: no folder lookups, just the shortcut listing and metadata batch
+    assert drive.calls == ["batch", "list"]
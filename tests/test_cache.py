@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from tools.cache import Cache, FileSystemBackend, MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite", "filesystem"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    return FileSystemBackend(str(tmp_path / "cache"))
+
+
+def test_ttl_user_partitions_and_metrics(backend):
+    briefs = Cache("briefs", ttl_seconds=60, backend=backend)
+    briefs.set("evt1", {"markdown": "# Brief"}, user="alice@x.com")
+
+    assert briefs.get("evt1", user="alice@x.com") == {"markdown": "# Brief"}
+    assert briefs.get("evt1", user="bob@x.com") is None
+    briefs.set("evt2", "short-lived", user="alice@x.com", ttl_seconds=-1)
+    assert briefs.get("evt2", user="alice@x.com") is None
+
+    briefs.set("evt1", "bob's", user="bob@x.com")
+    briefs.clear_user("alice@x.com")
+    assert briefs.get("evt1", user="alice@x.com") is None
+    assert briefs.get("evt1", user="bob@x.com") == "bob's"
+
+    # Namespaces do not see each other's keys
+    assert Cache("other", ttl_seconds=60, backend=backend).get("evt1", user="bob@x.com") is None
+    assert (briefs.metrics.hits, briefs.metrics.misses, briefs.metrics.writes) == (2, 3, 3)
+
+
+def test_byte_ceiling_evicts_least_recently_used(backend):
+    texts = Cache("texts", ttl_seconds=60, max_bytes=3000, backend=backend)
+    for key in ("a", "b", "c"):
+        texts.set(key, "x" * 900)
+        time.sleep(0.01)
+    texts.get("a")  # Now more recently used than b
+    time.sleep(0.01)
+    texts.set("d", "x" * 900)
+
+    assert texts.get("b") is None
+    assert all(texts.get(k) is not None for k in ("a", "c", "d"))
+    assert texts.metrics.evictions == 1
+
+    texts.set("huge", "x" * 5000)  # Larger than the whole namespace: not cached
+    assert texts.get("huge") is None and texts.get("a") is not None
+
+
+def test_persistent_backends_survive_reopening(tmp_path):
+    for make in (lambda: SQLiteBackend(str(tmp_path / "c.sqlite3")), lambda: FileSystemBackend(str(tmp_path / "c"), b"secret")):
+        Cache("identity", ttl_seconds=60, backend=make()).set("tok", ("me@x.com", "UTC"))
+        assert Cache("identity", ttl_seconds=60, backend=make()).get("tok") == ("me@x.com", "UTC")
+
+
+def test_filesystem_entries_must_carry_our_signature(tmp_path):
+    root = str(tmp_path / "shared")
+    Cache("identity", ttl_seconds=60, backend=FileSystemBackend(root, b"secret")).set("tok", "me@x.com")
+
+    assert Cache("identity", ttl_seconds=60, backend=FileSystemBackend(root, b"secret")).get("tok") == "me@x.com"
+    assert Cache("identity", ttl_seconds=60, backend=FileSystemBackend(root, b"other")).get("tok") is None
+
+    # A file rewritten by someone without the secret is never unpickled
+    (path,) = [p for p in (tmp_path / "shared" / "identity").iterdir()]
+    data = path.read_bytes()
+    path.write_bytes(data[:-1] + bytes([data[-1] ^ 1]))
+    assert Cache("identity", ttl_seconds=60, backend=FileSystemBackend(root, b"secret")).get("tok") is None
+
+
+def test_backend_failures_do_not_escape(tmp_path):
+    class Broken(MemoryBackend):
+        def delete(self, namespace, key):
+            raise OSError("bucket unmounted")
+
+        def clear(self, namespace, prefix=""):
+            raise OSError("bucket unmounted")
+
+    cache = Cache("texts", ttl_seconds=60, backend=Broken())
+    cache.delete("a")
+    cache.clear()
+    cache.clear_user("alice@x.com")
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+
+from tools.calendar_event import CalendarEvent
+
+
+def test_parses_event_once_into_epoch_times():
+    event = CalendarEvent.from_api(
+        {
+            "id": "e1",
+            "summary": "Planning",
+            "start": {"dateTime": "2025-06-02T10:00:00-07:00"},
+            "end": {"dateTime": "2025-06-02T10:30:00-07:00"},
+            "attendees": [{"email": "a@x.com", "responseStatus": "accepted"}],
+            "recurringEventId": "r1",
+        },
+        calendar_id="team",
+    )
+
+    assert event.start_ts == datetime(2025, 6, 2, 17, tzinfo=timezone.utc).timestamp()
+    assert event.end_ts - event.start_ts == 30 * 60
+    assert event.start_iso == "2025-06-02T17:00:00+00:00"
+    assert event.local_start().strftime("%I:%M %p") == "10:00 AM"
+    assert event.attendees[0].response_status == "accepted"
+    assert event.calendar_id == "team" and event.description == ""
+    assert not hasattr(event, "__dict__")
+
+
+def test_all_day_event():
+    event = CalendarEvent.from_api({"id": "e2", "start": {"date": "2025-06-02"}, "end": {"date": "2025-06-03"}})
+
+    assert event.all_day
+    assert event.end_ts - event.start_ts == 86400
+    assert event.overlaps(event.start_ts + 3600, event.start_ts + 7200)
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+from tools.calendar_event import CalendarEvent
+from tools.calendar_queries import filter_events, query_events
+
+DAY = datetime(2025, 6, 2, tzinfo=timezone.utc)
+
+
+def _event(event_id, hour, attendees=(), **extra):
+    # attendees: emails, or full attendee dicts
+    start = DAY + timedelta(hours=hour)
+    item = {
+        "id": event_id,
+        "summary": event_id,
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": (start + timedelta(minutes=30)).isoformat()},
+        "attendees": [a if isinstance(a, dict) else {"email": a} for a in attendees],
+    }
+    item.update(extra)
+    return CalendarEvent.from_api(item)
+
+
+def test_filters_by_attendee_and_keyword_and_skips_declined():
+    events = [
+        _event("Roadmap sync", 9, ["alice@x.com", "me@x.com"]),
+        _event("Hiring loop", 10, ["bob@x.com"], description="Roadmap candidates"),
+        _event("Roadmap review", 11, ["alice@x.com", {"email": "me@x.com", "self": True, "responseStatus": "declined"}]),
+    ]
+
+    assert [e.id for e in filter_events(events, attendee="ALICE")] == ["Roadmap sync"]
+    assert [e.id for e in filter_events(events, keyword="roadmap")] == ["Roadmap sync", "Hiring loop"]
+    assert len(filter_events(events, keyword="roadmap", include_declined=True)) == 3
+
+
+def test_counts_per_local_day():
+    offsite = _event("offsite", 0, start={"date": "2025-06-03"}, end={"date": "2025-06-04"})
+    events = [_event("all hands", 14), _event("late", 23), offsite]
+    result = query_events(events, "America/New_York", limit=2)
+
+    # 23:00 UTC is 19:00 in New York; the all-day event keeps its calendar date
+    assert result["count"] == 3
+    assert result["count_by_day"] == {"2025-06-02": 2, "2025-06-03": 1}
+    assert result["truncated"] and len(result["meetings"]) == 2
+    assert result["meetings"][1]["start"] == "2025-06-02T19:00:00-04:00"
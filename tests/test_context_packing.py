@@ -0,0 +1,38 @@
+from agents.context_packing import ContextItem, estimate_tokens, pack_context, split_passages
+
+
+def test_split_passages_respects_chunk_size():
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 60 for i in range(5)) + "\n" + "x" * 2000
+    passages = split_passages(text, max_tokens=50)
+    assert all(estimate_tokens(p) <= 50 for p in passages)
+    assert "".join(passages).replace("\n", "").count("x") == 2000
+
+
+def test_pack_prefers_relevant_passages_over_prefix():
+    filler = "\n\n".join(f"Item {i}: unrelated filler about office snacks, parking and desk {i * 7}." for i in range(40))
+    doc = filler + "\n\nThe roadmap budget for Q3 launch needs approval.\n\n" + filler
+    packed = pack_context([ContextItem("doc", doc)], "Q3 launch roadmap budget", token_budget=120, chunk_tokens=50)
+    assert packed[0].truncated
+    assert packed[0].tokens <= 120
+    assert any("roadmap budget" in c for c in packed[0].chunks)
+
+
+def test_pack_dedupes_repeated_passages_and_splits_budget_by_relevance():
+    shared = "Quoted reply: the launch date moved to Friday after the vendor review."
+    items = [
+        ContextItem(name, shared + "\n\n" + "\n\n".join(
+            f"{name} section {i} covers launch logistics, staffing plan {i * 3} and open vendor questions." for i in range(20)
+        ), relevance=relevance)
+        for name, relevance in (("alpha", 3.0), ("beta", 1.0))
+    ]
+    packed = pack_context(items, "launch date", token_budget=300, chunk_tokens=60)
+    assert sum(p.tokens for p in packed) <= 300
+    assert sum(c.count("Quoted reply") for p in packed for c in p.chunks) == 1
+    assert packed[0].tokens > packed[1].tokens
+
+
+def test_pack_keeps_everything_that_fits_in_order():
+    items = [ContextItem(str(i), f"message {i}", header=f"@u{i}: ") for i in range(3)]
+    packed = pack_context(items, "anything", token_budget=1000)
+    assert [p.render() for p in packed] == ["message 0", "message 1", "message 2"]
+    assert not any(p.truncated for p in packed)
@@ -0,0 +1,89 @@
+import random
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from agents.dedupe import cluster_near_duplicates, hamming_distance, normalize_name, simhash
+
+
+@dataclass
+class Doc:
+    id: str
+    name: str
+    content: str = ""
+    score: float = 0.0
+    owner: str = "ann"
+
+
+def _cluster(docs):
+    return cluster_near_duplicates(docs, name=lambda d: d.name, text=lambda d: d.content,
+                                   prefer=lambda d: (d.score,), identity=lambda d: d.id,
+                                   scope=lambda d: d.owner)
+
+
+def test_normalize_name_strips_version_and_copy_markers():
+    for name in ("Q3 Plan.pptx", "Copy of Q3 Plan v2 FINAL (1).pptx", "q3_plan-final.pdf", "Q3 Plan (draft)"):
+        assert normalize_name(name) == "q3 plan"
+    assert normalize_name("Q4 Plan.pptx") != "q3 plan"
+
+
+def test_simhash_is_close_for_edits_and_far_for_different_text():
+    rng = random.Random(7)
+    vocab = [f"w{i}" for i in range(2000)]
+    base = [rng.choice(vocab) for _ in range(3000)]
+    edited = list(base)
+    edited[1500:1510] = ["changed"] * 10
+    other = [rng.choice(vocab) for _ in range(3000)]
+    assert hamming_distance(simhash(" ".join(base)), simhash(" ".join(edited))) <= 3
+    assert hamming_distance(simhash(" ".join(base)), simhash(" ".join(other))) > 10
+    assert simhash("too short") is None
+
+
+def test_clusters_by_id_name_and_content_and_keeps_best():
+    body = " ".join(f"budget line {i} for the launch" for i in range(200))
+    docs = [
+        Doc("a", "Launch Deck.pptx", score=1),
+        Doc("b", "Launch Deck v2 final (1).pdf", body, score=5),
+        Doc("a", "Launch Deck.pptx"),
+        Doc("c", "renamed.pdf", body + " appendix"),
+        Doc("d", "Hiring Plan"),
+        Doc("e", "Launch Deck", " ".join(f"totally different text {i} about hiring" for i in range(200))),
+    ]
+    clusters = _cluster(docs)
+    assert [c.representative.id for c in clusters] == ["b", "d", "e"]
+    assert sorted(d.id for d in clusters[0].duplicates) == ["a", "a", "c"]
+
+
+def test_generic_names_alone_do_not_merge_across_owners():
+    docs = [Doc("a", "Agenda.docx"), Doc("b", "Agenda", owner="bob"), Doc("c", "agenda (1).pdf")]
+    assert [[c.representative.id] + [d.id for d in c.duplicates] for c in _cluster(docs)] == [["a", "c"], ["b"]]
+
+
+def test_clustering_scales_linearly():
+    rng = random.Random(1)
+    docs = [Doc(str(i), f"doc {i}", " ".join(rng.choice("abcdefghij") * 3 for _ in range(40))) for i in range(3000)]
+    start = time.perf_counter()
+    clusters = _cluster(docs)
+    assert time.perf_counter() - start < 10
+    assert sum(1 + len(c.duplicates) for c in clusters) == len(docs)
+
+
+def test_brief_documents_merge_across_sources_only_on_the_same_owner(monkeypatch):
+    pytest.importorskip("dotenv")
+    for name, value in {"GOOGLE_CLOUD_PROJECT": "p", "STAGING_BUCKET": "gs://b", "AUTH_ID": "a"}.items():
+        monkeypatch.setenv(name, value)
+    import agents.meeting_prep_agent as m
+
+    docs = [
+        m.DriveDocument(id="f1", name="Q3 Plan.pptx", link="", source="drive", owner_email="ann@x.com"),
+        m.DriveDocument(id="f1", name="Q3 Plan.pptx", link="", source="attachment", owner_email="ann@x.com"),
+        m.DriveDocument(id="gmail_m1_2", name="Q3 Plan final (1).pptx", link="", source="gmail",
+                        owner_email="ann@x.com", message_id="m1"),
+        # Same generic name from unrelated senders: different attachments
+        m.DriveDocument(id="gmail_m2_1", name="Agenda.pdf", link="", source="gmail", owner_email="bob@x.com"),
+        m.DriveDocument(id="gmail_m3_1", name="Agenda.pdf", link="", source="gmail", owner_email="cy@y.com"),
+    ]
+    collapsed = m._collapse_duplicate_documents(docs)
+    assert [d.id for d in collapsed] == ["f1", "gmail_m2_1", "gmail_m3_1"]
+    assert collapsed[0].duplicate_count == 2
@@ -0,0 +1,97 @@
+import io
+import zipfile
+
+import pytest
+
+from tools import document_extract
+from tools.document_extract import (
+    DOCX_MIME_TYPE, PPTX_MIME_TYPE, XLSX_MIME_TYPE, DocumentExtractionError, extract_text, get_document_text,
+)
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+A = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+S = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+
+
+def _zip(parts):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, xml in parts.items():
+            zf.writestr(name, xml)
+    return buf.getvalue()
+
+
+def _docx(paragraphs):
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    return _zip({"word/document.xml": f"<w:document {W}><w:body>{body}</w:body></w:document>"})
+
+
+def test_extracts_docx_pptx_xlsx_text():
+    assert extract_text(_docx(["Agenda", "Budget review"]), DOCX_MIME_TYPE) == "Agenda\nBudget review"
+
+    slides = {f"ppt/slides/slide{i}.xml": f"<p:sld xmlns:p='p' {A}><a:p><a:r><a:t>Point {i}</a:t></a:r></a:p></p:sld>"
+              for i in (1, 2, 10)}
+    text = extract_text(_zip(slides), PPTX_MIME_TYPE, max_pages=2)
+    assert "Point 1" in text and "Point 2" in text and "Point 10" not in text
+
+    sheet = (f"<worksheet {S}><sheetData><row><c t='s'><v>0</v></c><c><v>42</v></c></row>"
+             f"<row><c t='inlineStr'><is><t>note</t></is></c></row></sheetData></worksheet>")
+    sst = f"<sst {S}><si><t>Revenue</t></si></sst>"
+    assert extract_text(_zip({"xl/worksheets/sheet1.xml": sheet, "xl/sharedStrings.xml": sst}), XLSX_MIME_TYPE) == \
+        "Sheet 1:\nRevenue,42\nnote"
+
+
+def test_extract_caps_characters_and_reports_bad_files():
+    text = extract_text(_docx([f"paragraph {i}" for i in range(1000)]), DOCX_MIME_TYPE, max_chars=100)
+    assert len(text) <= 100
+    with pytest.raises(DocumentExtractionError):
+        extract_text(b"not a zip", DOCX_MIME_TYPE)
+    with pytest.raises(DocumentExtractionError):
+        extract_text(b"", "image/png")
+
+
+def test_get_document_text_runs_in_pool_and_caches_by_revision():
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return _docx(["Quarterly plan"])
+
+    try:
+        assert get_document_text("f1:7", DOCX_MIME_TYPE, fetch) == "Quarterly plan"
+        assert get_document_text("f1:7", DOCX_MIME_TYPE, fetch) == "Quarterly plan"
+        assert len(fetches) == 1
+        get_document_text("f1:8", DOCX_MIME_TYPE, fetch)
+        assert len(fetches) == 2
+        get_document_text("f1:8", DOCX_MIME_TYPE, fetch, user="other-user")  # Cached per user
+        assert len(fetches) == 3
+    finally:
+        document_extract.shutdown_pool()
+        document_extract.clear_cache()
+
+
+def test_timed_out_extraction_stops_only_its_own_worker():
+    import threading
+
+    results = {}
+
+    def extract(name, timeout):
+        try:
+            results[name] = document_extract.extract_text_in_pool(_docx([name]), DOCX_MIME_TYPE, timeout=timeout)
+        except DocumentExtractionError as e:
+            results[name] = e
+
+    try:
+        # Far shorter than a spawned worker takes to start, so "slow" always overruns
+        threads = [threading.Thread(target=extract, args=("steady", 30)),
+                   threading.Thread(target=extract, args=("slow", 0.01))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert "timed out" in str(results["slow"])
+        assert results["steady"] == "steady"  # The other brief's parse was not disturbed
+        assert len(document_extract._workers) == 1
+        assert document_extract.extract_text_in_pool(_docx(["fast"]), DOCX_MIME_TYPE) == "fast"
+    finally:
+        document_extract.shutdown_pool()
@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+
+httplib2 = pytest.importorskip("httplib2")
+pytest.importorskip("googleapiclient")
+
+from tools.drive_content import download_text
+
+
+class _RangeHttp:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.requests = []
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        start, end = (int(x) for x in headers["range"].split("=")[1].split("-"))
+        self.requests.append((start, end))
+        chunk = self.data[start:end + 1]
+        resp = httplib2.Response({"status": 206, "content-range": f"bytes {start}-{start + len(chunk) - 1}/{len(self.data)}"})
+        return resp, chunk
+
+
+class _FakeDrive:
+    def __init__(self, data: bytes):
+        self.http = _RangeHttp(data)
+        self.exported = None
+
+    def files(self):
+        return self
+
+    def get_media(self, fileId):
+        return SimpleNamespace(http=self.http, uri=f"media/{fileId}", headers={})
+
+    def export_media(self, fileId, mimeType):
+        self.exported = mimeType
+        return self.get_media(fileId)
+
+
+def test_download_stops_at_byte_ceiling():
+    drive = _FakeDrive(b"x" * 10_000_000)
+    result = download_text(drive, "f1", max_bytes=1000, chunk_size=400)
+    assert result.truncated and result.bytes_read == 1000 and result.text == "x" * 1000
+    assert drive.http.requests[-1][0] < 1000  # never asked for bytes past the ceiling's chunk
+
+
+def test_download_small_export_and_partial_utf8_tail():
+    drive = _FakeDrive("héllo".encode("utf-8"))
+    result = download_text(drive, "f2", "text/plain", max_bytes=1000)
+    assert (result.text, result.truncated, drive.exported) == ("héllo", False, "text/plain")
+
+    cut = download_text(_FakeDrive("ééé".encode("utf-8")), "f3", max_bytes=3, chunk_size=3)
+    assert cut.truncated and cut.text == "é"
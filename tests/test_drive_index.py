@@ -0,0 +1,83 @@
+from tools.drive_index import DriveIndex
+
+
+class _Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class _FakeDrive:
+    def __init__(self, pages, changes=None):
+        self.pages = pages
+        self.change_pages = changes or {}
+        self.calls = []
+
+    def files(self):
+        return self
+
+    def changes(self):
+        return self
+
+    def getStartPageToken(self):
+        return _Request({"startPageToken": "t1"})
+
+    def list(self, **params):
+        if "q" in params:
+            self.calls.append("files.list")
+            index = int(params.get("pageToken") or 0)
+            page = {"files": self.pages[index]}
+            if index + 1 < len(self.pages):
+                page["nextPageToken"] = str(index + 1)
+            return _Request(page)
+        self.calls.append(("changes.list", params["pageToken"]))
+        return _Request(self.change_pages[params["pageToken"]])
+
+
+def _file(file_id, name, owner="alice@example.com", modified="2025-06-01T00:00:00Z"):
+    return {"id": file_id, "name": name, "mimeType": "application/pdf", "modifiedTime": modified,
+            "owners": [{"emailAddress": owner, "displayName": owner.split("@")[0]}], "parents": ["root"]}
+
+
+def test_seed_then_answer_name_and_owner_queries_locally(tmp_path):
+    drive = _FakeDrive([
+        [_file("a", "Q3 Roadmap", modified="2025-06-02T00:00:00Z"), _file("b", "Budget 2025", owner="bob@example.com")],
+        [_file("c", "Roadmap notes", owner="Bob@Example.com")],
+    ])
+    index = DriveIndex(str(tmp_path / "drive.sqlite3"))
+    assert not index.seeded
+
+    assert index.seed(drive) == 3
+    assert index.seeded
+    assert [f.id for f in index.search_names(["roadmap"])] == ["a", "c"]
+    assert [f.id for f in index.search_names(["roadmap", "notes"], match_all=True)] == ["c"]
+    assert {f.id for f in index.search_owners(["bob@example.com"])} == {"b", "c"}
+    assert index.search_names(["roadmap"])[0].owner_emails == ["alice@example.com"]
+
+
+def test_sync_applies_changes_feed(tmp_path):
+    drive = _FakeDrive(
+        [[_file("a", "Q3 Roadmap"), _file("b", "Budget")]],
+        changes={
+            "t1": {"nextPageToken": "t2", "changes": [{"fileId": "a", "removed": True}]},
+            "t2": {"newStartPageToken": "t3", "changes": [
+                {"fileId": "b", "file": _file("b", "Roadmap budget")},
+                {"fileId": "d", "file": dict(_file("d", "Old roadmap"), trashed=True)},
+            ]},
+            "t3": {"newStartPageToken": "t3", "changes": []},
+        },
+    )
+    index = DriveIndex(str(tmp_path / "drive.sqlite3"))
+    index.seed(drive)
+
+    removed = []
+    assert index.sync(drive) == 0  # Just seeded: within the sync interval
+    assert index.sync(drive, force=True, on_remove=removed.append) == 3
+    assert removed == ["a", "d"]
+    assert [f.name for f in index.search_names(["roadmap"])] == ["Roadmap budget"]
+
+    drive.calls.clear()
+    index.sync(drive, force=True)
+    assert drive.calls == [("changes.list", "t3")]
@@ -0,0 +1,92 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tools import free_busy
+from tools.free_busy import query_busy
+
+START = datetime(2025, 6, 2, 9, tzinfo=timezone.utc)
+
+
+class _Request:
+    def __init__(self, calendar, body):
+        self.calendar, self.body = calendar, body
+
+    def execute(self):
+        return self.calendar.respond(self.body)
+
+
+class _FakeCalendar:
+    def __init__(self, fail_for=()):
+        self.bodies = []
+        self.fail_for = set(fail_for)
+        self.lock = threading.Lock()
+
+    def freebusy(self):
+        return self
+
+    def query(self, body):
+        with self.lock:
+            self.bodies.append(body)
+        return _Request(self, body)
+
+    def respond(self, body):
+        if self.fail_for & {item["id"] for item in body["items"]}:
+            raise RuntimeError("backendError")
+        # Everyone is busy for the first hour of each window
+        start = datetime.fromisoformat(body["timeMin"])
+        busy = [{"start": start.isoformat(), "end": (start + timedelta(hours=1)).isoformat()}]
+        return {"calendars": {item["id"]: {"busy": busy} for item in body["items"]}}
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    free_busy.clear_cache()
+    yield
+    free_busy.clear_cache()
+
+
+def test_shards_by_calendars_and_window_and_merges():
+    fake = _FakeCalendar()
+    emails = [f"p{i}@x.com" for i in range(120)]
+    info = query_busy(None, emails, START, START + timedelta(days=90), service_factory=lambda: fake, cache_scope="u")
+
+    assert len(fake.bodies) == 3 * 2  # 50+50+20 calendars x two windows of at most 60 days
+    assert all(len(b["items"]) <= 50 for b in fake.bodies)
+    for body in fake.bodies:
+        span = datetime.fromisoformat(body["timeMax"]) - datetime.fromisoformat(body["timeMin"])
+        assert span <= timedelta(days=60)
+    assert set(info.busy) == set(emails) and not info.errors
+    # Busy blocks are clipped to the requested range: the first window started at midnight
+    assert info.busy["p0@x.com"][0][0] >= START
+
+
+def test_repeated_turns_hit_the_cache_but_failures_are_retried():
+    fake = _FakeCalendar(fail_for={"broken@x.com"})
+    emails = ["a@x.com", "broken@x.com"]
+    first = query_busy(None, emails, START, START + timedelta(days=3), service_factory=lambda: fake, cache_scope="u",
+                       calendars_per_request=1)
+    assert "broken@x.com" in first.errors and len(fake.bodies) == 2
+
+    # A narrower follow-up range is covered by the cached window for a@x.com
+    second = query_busy(None, ["a@x.com"], START + timedelta(days=1), START + timedelta(days=2),
+                        service_factory=lambda: fake, cache_scope="u")
+    assert len(fake.bodies) == 2 and second.busy["a@x.com"] == []
+
+    query_busy(None, emails, START, START + timedelta(days=3), service_factory=lambda: fake, cache_scope="u")
+    assert len(fake.bodies) == 3 and [i["id"] for i in fake.bodies[-1]["items"]] == ["broken@x.com"]
+
+    # Another user does not see this user's cached availability
+    query_busy(None, ["a@x.com"], START, START + timedelta(days=3), service_factory=lambda: fake, cache_scope="other")
+    assert len(fake.bodies) == 4
+
+
+def test_cache_purges_expired_scopes_and_is_bounded(monkeypatch):
+    fake = _FakeCalendar()
+    query_busy(None, ["a@x.com"], START, START + timedelta(hours=8), service_factory=lambda: fake,
+               cache_scope="old-token", cache_ttl_seconds=0)
+    monkeypatch.setattr(free_busy, "MAX_CACHE_ENTRIES", 3)
+    query_busy(None, [f"p{i}@x.com" for i in range(5)], START, START + timedelta(hours=8),
+               service_factory=lambda: fake, cache_scope="new-token")
+    assert list(free_busy._cache) == [("new-token", f"p{i}@x.com") for i in (2, 3, 4)]
@@ -0,0 +1,95 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tools import free_slots
+from tools.free_slots import WorkingHours, find_free_slots, free_intervals, merge_intervals, suggest_meeting_slots
+
+UTC = timezone.utc
+MONDAY = datetime(2025, 6, 2, tzinfo=UTC)
+
+
+def _at(hour, minute=0, day=0):
+    return MONDAY + timedelta(days=day, hours=hour, minutes=minute)
+
+
+def test_merge_intervals_sweeps_overlaps():
+    assert merge_intervals([(_at(10), _at(11)), (_at(9), _at(10)), (_at(13), _at(14)), (_at(13, 30), _at(13, 45))]) == [
+        (_at(9), _at(11)), (_at(13), _at(14))
+    ]
+
+
+def test_free_slots_respect_busy_times_and_working_hours():
+    busy = {"a@x.com": [(_at(9), _at(10, 30))], "b@x.com": [(_at(11), _at(16))]}
+    hours = WorkingHours(timezone="UTC")
+    assert free_intervals(busy, _at(0), _at(24), {k: hours for k in busy}) == [(_at(10, 30), _at(11)), (_at(16), _at(17))]
+
+    slots = find_free_slots(busy, _at(0), _at(24), timedelta(minutes=30), working_hours=hours)
+    # Slack around the slot outranks starting right after someone's meeting ends
+    assert [(s.start, s.end) for s in slots] == [(_at(16, 15), _at(16, 45)), (_at(10, 30), _at(11))]
+
+
+def test_per_attendee_timezones_limit_overlap():
+    busy = {"ny@x.com": [], "london@x.com": []}
+    hours = {"ny@x.com": WorkingHours(timezone="America/New_York"), "london@x.com": WorkingHours(timezone="Europe/London")}
+    # June: New York 13:00-21:00 UTC, London 08:00-16:00 UTC -> overlap 13:00-16:00 UTC on weekdays
+    free = free_intervals(busy, MONDAY, MONDAY + timedelta(days=7), hours)
+    assert free[0] == (_at(13), _at(16))
+    assert len(free) == 5  # no weekend slots
+
+
+def test_bitmap_matches_sweep_for_large_groups(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(5)
+    busy = {}
+    for i in range(50):
+        intervals = []
+        for _ in range(40):
+            start = _at(rng.randrange(0, 21 * 24 * 4) * 0.25)
+            intervals.append((start, start + timedelta(minutes=rng.choice([15, 30, 60, 90]))))
+        busy[f"p{i}@x.com"] = intervals
+    hours = {k: WorkingHours(timezone=rng.choice(["UTC", "Europe/Paris", "America/Chicago"])) for k in busy}
+    bitmap = free_intervals(busy, MONDAY, MONDAY + timedelta(days=21), hours)
+    monkeypatch.setattr(free_slots, "BITMAP_MIN_ATTENDEES", 10 ** 6)
+    assert bitmap == free_intervals(busy, MONDAY, MONDAY + timedelta(days=21), hours)
+
+
+def test_suggest_meeting_slots_formats_tool_response():
+    response = {"calendars": {
+        "a@x.com": {"busy": [{"start": "2025-06-02T09:00:00Z", "end": "2025-06-02T12:00:00Z"}]},
+        "ghost@x.com": {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []},
+    }}
+    result = suggest_meeting_slots(response, "2025-06-02T00:00:00Z", "2025-06-04T00:00:00Z", duration_minutes=60,
+                                   default_tz="UTC", max_slots=3)
+    assert result["unavailable_calendars"] == {"ghost@x.com": "notFound"}
+    assert len(result["free_slots"]) == 3
+    assert result["free_slots"][0]["start"] >= "2025-06-02T12:00:00+00:00"
+
+
+def test_times_without_offset_are_local_and_duplicate_attendees_batch_once():
+    assert free_slots.parse_datetime("2026-10-20T09:00", "America/New_York") == datetime(2026, 10, 20, 13, tzinfo=UTC)
+    assert free_slots.parse_datetime("2026-10-20T09:00Z", "America/New_York") == datetime(2026, 10, 20, 9, tzinfo=UTC)
+
+    added = []
+
+    class Batch:
+        def add(self, request, request_id):
+            assert request_id not in added
+            added.append(request_id)
+
+        def execute(self):
+            pass
+
+    class Service:
+        def new_batch_http_request(self, callback):
+            return Batch()
+
+        def calendars(self):
+            return self
+
+        def get(self, calendarId):
+            return calendarId
+
+    zones = free_slots.fetch_attendee_timezones(Service(), ["a@x.com", "b@x.com", "a@x.com"], "UTC")
+    assert added == ["a@x.com", "b@x.com"] and zones == {"a@x.com": "UTC", "b@x.com": "UTC"}
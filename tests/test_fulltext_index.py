@@ -0,0 +1,45 @@
+from tools.fulltext_index import FullTextIndex
+
+
+def test_ranked_search_over_drive_files_and_gmail_attachments(tmp_path):
+    index = FullTextIndex(str(tmp_path / "fts.sqlite3"))
+    index.add("doc1", "3", "Q3 roadmap", "Milestones for the billing migration and the new pricing page.")
+    index.add("doc2", "7", "Team offsite", "Agenda: travel, budget, and a short roadmap recap.")
+    index.add("gmail_m1_2", "m1", "pricing.pdf", "Enterprise pricing tiers and discounts.", source="gmail",
+              message_id="m1", part_id="2")
+    index.add("doc3", "1", "Lunch menu", "Soup and salad.")
+
+    hits = index.search(["roadmap"])
+    assert [h.doc_id for h in hits] == ["doc1", "doc2"]  # Title matches rank first
+
+    hits = index.search(["pricing", "discounts"])
+    assert hits[0].doc_id == "gmail_m1_2"
+    assert (hits[0].source, hits[0].message_id, hits[0].part_id) == ("gmail", "m1", "2")
+    assert index.search(["and"]) and not index.search(["   "])
+
+
+def test_revisions_replace_text_and_oldest_documents_are_evicted(tmp_path):
+    index = FullTextIndex(str(tmp_path / "fts.sqlite3"), max_documents=2)
+    assert index.add("doc1", "1", "Plan", "old budget numbers")
+    assert not index.add("doc1", "1", "Plan", "old budget numbers")
+    assert index.has("doc1", "1") and not index.has("doc1", "2")
+
+    assert index.add("doc1", "2", "Plan", "revised forecast")
+    assert not index.search(["budget"])
+    assert [h.revision for h in index.search(["forecast"])] == ["2"]
+
+    index.add("doc2", "1", "Notes", "forecast review")
+    index.add("doc3", "1", "Minutes", "forecast sign-off")
+    assert {h.doc_id for h in index.search(["forecast"])} == {"doc2", "doc3"}
+
+
+def test_removed_files_and_deleted_messages_leave_the_index(tmp_path):
+    index = FullTextIndex(str(tmp_path / "fts.sqlite3"))
+    index.add("doc1", "1", "Plan", "forecast review")
+    index.add("gmail_m1_1", "m1", "a.pdf", "forecast draft", source="gmail", message_id="m1", part_id="1")
+    index.add("gmail_m1_2", "m1", "b.pdf", "forecast final", source="gmail", message_id="m1", part_id="2")
+    index.add("gmail_m2_1", "m2", "c.pdf", "forecast notes", source="gmail", message_id="m2", part_id="1")
+
+    index.remove("doc1")
+    index.remove_message("m1")
+    assert [h.doc_id for h in index.search(["forecast"])] == ["gmail_m2_1"]
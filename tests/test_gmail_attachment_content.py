@@ -0,0 +1,81 @@
+import base64
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+
+class _Req:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class _FakeGmail:
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.fetched = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def attachments(self):
+        return self
+
+    def get(self, userId, messageId, id):
+        self.fetched.append((messageId, id))
+        return _Req({"data": base64.urlsafe_b64encode(self.bodies[messageId]).decode().rstrip("=")})
+
+    def new_batch_http_request(self, callback):
+        gmail = self
+
+        class _Batch:
+            def __init__(self):
+                self.calls = []
+
+            def add(self, request, request_id):
+                self.calls.append((request_id, request))
+
+            def execute(self):
+                gmail.batches = getattr(gmail, "batches", 0) + 1
+                for request_id, request in self.calls:
+                    callback(request_id, request.execute(), None)
+
+        return _Batch()
+
+
+def test_gmail_attachment_content_is_batched_capped_and_cached(monkeypatch):
+    for name, value in {"GOOGLE_CLOUD_PROJECT": "p", "STAGING_BUCKET": "gs://b", "AUTH_ID": "a",
+                        "GMAIL_ATTACHMENT_MAX_BYTES": "1000"}.items():
+        monkeypatch.setenv(name, value)
+    import agents.meeting_prep_agent as m
+    monkeypatch.setattr(m, "_settings", None)
+
+    def docs():
+        return [
+            m.DriveDocument(id="g1", name="notes.txt", link="", mime_type="text/plain", source="gmail", size="20",
+                            message_id="m1", attachment_id="volatile-1", part_id="1"),
+            m.DriveDocument(id="g2", name="agenda.txt", link="", mime_type="text/plain", source="gmail", size="20",
+                            message_id="m2", attachment_id="volatile-2", part_id="2"),
+            m.DriveDocument(id="g3", name="huge.txt", link="", mime_type="text/plain", source="gmail", size="5000",
+                            message_id="m3", attachment_id="volatile-3", part_id="1"),
+            m.DriveDocument(id="g4", name="photo.png", link="", mime_type="image/png", source="gmail", size="20",
+                            message_id="m4", attachment_id="volatile-4", part_id="1"),
+        ]
+
+    gmail = _FakeGmail({"m1": b"Budget pre-read", "m2": b"Agenda items"})
+    first = docs()
+    m._fetch_gmail_attachment_contents(gmail, first)
+    assert [d.content for d in first[:2]] == ["Budget pre-read", "Agenda items"]
+    assert "too large" in first[2].content and "not available" in first[3].content
+    assert (gmail.batches, len(gmail.fetched)) == (1, 2)
+
+    # A later search returns new attachmentIds for the same parts; the cache still hits
+    again = docs()
+    m._fetch_gmail_attachment_contents(gmail, again)
+    assert again[0].content == "Budget pre-read" and len(gmail.fetched) == 2
@@ -0,0 +1,177 @@
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from tools.gmail_index import GmailIndex
+
+
+class _Request:
+    def __init__(self, gmail, result):
+        self.gmail, self.result = gmail, result
+
+    def execute(self):
+        return self.result() if callable(self.result) else self.result
+
+
+class _FakeGmail:
+    def __init__(self, messages):
+        self.messages_by_id = {m["id"]: m for m in messages}
+        self.history_pages = {}
+        self.calls = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        self.calls.append("history.list")
+        return _History(self)
+
+    def getProfile(self, userId):
+        return _Request(self, {"historyId": "100"})
+
+    def list(self, userId, q, maxResults, pageToken=None):
+        self.calls.append("messages.list")
+        return _Request(self, {"messages": [{"id": i} for i in self.messages_by_id]})
+
+    def get(self, userId, id, format, fields):
+        return _Request(self, lambda: self.messages_by_id[id])
+
+    def new_batch_http_request(self, callback):
+        gmail = self
+
+        class _Batch:
+            def __init__(self):
+                self.requests = []
+
+            def add(self, request, request_id):
+                self.requests.append((request_id, request))
+
+            def execute(self):
+                gmail.calls.append("batch")
+                for request_id, request in self.requests:
+                    try:
+                        callback(request_id, request.execute(), None)
+                    except KeyError as e:
+                        callback(request_id, None, e)
+
+        return _Batch()
+
+
+class _History:
+    def __init__(self, gmail):
+        self.gmail = gmail
+
+    def list(self, userId, startHistoryId, pageToken, historyTypes, maxResults):
+        page = self.gmail.history_pages[startHistoryId]
+        if isinstance(page, Exception):
+            raise page
+        return _Request(self.gmail, page)
+
+
+def _message(message_id, sender, to, subject, filename, date):
+    return {
+        "id": message_id, "internalDate": str(date),
+        "payload": {
+            "headers": [{"name": "From", "value": f"Someone <{sender}>"}, {"name": "To", "value": to},
+                        {"name": "Subject", "value": subject}],
+            "parts": [
+                {"partId": "0", "mimeType": "text/plain", "body": {"size": 10}},
+                {"partId": "1", "filename": filename, "mimeType": "application/pdf",
+                 "body": {"size": 2048, "attachmentId": f"att-{message_id}"}},
+            ],
+        },
+    }
+
+
+def test_seed_answers_participant_and_keyword_lookups(tmp_path):
+    gmail = _FakeGmail([
+        _message("m1", "alice@x.com", "Bob <bob@x.com>, carol@x.com", "Roadmap review", "roadmap.pdf", 3),
+        _message("m2", "bob@x.com", "alice@x.com", "Budget", "q3-numbers.pdf", 2),
+        _message("m3", "dave@x.com", "alice@x.com", "Lunch", "menu.pdf", 1),
+        {"id": "m4", "internalDate": "4", "payload": {"headers": [], "parts": []}},  # No attachment
+    ])
+    index = GmailIndex(str(tmp_path / "gmail.sqlite3"))
+    assert index.seed(gmail) == 4
+    assert index.seeded
+
+    assert [m.id for m in index.messages_between("bob@x.com", "Alice@x.com")] == ["m1", "m2"]
+    assert [m.id for m in index.messages_matching("numbers")] == ["m2"]
+    assert [m.id for m in index.messages_matching("roadmap")] == ["m1"]
+    attachment = index.recent(1)[0].attachments[0]
+    assert (attachment.part_id, attachment.filename, attachment.size) == ("1", "roadmap.pdf", 2048)
+
+
+def test_sync_follows_mailbox_history(tmp_path):
+    gmail = _FakeGmail([_message("m1", "alice@x.com", "bob@x.com", "Roadmap", "roadmap.pdf", 1)])
+    index = GmailIndex(str(tmp_path / "gmail.sqlite3"))
+    index.seed(gmail)
+
+    gmail.messages_by_id["m2"] = _message("m2", "bob@x.com", "alice@x.com", "Roadmap v2", "roadmap-v2.pdf", 2)
+    gmail.history_pages = {
+        "100": {"historyId": "105", "history": [
+            {"messagesAdded": [{"message": {"id": "m2"}}, {"message": {"id": "gone"}}]},
+            {"messagesDeleted": [{"message": {"id": "m1"}}]},
+        ]},
+        "105": {"historyId": "105"},
+    }
+    gmail.calls.clear()
+    removed = []
+    assert index.sync(gmail) == 0  # Within the sync interval
+    index.sync(gmail, force=True, on_remove=removed.append)
+    assert removed == ["m1"]
+
+    assert [m.id for m in index.messages_matching("roadmap")] == ["m2"]
+    assert gmail.calls == ["history.list", "batch"]
+
+    gmail.calls.clear()
+    index.sync(gmail, force=True)
+    assert gmail.calls == ["history.list"]  # Nothing new: no message fetches
+
+
+def test_trashed_and_spam_messages_leave_the_index(tmp_path):
+    gmail = _FakeGmail([
+        _message("m1", "alice@x.com", "bob@x.com", "Roadmap", "roadmap.pdf", 1),
+        _message("m2", "bob@x.com", "alice@x.com", "Roadmap v2", "roadmap-v2.pdf", 2),
+    ])
+    index = GmailIndex(str(tmp_path / "gmail.sqlite3"))
+    index.seed(gmail)
+
+    gmail.messages_by_id["m3"] = dict(_message("m3", "eve@x.com", "alice@x.com", "Roadmap deal", "offer.pdf", 3),
+                                      labelIds=["SPAM"])
+    gmail.history_pages = {"100": {"historyId": "105", "history": [
+        {"messagesAdded": [{"message": {"id": "m3"}}]},
+        {"labelsAdded": [{"message": {"id": "m1"}, "labelIds": ["TRASH"]}]},
+        {"labelsAdded": [{"message": {"id": "m2"}, "labelIds": ["STARRED"]}]},
+    ]}}
+    removed = []
+    index.sync(gmail, force=True, on_remove=removed.append)
+    assert [m.id for m in index.messages_matching("roadmap")] == ["m2"]
+    assert removed == ["m1"]
+
+    gmail.history_pages["105"] = {"historyId": "106", "history": [
+        {"labelsRemoved": [{"message": {"id": "m1"}, "labelIds": ["TRASH"]}]},
+    ]}
+    index.sync(gmail, force=True)
+    assert [m.id for m in index.messages_matching("roadmap")] == ["m2", "m1"]
+
+
+def test_expired_history_is_rebuilt_in_the_background(tmp_path):
+    import time
+
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    gmail = _FakeGmail([_message("m1", "alice@x.com", "bob@x.com", "Roadmap", "roadmap.pdf", 1)])
+    index = GmailIndex(str(tmp_path / "gmail.sqlite3"))
+    index.seed(gmail)
+
+    gmail.history_pages = {"100": HttpError(httplib2.Response({"status": 404}), b"")}
+    assert index.sync(gmail, force=True) == 0
+    deadline = time.monotonic() + 5
+    while index.seeding and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.seeded
+    assert [m.id for m in index.messages_matching("roadmap")] == ["m1"]
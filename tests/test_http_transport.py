@@ -0,0 +1,51 @@
+import socket
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+from tools.http_transport import PooledHttp, authorized_http
+
+
+def test_services_share_one_pool_with_per_request_credentials():
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.path, request.headers["Authorization"]))
+        return httpx.Response(200, json={"files": [{"id": "f1"}]})
+
+    transport = PooledHttp(httpx.Client(transport=httpx.MockTransport(handler)))
+    alice = build("drive", "v3", http=authorized_http(Credentials(token="alice"), transport))
+    bob = build("drive", "v3", http=authorized_http(Credentials(token="bob"), transport))
+
+    assert alice.files().list(q="name contains 'x'").execute() == {"files": [{"id": "f1"}]}
+    bob.files().get(fileId="f1").execute()
+    assert seen == [("/drive/v3/files", "Bearer alice"), ("/drive/v3/files/f1", "Bearer bob")]
+
+
+def test_errors_map_to_what_googleapiclient_expects():
+    def handler(request):
+        if request.url.path == "/slow":
+            raise httpx.ReadTimeout("timed out", request=request)
+        return httpx.Response(404, headers={"Content-Type": "application/json"}, content=b"{}")
+
+    transport = PooledHttp(httpx.Client(transport=httpx.MockTransport(handler)))
+    resp, content = transport.request("https://www.googleapis.com/missing")
+    assert (resp.status, resp["content-type"], content) == (404, "application/json", b"{}")
+    with pytest.raises(socket.timeout):
+        transport.request("https://www.googleapis.com/slow")
+
+
+def test_pooling_is_switched_from_the_environment_alone(monkeypatch):
+    from agents.oauth_util import _service_kwargs
+
+    for name in ("GOOGLE_CLOUD_PROJECT", "STAGING_BUCKET", "AUTH_ID"):
+        monkeypatch.delenv(name, raising=False)
+    creds = Credentials(token="alice")
+    monkeypatch.setenv("GOOGLE_HTTP_POOLED", "false")
+    assert _service_kwargs(creds) == {"credentials": creds}
+    monkeypatch.setenv("GOOGLE_HTTP_POOLED", "true")
+    assert "http" in _service_kwargs(creds)
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _run(code: str) -> str:
+    env = {k: v for k, v in os.environ.items() if k not in ("GOOGLE_CLOUD_PROJECT", "STAGING_BUCKET", "AUTH_ID")}
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    return out.stdout.strip().splitlines()[-1]
+
+
+def test_import_does_not_load_heavy_dependencies_or_settings():
+    loaded = _run(
+        "import sys, agents.meeting_prep_agent as m\n"
+        "print([k for k in ('vertexai', 'google.adk', 'googleapiclient') if k in sys.modules], m._settings)"
+    )
+    assert loaded == "[] None"
+
+
+def test_helpers_are_module_level():
+    names = _run(
+        "import agents.meeting_prep_agent as m\n"
+        "print(all(hasattr(m, n) for n in ('DriveDocument', 'EventContext', '_calculate_document_relevance', "
+        "'_build_calendar_overview', '_get_chat_context')))"
+    )
+    assert names == "True"
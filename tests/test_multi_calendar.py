@@ -0,0 +1,139 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tools import multi_calendar
+from tools.multi_calendar import list_calendars, list_events
+
+START = datetime(2025, 6, 2, 9, tzinfo=timezone.utc)
+
+
+def _event(event_id, hours, **extra):
+    start = START + timedelta(hours=hours)
+    event = {
+        "id": event_id,
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": (start + timedelta(minutes=30)).isoformat()},
+    }
+    event.update(extra)
+    return event
+
+
+class _Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class _FakeCalendar:
+    def __init__(self, calendars, events):
+        self.calendars = calendars
+        self.events_by_calendar = events
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def calendarList(self):
+        return self
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        if "calendarId" not in params:
+            return _Request({"items": self.calendars})
+        with self.lock:
+            self.calls.append(params)
+        items = self.events_by_calendar.get(params["calendarId"], [])
+        if "updatedMin" in params:
+            items = [e for e in items if e.get("updated", "") >= params["updatedMin"]]
+        return _Request({"items": items})
+
+
+@pytest.fixture(autouse=True)
+def _clear_sync_state():
+    multi_calendar.clear_sync_state()
+    yield
+    multi_calendar.clear_sync_state()
+
+
+def test_list_calendars_selection():
+    fake = _FakeCalendar(
+        [{"id": "me@x.com", "primary": True}, {"id": "team", "selected": True}, {"id": "holidays"}], {}
+    )
+    assert [c["id"] for c in list_calendars(fake, "selected")] == ["primary", "team"]
+    assert [c["id"] for c in list_calendars(fake, "all")] == ["primary", "team", "holidays"]
+    assert [c["id"] for c in list_calendars(fake, "primary")] == ["primary"]
+    assert [c["id"] for c in list_calendars(fake, "a@x.com, b@x.com")] == ["a@x.com", "b@x.com"]
+
+
+def test_merges_calendars_in_time_order_and_dedupes_shared_events():
+    shared = {"iCalUID": "shared@google.com"}
+    fake = _FakeCalendar(
+        [{"id": "me@x.com", "primary": True}, {"id": "team", "selected": True}],
+        {
+            "primary": [_event("p1", 1), _event("p2", 5, **shared)],
+            "team": [_event("t1", 3), _event("t2", 5, **shared), _event("t3", -2)],
+        },
+    )
+    events = list_events(None, START, START + timedelta(days=1), service_factory=lambda: fake, cache_scope="u")
+
+    assert [e.id for e in events] == ["p1", "t1", "p2"]
+    assert [e.calendar_id for e in events] == ["primary", "team", "primary"]
+
+
+def test_later_reads_only_fetch_changes():
+    events = {"primary": [_event("a", 1), _event("b", 2)]}
+    fake = _FakeCalendar([{"id": "me@x.com", "primary": True}], events)
+    window = (START, START + timedelta(hours=6))
+    list_events(None, *window, service_factory=lambda: fake, cache_scope="u")
+
+    events["primary"] = [
+        _event("a", 1, status="cancelled", updated="9999"),
+        _event("b", 2),
+        _event("c", 3, updated="9999"),
+    ]
+    result = list_events(None, *window, service_factory=lambda: fake, cache_scope="u")
+
+    assert "updatedMin" in fake.calls[-1]
+    assert [e.id for e in result] == ["b", "c"]
+
+
+def test_events_moved_out_of_range_are_dropped():
+    events = {"primary": [_event("a", 1), _event("b", 2)]}
+    fake = _FakeCalendar([{"id": "me@x.com", "primary": True}], events)
+    window = (START, START + timedelta(hours=6))
+    list_events(None, *window, service_factory=lambda: fake, cache_scope="u")
+
+    events["primary"] = [_event("a", 1), _event("b", 24 * 30, updated="9999")]
+    result = list_events(None, *window, service_factory=lambda: fake, cache_scope="u")
+
+    assert "timeMin" not in fake.calls[-1] and fake.calls[-1]["singleEvents"] is False
+    assert [e.id for e in result] == ["a"]
+
+
+def test_failing_primary_calendar_raises_and_other_failures_are_skipped():
+    class _Failing(_FakeCalendar):
+        def __init__(self, failing, *args):
+            super().__init__(*args)
+            self.failing = failing
+
+        def list(self, **params):
+            if params.get("calendarId") in self.failing:
+                raise PermissionError("401 invalid credentials")
+            return super().list(**params)
+
+    calendars = [{"id": "me@x.com", "primary": True}, {"id": "team", "selected": True}]
+    events = {"primary": [_event("p1", 1)], "team": [_event("t1", 2)]}
+    window = (START, START + timedelta(hours=6))
+
+    fake = _Failing({"team"}, calendars, events)
+    assert [e.id for e in list_events(None, *window, service_factory=lambda: fake, cache_scope="u")] == ["p1"]
+    multi_calendar.clear_sync_state()
+    fake = _Failing({"primary"}, calendars, events)
+    with pytest.raises(PermissionError):
+        list_events(None, *window, service_factory=lambda: fake, cache_scope="u")
+    with pytest.raises(PermissionError):
+        list_events(None, *window, selection="primary", service_factory=lambda: fake, cache_scope="u")
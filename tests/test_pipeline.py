@@ -0,0 +1,207 @@
+import threading
+import time
+
+import pytest
+
+from agents.pipeline import CachePolicy, Pipeline, PipelineError
+
+
+def test_independent_stages_run_in_parallel():
+    p = Pipeline("t")
+    barrier = threading.Barrier(2, timeout=2)
+
+    @p.stage(inputs=("x",))
+    def left(x):
+        barrier.wait()
+        return x + 1
+
+    @p.stage(inputs=("x",))
+    def right(x):
+        barrier.wait()
+        return x + 2
+
+    @p.stage(inputs=("left", "right"))
+    def total(left, right):
+        return left + right
+
+    result = p.run({"x": 1})
+    assert result.get("total") == 5
+    assert all(m.status == "ok" for m in result.metrics.values())
+
+
+def test_multiple_outputs_and_failure_skips_dependents():
+    p = Pipeline("t")
+
+    @p.stage(inputs=("x",), outputs=("a", "b"))
+    def split(x):
+        return {"a": x, "b": -x}
+
+    @p.stage(inputs=("a",))
+    def boom(a):
+        raise ValueError("nope")
+
+    @p.stage(inputs=("boom",))
+    def after(boom):
+        return boom
+
+    @p.stage(inputs=("b",))
+    def ok(b):
+        return b * 10
+
+    result = p.run({"x": 3})
+    assert result.get("ok") == -30
+    assert result.metrics["boom"].status == "failed"
+    assert "nope" in result.metrics["boom"].error
+    assert result.metrics["after"].status == "skipped"
+    assert "after" not in result.outputs
+    assert set(result.failed) == {"boom", "after"}
+
+
+def test_fallback_supplies_outputs_on_failure_and_timeout():
+    p = Pipeline("t")
+
+    @p.stage(fallback=lambda e: f"unavailable: {e}")
+    def flaky():
+        raise RuntimeError("down")
+
+    @p.stage(timeout=0.05, fallback=lambda e: "late")
+    def slow():
+        time.sleep(0.5)
+        return "done"
+
+    @p.stage(inputs=("flaky", "slow"))
+    def render(flaky, slow):
+        return f"{flaky}|{slow}"
+
+    started = time.perf_counter()
+    result = p.run()
+    assert time.perf_counter() - started < 0.4
+    assert result.get("render") == "unavailable: down|late"
+    assert result.metrics["slow"].status == "timeout"
+
+
+def test_cache_policy_reuses_outputs():
+    p = Pipeline("t")
+    calls = []
+
+    @p.stage(inputs=("q",), cache=CachePolicy(ttl_seconds=60, key=lambda kw: kw["q"]))
+    def lookup(q):
+        calls.append(q)
+        return q.upper()
+
+    assert p.run({"q": "a"}).get("lookup") == "A"
+    second = p.run({"q": "a"})
+    assert second.get("lookup") == "A"
+    assert second.metrics["lookup"].status == "cached"
+    assert calls == ["a"]
+
+
+def test_concurrency_limit_is_shared_across_runs():
+    p = Pipeline("t")
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    @p.stage(inputs=("i",), max_concurrency=1)
+    def limited(i):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return i
+
+    threads = [threading.Thread(target=p.run, args=({"i": i},)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 1
+
+
+def test_timeout_counts_from_stage_start_not_from_queueing():
+    p = Pipeline("t", max_workers=1)
+
+    @p.stage(inputs=("x",))
+    def slow(x):
+        time.sleep(0.3)
+        return x
+
+    @p.stage(inputs=("x",), timeout=0.2)
+    def quick(x):
+        time.sleep(0.05)
+        return x
+
+    result = p.run({"x": 1})
+    assert (result.metrics["slow"].status, result.metrics["quick"].status) == ("ok", "ok")
+    assert max(result.metrics["slow"].queued_ms, result.metrics["quick"].queued_ms) >= 250
+
+
+def test_timed_out_stage_gives_back_its_worker_slot():
+    p = Pipeline("t", max_workers=1)
+    release = threading.Event()
+
+    @p.stage(inputs=("hang",), timeout=0.1, fallback=lambda e: None)
+    def hung(hang):
+        release.wait(5)
+
+    @p.stage(inputs=("x",))
+    def later(x):
+        return x
+
+    try:
+        assert p.run({"hang": True}).metrics["hung"].status == "timeout"
+        started = time.perf_counter()
+        assert p.run({"x": 7}).get("later") == 7  # Not stuck behind the abandoned stage
+        assert time.perf_counter() - started < 1
+    finally:
+        release.set()
+
+
+def test_rejects_duplicate_outputs_and_cycles():
+    p = Pipeline("t")
+    p.stage(name="a", inputs=("b",))(lambda b: b)
+    with pytest.raises(PipelineError):
+        p.stage(name="b", inputs=("a",))(lambda a: a)
+    with pytest.raises(PipelineError):
+        p.stage(name="c", outputs=("a",))(lambda: 1)
+
+
+def test_deadline_returns_partial_result_and_completes_in_background():
+    p = Pipeline("t")
+    release = threading.Event()
+
+    @p.stage()
+    def fast():
+        return "fast"
+
+    @p.stage()
+    def slow():
+        release.wait(2)
+        return "slow"
+
+    @p.stage(inputs=("slow",))
+    def after_slow(slow):
+        return slow + "!"
+
+    completed = []
+    done = threading.Event()
+
+    def on_complete(result):
+        completed.append(result)
+        done.set()
+
+    partial = p.run(deadline=0.05, on_complete=on_complete)
+    assert partial.deadline_hit
+    assert partial.get("fast") == "fast"
+    assert partial.metrics["slow"].status == "running"
+    assert partial.metrics["after_slow"].status == "pending"
+    assert set(partial.incomplete) == {"slow", "after_slow"}
+
+    release.set()
+    assert done.wait(2)
+    full = completed[0]
+    assert not full.deadline_hit
+    assert full.get("after_slow") == "slow!"
+    # the partial snapshot is not mutated by the background completion
+    assert "after_slow" not in partial.outputs
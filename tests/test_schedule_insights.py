@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+from tools.calendar_event import CalendarEvent
+from tools.schedule_insights import analyze_schedule, find_overlaps
+
+DAY = datetime(2025, 6, 2, tzinfo=timezone.utc)  # A Monday
+
+
+def _event(event_id, hour, minutes, response=None, **extra):
+    start = DAY + timedelta(hours=hour)
+    item = {
+        "id": event_id,
+        "summary": event_id,
+        "start": {"dateTime": start.isoformat()},
+        "end": {"dateTime": (start + timedelta(minutes=minutes)).isoformat()},
+    }
+    if response:
+        item["attendees"] = [{"email": "me@x.com", "self": True, "responseStatus": response}]
+    item.update(extra)
+    return CalendarEvent.from_api(item)
+
+
+def test_overlaps_and_double_bookings():
+    events = [
+        _event("standup", 9, 30, "accepted"),
+        _event("1:1", 9.25, 30, "accepted"),  # Double booked with standup
+        _event("review", 13, 60, "accepted"),
+        _event("optional talk", 13.5, 30, "needsAction"),  # Overlaps but not committed
+        _event("skipped", 15, 60, "declined"),
+        _event("lunch", 15, 30),
+        _event("focus block", 15, 60, transparency="transparent"),
+    ]
+    insights = analyze_schedule(events, DAY, DAY + timedelta(days=1))
+
+    assert [[e.id for e in o.events] for o in insights.overlaps] == [["standup", "1:1"], ["review", "optional talk"]]
+    assert [o.double_booked for o in insights.overlaps] == [True, False]
+    first = insights.overlaps[0]
+    assert (first.start, first.end) == (DAY + timedelta(hours=9.25), DAY + timedelta(hours=9.5))
+    assert insights.to_dict()["double_booking_count"] == 1
+
+
+def test_chained_overlaps_form_one_cluster():
+    events = [_event(str(i), 9 + i * 0.5, 45) for i in range(5)]
+    (overlap,) = find_overlaps(events)
+
+    assert len(overlap.events) == 5 and overlap.max_concurrent == 2
+    assert overlap.end == DAY + timedelta(hours=11, minutes=15)
+
+
+def test_back_to_back_chains_and_focus_gaps():
+    events = [_event("a", 9, 60), _event("b", 10, 55), _event("c", 11, 60), _event("d", 15, 30)]
+    insights = analyze_schedule(events, DAY, DAY + timedelta(days=1))
+
+    assert [[e.id for e in c.events] for c in insights.back_to_back] == [["a", "b", "c"]]
+    # 12:00-15:00 and 15:30-17:00 are long enough; nothing before 9:00 counts (working hours)
+    assert insights.focus_gaps == [
+        (DAY + timedelta(hours=12), DAY + timedelta(hours=15)),
+        (DAY + timedelta(hours=15.5), DAY + timedelta(hours=17)),
+    ]
+    assert insights.busy_minutes == 60 + 55 + 60 + 30
+
+
+def test_shared_calendar_events_without_rsvp_are_not_double_bookings():
+    mine = _event("planning", 9, 60, "accepted")
+    colleague = CalendarEvent.from_api({
+        "id": "their-1:1", "start": {"dateTime": (DAY + timedelta(hours=9)).isoformat()},
+        "end": {"dateTime": (DAY + timedelta(hours=10)).isoformat()},
+    }, calendar_id="colleague@x.com")
+    own_block = _event("personal", 9.5, 30)
+
+    (overlap,) = find_overlaps([mine, colleague])
+    assert not overlap.double_booked
+    (overlap,) = find_overlaps([mine, own_block])
+    assert overlap.double_booked
@@ -0,0 +1,43 @@
+import random
+import time
+
+import pytest
+
+from tools import similarity
+from tools.similarity import cosine_similarities
+
+TEXTS = [
+    "Q3 launch budget review and roadmap for Phoenix",
+    "Lunch menu for Friday",
+    "Phoenix launch checklist",
+    "",
+]
+
+
+def test_scores_rank_related_texts_first():
+    scores = cosine_similarities("Phoenix Q3 launch budget", TEXTS)
+    assert scores[0] > scores[2] > scores[1] == 0.0
+    assert scores[3] == 0.0
+    assert all(0.0 <= s <= 1.0 + 1e-9 for s in scores)
+    assert cosine_similarities("the and", TEXTS) == [0.0] * len(TEXTS)
+    assert cosine_similarities("anything", []) == []
+
+
+def test_numpy_and_python_paths_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    vectorized = cosine_similarities("Phoenix Q3 launch budget", TEXTS)
+    monkeypatch.setattr(similarity, "_np", False)
+    fallback = cosine_similarities("Phoenix Q3 launch budget", TEXTS)
+    assert fallback == pytest.approx(vectorized)
+
+
+def test_scores_many_messages_quickly():
+    pytest.importorskip("numpy")
+    rng = random.Random(3)
+    vocab = [f"term{i}" for i in range(5000)]
+    messages = [" ".join(rng.choice(vocab) for _ in range(12)) for _ in range(20000)]
+    cosine_similarities("warmup", messages[:10])
+    start = time.perf_counter()
+    scores = cosine_similarities("term1 term2 term3", messages)
+    assert time.perf_counter() - start < 2.0
+    assert len(scores) == 20000 and max(scores) > 0
@@ -0,0 +1,71 @@
+from tools.slack_fetcher import SlackMessage, _fill_by_rank, _rank_channels, fetch_slack_messages
+
+NOW = 1_750_000_000.0
+
+
+class FakeSlack:
+    def __init__(self):
+        self.history_calls = []
+        self.channels = [
+            {"id": "C1", "name": "launch-review"},
+            {"id": "C2", "name": "random"},
+            {"id": "C3", "name": "eng-pricing"},
+            {"id": "C4", "name": "watercooler"},
+        ]
+        self.members = {"a@x.com": ["C3", "C4"], "b@x.com": ["C3"]}
+
+    def conversations_list(self, cursor=None, **params):
+        if cursor is None:
+            return {"channels": self.channels[:2], "response_metadata": {"next_cursor": "n"}}
+        return {"channels": self.channels[2:]}
+
+    def users_lookupByEmail(self, email):
+        return {"user": {"id": email}}
+
+    def users_conversations(self, user, **params):
+        return {"channels": [{"id": c} for c in self.members[user]]}
+
+    def conversations_history(self, channel, oldest, latest, limit, cursor=None, **params):
+        self.history_calls.append((channel, cursor))
+        assert (float(oldest), float(latest)) == (NOW - 2 * 86400, NOW)
+        if channel == "C1" and cursor is None:
+            return {"messages": [{"ts": str(NOW - 10), "user": "U1", "text": "ship it"}],
+                    "has_more": True, "response_metadata": {"next_cursor": "p2"}}
+        if channel == "C1":
+            return {"messages": [{"ts": str(NOW - 3000), "user": "U2", "text": "draft deck"}], "has_more": False}
+        return {"messages": [{"ts": str(NOW - 500), "user": "U3", "text": f"pricing in {channel}"}], "has_more": False}
+
+
+def test_reads_candidate_channels_within_the_window():
+    slack = FakeSlack()
+    messages = fetch_slack_messages("Launch Review", lookback_days=2, latest=NOW,
+                                    attendee_emails=["a@x.com", "b@x.com"], client=slack)
+
+    # Grouped by channel, best match first
+    assert [m.text for m in messages] == ["ship it", "draft deck", "pricing in C3"]
+    assert [m.channel for m in messages] == ["#launch-review", "#launch-review", "#eng-pricing"]
+    # Slug channel paged once; the channel both attendees share read; unrelated channels untouched
+    assert set(slack.history_calls) == {("C1", None), ("C1", "p2"), ("C3", None)}
+
+
+def test_no_candidate_channel_reads_no_history():
+    slack = FakeSlack()
+    assert fetch_slack_messages("Quarterly Budget", latest=NOW, client=slack) == []
+    assert slack.history_calls == []
+
+
+def test_large_channels_everyone_is_in_rank_below_team_channels():
+    channels = [{"id": "G", "name": "general", "num_members": 5000},
+                {"id": "T", "name": "pricing-team", "num_members": 6}]
+    assert [ch["id"] for ch in _rank_channels(channels, "Pricing", ["pricing"], {"G": 3})] == ["T", "G"]
+    assert [ch["id"] for ch in _rank_channels(channels, "Offsite", [], {"G": 3, "T": 2})] == ["T", "G"]
+
+
+def test_every_channel_gets_a_share_of_the_messages():
+    def stream(channel, n):
+        return [SlackMessage(ts=str(NOW - i), user="U", text=f"{channel}{i}", channel=channel, permalink="")
+                for i in range(n)]
+
+    filled = _fill_by_rank([stream("a", 10), stream("b", 10), stream("c", 1)], 7)
+    assert [m.text for m in filled] == ["a0", "a1", "a2", "b0", "b1", "b2", "c0"]
+    assert len(_fill_by_rank([stream("a", 2), stream("b", 2)], 10)) == 4
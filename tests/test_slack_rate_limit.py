@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from tools.slack_rate_limit import RateLimitedSlackClient, TierLimiter
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__("ratelimited")
+        self.response = SimpleNamespace(status_code=429, headers={"Retry-After": retry_after},
+                                        get=lambda key: "ratelimited")
+
+
+class FakeWebClient:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def conversations_list(self, **params):
+        with self.lock:
+            self.calls.append(("conversations.list", params))
+        time.sleep(0.2)
+        return {"ok": True, "channels": [{"id": "C1"}]}
+
+    def conversations_history(self, **params):
+        with self.lock:
+            self.calls.append(("conversations.history", params))
+            first = len(self.calls) == 1
+        if first:
+            raise RateLimited("0")
+        return {"ok": True, "messages": []}
+
+
+def test_tier_budgets_differ_by_method():
+    limiter = TierLimiter()
+    tier2 = [limiter.reserve("conversations.list") for _ in range(5)]
+    tier3 = [limiter.reserve("conversations.history") for _ in range(5)]
+    assert tier2[:3] == [0.0, 0.0, 0.0] and tier2[3] > 0 and tier2[4] > tier2[3]
+    assert tier3 == [0.0] * 5
+
+
+def test_ratelimited_calls_wait_and_retry():
+    fake = FakeWebClient()
+    client = RateLimitedSlackClient(fake)
+    assert client.conversations_history(channel="C1", limit=10) == {"ok": True, "messages": []}
+    assert [c[0] for c in fake.calls] == ["conversations.history", "conversations.history"]
+
+
+def test_identical_concurrent_reads_share_one_request():
+    fake = FakeWebClient()
+    client = RateLimitedSlackClient(fake)
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        results = list(pool.map(lambda _: client.conversations_list(limit=1000), range(12)))
+    assert all(r["channels"] == [{"id": "C1"}] for r in results)
+    assert len(fake.calls) == 1
+    # Once it has completed, the next call goes out again
+    client.conversations_list(limit=1000)
+    assert len(fake.calls) == 2
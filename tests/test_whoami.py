@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from tools import whoami
+from tools.whoami import session_identity
+
+
+class _FakeServices:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, api, version):
+        return self
+
+    def userinfo(self):
+        return self
+
+    def calendarList(self):
+        return self
+
+    def get(self, **kwargs):
+        self.calls += 1
+        return self
+
+    def execute(self):
+        return {"email": "me@x.com", "timeZone": "Europe/Paris"}
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    whoami.clear_cache()
+    yield
+    whoami.clear_cache()
+
+
+def test_identity_resolved_once_per_session_token():
+    services = _FakeServices()
+    state = {}
+    creds = SimpleNamespace(token="t1", refresh_token=None)
+
+    for _ in range(3):
+        identity = session_identity(state, creds, service_factory=services)
+    assert (identity.email, identity.timezone) == ("me@x.com", "Europe/Paris")
+    assert state["_user_tz"] == "Europe/Paris"
+    assert services.calls == 2  # userinfo + calendarList, once
+
+    # A new session with the same token is served from the process cache
+    session_identity({}, creds, service_factory=services)
+    assert services.calls == 2
+
+    # A different token (another user or re-authentication) is resolved again
+    session_identity(state, SimpleNamespace(token="t2", refresh_token=None), service_factory=services)
+    assert services.calls == 4
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import weakref
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, FrozenSet, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httpx
+
+# One pool per event loop; sized so a single worker can keep hundreds of calls in flight
+DEFAULT_MAX_CONNECTIONS = 256
+_MAX_KEEPALIVE_CONNECTIONS = 64
+_MAX_RETRIES = 4
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+CALENDAR_API = "https://www.googleapis.com/calendar/v3"
+DRIVE_API = "https://www.googleapis.com/drive/v3"
+GMAIL_API = "https://gmail.googleapis.com/gmail/v1/users/me"
+CHAT_API = "https://chat.googleapis.com/v1"
+SLACK_API = "https://slack.com/api"
+
+
+class AsyncApiError(Exception):
+    """An upstream call that failed after retries (HTTP error status, or Slack "ok": false)."""
+
+    def __init__(self, service: str, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{service} API error {status}: {message}")
+        self.service = service
+        self.status = status
+        self.message = message
+        # Seconds the service asked callers to wait (rate limits left to the caller to retry)
+        self.retry_after = retry_after
+
+
+# httpx clients are tied to the loop their connections were opened on
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def shared_http_client() -> "httpx.AsyncClient":
+    """The connection pool shared by every async client on the running event loop."""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=DEFAULT_MAX_CONNECTIONS,
+                                max_keepalive_connections=_MAX_KEEPALIVE_CONNECTIONS),
+            timeout=httpx.Timeout(30.0, connect=10.0),
+        )
+    return client
+
+
+async def aclose_shared_http_client() -> None:
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _retry_delay(response: Optional["httpx.Response"], attempt: int) -> float:
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(2 ** attempt, 16) * (0.5 + random.random() / 2)
+
+
+async def _send(http: "httpx.AsyncClient", service: str, method: str, url: str,
+                retry_statuses: FrozenSet[int] = _RETRY_STATUSES, **kwargs) -> "httpx.Response":
+    """One request with retries on retry_statuses (rate limits, server errors) and dropped connections."""
+    import httpx
+
+    for attempt in range(_MAX_RETRIES + 1):
+        try:
+            response = await http.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if attempt == _MAX_RETRIES:
+                raise AsyncApiError(service, 0, str(e)) from e
+            await asyncio.sleep(_retry_delay(None, attempt))
+            continue
+        if response.status_code in retry_statuses and attempt < _MAX_RETRIES:
+            await asyncio.sleep(_retry_delay(response, attempt))
+            continue
+        if response.status_code == 429:
+            raise AsyncApiError(service, 429, response.text[:500], retry_after=_retry_delay(response, attempt))
+        if response.status_code >= 400:
+            raise AsyncApiError(service, response.status_code, response.text[:500])
+        return response
+    raise AssertionError("unreachable")
+
+
+class AsyncGoogleClient:
+    """
+    asyncio client for the Calendar, Drive, Gmail and Chat endpoints the tools use.
+
+    Calls are plain HTTPS requests on the shared per-loop connection pool, so any number
+    of them can be awaited concurrently without a thread (or an httplib2 stack) each.
+    """
+
+    def __init__(self, creds: Any, http: Optional["httpx.AsyncClient"] = None):
+        self.creds = creds
+        self._http = http
+
+    @property
+    def http(self) -> "httpx.AsyncClient":
+        return self._http if self._http is not None else shared_http_client()
+
+    async def _headers(self) -> Dict[str, str]:
+        if getattr(self.creds, "expired", False) and getattr(self.creds, "refresh_token", None):
+            from google.auth.transport.requests import Request
+
+            await asyncio.to_thread(self.creds.refresh, Request())
+        return {"Authorization": f"Bearer {self.creds.token}"}
+
+    async def request(self, method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                      json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        response = await _send(self.http, "Google", method, url, params=params, json=json,
+                               headers=await self._headers())
+        return response.json() if response.content else {}
+
+    async def pages(self, url: str, params: Optional[Dict[str, Any]] = None,
+                    items_key: str = "items") -> AsyncIterator[Dict[str, Any]]:
+        """Items across every page of a list call (nextPageToken / pageToken)."""
+        params = dict(params or {})
+        while True:
+            result = await self.request("GET", url, params=params)
+            for item in result.get(items_key, []):
+                yield item
+            token = result.get("nextPageToken")
+            if not token:
+                return
+            params["pageToken"] = token
+
+    async def _collect(self, url: str, params: Dict[str, Any], items_key: str,
+                       max_items: Optional[int] = None) -> List[Dict[str, Any]]:
+        items = []
+        async for item in self.pages(url, params, items_key):
+            items.append(item)
+            if max_items is not None and len(items) >= max_items:
+                break
+        return items
+
+    # Calendar
+    async def calendar_list(self) -> List[Dict[str, Any]]:
+        return await self._collect(f"{CALENDAR_API}/users/me/calendarList", {"showHidden": False}, "items")
+
+    async def list_events(self, calendar_id: str = "primary", max_items: Optional[int] = None,
+                          **params) -> List[Dict[str, Any]]:
+        return await self._collect(f"{CALENDAR_API}/calendars/{calendar_id}/events", params, "items", max_items)
+
+    async def get_event(self, calendar_id: str, event_id: str, **params) -> Dict[str, Any]:
+        return await self.request("GET", f"{CALENDAR_API}/calendars/{calendar_id}/events/{event_id}", params)
+
+    async def event_instances(self, calendar_id: str, event_id: str, max_items: Optional[int] = None,
+                              **params) -> List[Dict[str, Any]]:
+        return await self._collect(f"{CALENDAR_API}/calendars/{calendar_id}/events/{event_id}/instances",
+                                   params, "items", max_items)
+
+    # Drive
+    async def list_files(self, max_items: Optional[int] = None, **params) -> List[Dict[str, Any]]:
+        return await self._collect(f"{DRIVE_API}/files", params, "files", max_items)
+
+    async def get_file(self, file_id: str, fields: str = "id,name,mimeType,webViewLink") -> Dict[str, Any]:
+        return await self.request("GET", f"{DRIVE_API}/files/{file_id}", {"fields": fields})
+
+    async def _stream(self, url: str, params: Dict[str, Any], max_bytes: int) -> tuple[bytes, bool]:
+        """(body, truncated), reading at most max_bytes (plus one chunk) of the response."""
+        chunks, size = [], 0
+        async with self.http.stream("GET", url, params=params, headers=await self._headers()) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                raise AsyncApiError("Google", response.status_code, response.text[:500])
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_bytes:
+                    break
+        data = b"".join(chunks)
+        return data[:max_bytes], len(data) > max_bytes
+
+    async def export_file(self, file_id: str, mime_type: str, max_bytes: int) -> tuple[bytes, bool]:
+        return await self._stream(f"{DRIVE_API}/files/{file_id}/export", {"mimeType": mime_type}, max_bytes)
+
+    async def download_file(self, file_id: str, max_bytes: int) -> tuple[bytes, bool]:
+        return await self._stream(f"{DRIVE_API}/files/{file_id}", {"alt": "media"}, max_bytes)
+
+    # Gmail
+    async def list_messages(self, q: str, max_items: int = 100) -> List[Dict[str, Any]]:
+        return await self._collect(f"{GMAIL_API}/messages", {"q": q, "maxResults": min(max_items, 500)},
+                                   "messages", max_items)
+
+    async def get_message(self, message_id: str, format: str = "full", **params) -> Dict[str, Any]:
+        return await self.request("GET", f"{GMAIL_API}/messages/{message_id}", dict(params, format=format))
+
+    # Chat
+    async def list_spaces(self) -> List[Dict[str, Any]]:
+        return await self._collect(f"{CHAT_API}/spaces", {"pageSize": 1000}, "spaces")
+
+    async def list_space_messages(self, space: str, max_items: Optional[int] = None,
+                                  **params) -> List[Dict[str, Any]]:
+        return await self._collect(f"{CHAT_API}/{space}/messages", params, "messages", max_items)
+
+    async def list_members(self, space: str) -> List[Dict[str, Any]]:
+        return await self._collect(f"{CHAT_API}/{space}/members", {"pageSize": 1000}, "memberships")
+
+
+# Slack calls in flight per event loop, so identical concurrent reads share one request
+_slack_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, asyncio.Future]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _consume(future: "asyncio.Future") -> None:
+    # A failure nobody else awaited is already raised to the caller that made the request
+    if not future.cancelled():
+        future.exception()
+
+
+class AsyncSlackClient:
+    """
+    asyncio client for the Slack Web API conversations methods, on the shared pool.
+
+    Calls draw on the same per-workspace tier budget as the sync clients: a rate-limited
+    call pauses the method for every caller and is retried after Retry-After, each retry
+    taking budget again; identical read calls already in flight on the loop share one request.
+    """
+
+    def __init__(self, token: str, http: Optional["httpx.AsyncClient"] = None):
+        self.token = token
+        self._http = http
+
+    @property
+    def http(self) -> "httpx.AsyncClient":
+        return self._http if self._http is not None else shared_http_client()
+
+    async def call(self, method: str, **params) -> Dict[str, Any]:
+        from tools.slack_rate_limit import COALESCED_METHODS, _freeze
+
+        params = {k: v for k, v in params.items() if v is not None}
+        if method not in COALESCED_METHODS:
+            return await self._call(method, params)
+        inflight = _slack_inflight.setdefault(asyncio.get_running_loop(), {})
+        key = (self.token, method, _freeze(params))
+        future = inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = inflight[key] = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume)
+        try:
+            result = await self._call(method, params)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            inflight.pop(key, None)
+
+    async def _call(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        from tools.slack_rate_limit import limiter_for
+
+        limiter = limiter_for(self.token)
+        for attempt in range(_MAX_RETRIES + 1):
+            # Same per-method tier budget as the sync clients for this workspace, retries included
+            delay = limiter.reserve(method)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                response = await _send(self.http, "Slack", "POST", f"{SLACK_API}/{method}",
+                                       retry_statuses=_RETRY_STATUSES - {429}, data=params,
+                                       headers={"Authorization": f"Bearer {self.token}"})
+            except AsyncApiError as e:
+                if e.retry_after is None or attempt == _MAX_RETRIES:
+                    raise
+                print(f"Slack {method} rate limited; retrying in {e.retry_after:.0f}s")
+                limiter.pause(method, e.retry_after)
+                continue
+            result = response.json()
+            if not result.get("ok"):
+                raise AsyncApiError("Slack", response.status_code, result.get("error", "unknown_error"))
+            return result
+        raise AssertionError("unreachable")
+
+    async def paginate(self, method: str, items_key: str, max_items: Optional[int] = None,
+                       **params) -> List[Dict[str, Any]]:
+        """Items across cursor-paginated pages (response_metadata.next_cursor)."""
+        items: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            result = await self.call(method, cursor=cursor, **params)
+            items.extend(result.get(items_key, []))
+            cursor = (result.get("response_metadata") or {}).get("next_cursor")
+            if not cursor or (max_items is not None and len(items) >= max_items):
+                return items[:max_items] if max_items is not None else items
+
+    async def conversations_list(self, types: str = "public_channel,private_channel") -> List[Dict[str, Any]]:
+        return await self.paginate("conversations.list", "channels", types=types, limit=1000,
+                                   exclude_archived=True)
+
+    async def conversations_history(self, channel: str, oldest: Optional[str] = None, latest: Optional[str] = None,
+                                    max_items: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self.paginate("conversations.history", "messages", max_items, channel=channel,
+                                   oldest=oldest, latest=latest, limit=min(max_items or 200, 200))
+
+    async def conversations_replies(self, channel: str, ts: str,
+                                    max_items: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self.paginate("conversations.replies", "messages", max_items, channel=channel, ts=ts,
+                                   limit=200)
+
+    async def conversations_members(self, channel: str) -> List[str]:
+        return await self.paginate("conversations.members", "members", channel=channel, limit=1000)
@@ -1,19 +1,28 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 import re
 
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from config.settings import load_settings
-from agents.oauth_util import get_google_creds_from_tool_context
+from agents.oauth_util import build_google_service, get_google_creds_from_tool_context
 from tools.drive_search import DocumentReference
+from tools.cache import get_cache
+from tools.whoami import resolve_identity, token_fingerprint
 
 
 _DRIVE_FOLDER_MIME = "application/vnd.google-apps.folder"
 _DRIVE_SHORTCUT_MIME = "application/vnd.google-apps.shortcut"
+# Drive accepts at most 100 calls per batch request
+_BATCH_SIZE = 100
+
+# Folders are rarely deleted, and a stale id is dropped as soon as using it fails
+_FOLDER_TTL_SECONDS = 24 * 3600
+_FOLDER_CACHE_MAX_BYTES = 1024 * 1024
+
+# "<parent folder id>/<name>" -> folder id, partitioned by the user's email
+_folder_ids = get_cache("drive_folders", _FOLDER_TTL_SECONDS, _FOLDER_CACHE_MAX_BYTES)
 
 
 def _parse_drive_id_from_url(url: str) -> Optional[str]:
@@ -27,33 +36,105 @@ def _parse_drive_id_from_url(url: str) -> Optional[str]:
     return None
 
 
-def _ensure_folder(service, name: str, parent_id: Optional[str]) -> Optional[str]:
-    q = ["mimeType = 'application/vnd.google-apps.folder'", f"name = '{name}'", "trashed = false"]
+def _escape_query(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def _ensure_folder(service, name: str, parent_id: Optional[str]) -> Tuple[Optional[str], bool]:
+    """(folder id, whether it was just created); the id is None if the folder can't be found or made."""
+    q = [f"mimeType = '{_DRIVE_FOLDER_MIME}'", f"name = '{_escape_query(name)}'", "trashed = false"]
     if parent_id:
         q.append(f"'{parent_id}' in parents")
     res = service.files().list(q=" and ".join(q), fields="files(id, name)", pageSize=1).execute()
     files = res.get("files", [])
     if files:
-        return files[0]["id"]
+        return files[0]["id"], False
     # create
     body = {"name": name, "mimeType": _DRIVE_FOLDER_MIME}
     if parent_id:
         body["parents"] = [parent_id]
     try:
         created = service.files().create(body=body, fields="id").execute()
-        return created.get("id")
+        return created.get("id"), True
     except HttpError:
-        return None
+        return None, False
+
+
+def _folder_user(tool_context: Any, creds: Any) -> str:
+    """The user's email, which outlives access-token rotation; the token fingerprint if it can't be resolved."""
+    email = tool_context.state.get("_user_email")
+    if not email:
+        try:
+            email = resolve_identity(creds).email
+        except Exception as e:
+            print(f"Could not resolve the user's email for the folder cache: {e}")
+    return email or token_fingerprint(creds)
+
+
+def _cached_folder(service, user: str, name: str, parent_id: Optional[str]) -> Tuple[Optional[str], bool]:
+    """_ensure_folder, remembered per user so repeat ingests skip the lookup."""
+    key = f"{parent_id or ''}/{name}"
+    folder_id = _folder_ids.get(key, user=user)
+    if folder_id is not None:
+        return folder_id, False
+    folder_id, created = _ensure_folder(service, name, parent_id)
+    if folder_id is not None:
+        # Failures are not remembered, so a transient Drive error is retried on the next ingest
+        _folder_ids.set(key, folder_id, user=user)
+    return folder_id, created
+
+
+def _forget_folders(user: str) -> None:
+    _folder_ids.clear_user(user)
+
+
+def clear_folder_cache() -> None:
+    _folder_ids.clear()
+
+
+def _existing_shortcut_targets(service, folder_id: str) -> Set[str]:
+    """Target file ids of the shortcuts already in the folder (one paged list call)."""
+    q = f"'{folder_id}' in parents and mimeType = '{_DRIVE_SHORTCUT_MIME}' and trashed = false"
+    targets: Set[str] = set()
+    page_token = None
+    while True:
+        res = service.files().list(
+            q=q, fields="nextPageToken, files(id, shortcutDetails/targetId)", pageSize=1000, pageToken=page_token
+        ).execute()
+        targets.update(f.get("shortcutDetails", {}).get("targetId") for f in res.get("files", []))
+        page_token = res.get("nextPageToken")
+        if not page_token:
+            return targets
+
+
+def _run_batched(service, requests: List[Tuple[str, Any]], on_result: Callable[[str, Any, Any], None]) -> None:
+    """Execute (request_id, request) pairs through Drive batch requests of up to _BATCH_SIZE calls."""
+    for i in range(0, len(requests), _BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=on_result)
+        for request_id, request in requests[i:i + _BATCH_SIZE]:
+            batch.add(request, request_id=request_id)
+        try:
+            batch.execute()
+        except HttpError as e:
+            for request_id, _ in requests[i:i + _BATCH_SIZE]:
+                on_result(request_id, None, e)
 
 
-def ingest_event_attachments(tool_context: Any, event: dict, parent_root: str = "MeetingPrep") -> List[DocumentReference]:
+def ingest_event_attachments(tool_context: Any, event: dict, parent_root: str = "MeetingPrep",
+                             service: Any = None) -> List[DocumentReference]:
     """
     Best-effort: create MeetingPrep/<eventId> folder and add Drive shortcuts for any Calendar attachments
     that reference Drive files. If lacking write scope/permission, fall back to returning original links.
+
+    Idempotent: folder ids are cached, shortcuts already in the event folder are not created
+    again, and file metadata and new shortcuts each go out as one batch request, so
+    re-ingesting an event costs a shortcut listing and a metadata batch.
     """
     settings = load_settings()
     creds = get_google_creds_from_tool_context(tool_context, settings.auth_id)
-    service = build("drive", "v3", credentials=creds)
+    if service is None:
+        service = build_google_service("drive", "v3", creds)
+    user = _folder_user(tool_context, creds)
 
     event_id = event.get("id", "")
     attachments = event.get("attachments", [])
@@ -73,41 +154,26 @@ def ingest_event_attachments(tool_context: Any, event: dict, parent_root: str =
     # Deduplicate
     seen = set()
     file_ids = [fid for fid in file_ids if not (fid in seen or seen.add(fid))]
+    if not file_ids:
+        return []
 
-    doc_refs: List[DocumentReference] = []
+    # File metadata for every attachment in one batch
+    metadata: Dict[str, dict] = {}
 
-    # Try to ensure folder structure
-    root_id = _ensure_folder(service, parent_root, None)
-    event_folder_id = _ensure_folder(service, event_id, root_id) if root_id else None
+    def _on_metadata(request_id, response, exception):
+        if exception is None and response:
+            metadata[request_id] = response
 
-    for fid in file_ids:
-        try:
-            fmeta = service.files().get(fileId=fid, fields="id, name, mimeType, webViewLink").execute()
-            link = fmeta.get("webViewLink", f"https://drive.google.com/file/d/{fid}/view")
-            doc_refs.append(
-                DocumentReference(
-                    id=fid,
-                    title=fmeta.get("name", fid),
-                    link=link,
-                    mime_type=fmeta.get("mimeType", ""),
-                    source="calendar-attachment",
-                )
-            )
+    _run_batched(
+        service,
+        [(fid, service.files().get(fileId=fid, fields="id, name, mimeType, webViewLink")) for fid in file_ids],
+        _on_metadata,
+    )
 
-            # Attempt to create a shortcut inside the event folder
-            if event_folder_id:
-                shortcut_body = {
-                    "name": fmeta.get("name", fid),
-                    "mimeType": _DRIVE_SHORTCUT_MIME,
-                    "parents": [event_folder_id],
-                    "shortcutDetails": {"targetId": fid},
-                }
-                try:
-                    service.files().create(body=shortcut_body, fields="id").execute()
-                except HttpError:
-                    # Insufficient permissions or read-only scope; ignore
-                    pass
-        except HttpError:
+    doc_refs: List[DocumentReference] = []
+    for fid in file_ids:
+        fmeta = metadata.get(fid)
+        if fmeta is None:
             # Fallback only with id
             doc_refs.append(
                 DocumentReference(
@@ -118,5 +184,46 @@ def ingest_event_attachments(tool_context: Any, event: dict, parent_root: str =
                     source="calendar-attachment",
                 )
             )
+            continue
+        doc_refs.append(
+            DocumentReference(
+                id=fid,
+                title=fmeta.get("name", fid),
+                link=fmeta.get("webViewLink", f"https://drive.google.com/file/d/{fid}/view"),
+                mime_type=fmeta.get("mimeType", ""),
+                source="calendar-attachment",
+            )
+        )
 
+    # Try to ensure folder structure, then add only the shortcuts the event folder lacks
+    try:
+        root_id, _ = _cached_folder(service, user, parent_root, None)
+        event_folder_id, created = _cached_folder(service, user, event_id, root_id) if root_id else (None, False)
+        if not event_folder_id:
+            return doc_refs
+        existing = set() if created else _existing_shortcut_targets(service, event_folder_id)
+    except HttpError as e:
+        # A cached folder may have been deleted since; look it up again next time
+        _forget_folders(user)
+        print(f"Could not prepare {parent_root} folder for event {event_id}: {e}")
+        return doc_refs
+
+    missing = [fid for fid in file_ids if fid in metadata and fid not in existing]
+    _run_batched(
+        service,
+        [
+            (fid, service.files().create(
+                body={
+                    "name": metadata[fid].get("name", fid),
+                    "mimeType": _DRIVE_SHORTCUT_MIME,
+                    "parents": [event_folder_id],
+                    "shortcutDetails": {"targetId": fid},
+                },
+                fields="id",
+            ))
+            for fid in missing
+        ],
+        # Insufficient permissions or read-only scope; ignore
+        lambda request_id, response, exception: None,
+    )
     return doc_refs
@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# Per-namespace size ceiling when a cache does not set its own
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class CacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class CacheBackend:
+    """
+    Storage for pickled cache values, partitioned by namespace.
+
+    Each namespace is held under its own byte ceiling; writing past it evicts that
+    namespace's least recently used entries. Expired entries are dropped when read.
+    """
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: bytes, expires_at: float, max_bytes: int) -> int:
+        """Store value; returns the number of entries evicted to make room."""
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self, namespace: str, prefix: str = "") -> None:
+        """Drop the namespace's entries whose keys start with prefix (all of them by default)."""
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU; gone on restart."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, "OrderedDict[str, Tuple[float, bytes]]"] = {}
+        self._sizes: Dict[str, int] = {}
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            entries = self._entries.get(namespace)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._pop(namespace, key)
+                return None
+            entries.move_to_end(key)
+            return entry[1]
+
+    def _pop(self, namespace: str, key: str) -> None:
+        entry = self._entries[namespace].pop(key, None)
+        if entry is not None:
+            self._sizes[namespace] -= len(entry[1])
+
+    def set(self, namespace: str, key: str, value: bytes, expires_at: float, max_bytes: int) -> int:
+        if len(value) > max_bytes:
+            return 0
+        with self._lock:
+            entries = self._entries.setdefault(namespace, OrderedDict())
+            self._sizes.setdefault(namespace, 0)
+            self._pop(namespace, key)
+            entries[key] = (expires_at, value)
+            self._sizes[namespace] += len(value)
+            evicted = 0
+            while self._sizes[namespace] > max_bytes:
+                _, (_, old) = entries.popitem(last=False)
+                self._sizes[namespace] -= len(old)
+                evicted += 1
+            return evicted
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            if namespace in self._entries:
+                self._pop(namespace, key)
+
+    def clear(self, namespace: str, prefix: str = "") -> None:
+        with self._lock:
+            for key in [k for k in self._entries.get(namespace, {}) if k.startswith(prefix)]:
+                self._pop(namespace, key)
+
+
+class SQLiteBackend(CacheBackend):
+    """One local SQLite file; survives process restarts on the same instance."""
+
+    def __init__(self, path: str):
+        import sqlite3
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                used_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, used_at);
+        """)
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                                     (namespace, key)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                return None
+            self._conn.execute("UPDATE entries SET used_at = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+            return row[0]
+
+    def set(self, namespace: str, key: str, value: bytes, expires_at: float, max_bytes: int) -> int:
+        if len(value) > max_bytes:
+            return 0
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                               (namespace, key, value, len(value), expires_at, time.time()))
+            (total,) = self._conn.execute("SELECT coalesce(sum(size), 0) FROM entries WHERE namespace = ?",
+                                          (namespace,)).fetchone()
+            if total <= max_bytes:
+                return 0
+            # Expired entries go first, then the least recently used
+            self._conn.execute("DELETE FROM entries WHERE namespace = ? AND expires_at <= ?", (namespace, time.time()))
+            evicted = 0
+            rows = self._conn.execute("SELECT key, size FROM entries WHERE namespace = ? ORDER BY used_at",
+                                      (namespace,)).fetchall()
+            (total,) = self._conn.execute("SELECT coalesce(sum(size), 0) FROM entries WHERE namespace = ?",
+                                          (namespace,)).fetchone()
+            for old_key, size in rows:
+                if total <= max_bytes:
+                    break
+                self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, old_key))
+                total -= size
+                evicted += 1
+            return evicted
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace: str, prefix: str = "") -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE namespace = ? AND substr(key, 1, ?) = ?",
+                               (namespace, len(prefix), prefix))
+
+
+class FileSystemBackend(CacheBackend):
+    """
+    One file per entry under root/<namespace>/; stands in for an object store (root can
+    be a bucket mounted with Cloud Storage FUSE), so caches survive instance churn.
+
+    Files hold an HMAC-SHA256 signature, the expiry time and key, then the value. Values
+    are unpickled, so files not signed with secret (written by anything that can reach a
+    shared root but does not hold the secret) are ignored. Without a secret a random one
+    is used, and entries only outlive the process that wrote them as garbage. Each process
+    tracks the sizes of the files it has seen, so the byte ceiling is per instance on a
+    shared root.
+    """
+
+    _HEADER = struct.Struct("<dI")  # expires_at, key length
+    _MAC_SIZE = hashlib.sha256().digest_size
+
+    def __init__(self, root: str, secret: Optional[bytes] = None):
+        self.root = root
+        self._secret = secret or os.urandom(32)
+        self._lock = threading.Lock()
+        # namespace -> {file name: size}, oldest use first
+        self._index: Dict[str, "OrderedDict[str, int]"] = {}
+
+    def _dir(self, namespace: str) -> str:
+        path = os.path.join(self.root, namespace)
+        if namespace not in self._index:
+            os.makedirs(path, exist_ok=True)
+            files = sorted(os.scandir(path), key=lambda e: e.stat().st_mtime)
+            self._index[namespace] = OrderedDict((e.name, e.stat().st_size) for e in files if e.is_file())
+        return path
+
+    @staticmethod
+    def _name(key: str) -> str:
+        # Keys are hashed so any string is a safe file name
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _sign(self, data: bytes) -> bytes:
+        return hmac.new(self._secret, data, hashlib.sha256).digest()
+
+    def _read(self, path: str) -> Optional[Tuple[float, str, bytes]]:
+        """(expires_at, key, value) of the entry at path; None when it is missing or not signed with our secret."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        mac, data = data[:self._MAC_SIZE], data[self._MAC_SIZE:]
+        if len(data) < self._HEADER.size or not hmac.compare_digest(mac, self._sign(data)):
+            return None
+        expires_at, key_length = self._HEADER.unpack_from(data)
+        start = self._HEADER.size + key_length
+        return expires_at, data[self._HEADER.size:start].decode("utf-8"), data[start:]
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            directory = self._dir(namespace)
+        path = os.path.join(directory, self._name(key))
+        entry = self._read(path)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.time():
+            self.delete(namespace, key)
+            return None
+        with self._lock:
+            index = self._index[namespace]
+            if self._name(key) in index:
+                index.move_to_end(self._name(key))
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, namespace: str, key: str, value: bytes, expires_at: float, max_bytes: int) -> int:
+        if len(value) > max_bytes:
+            return 0
+        with self._lock:
+            directory = self._dir(namespace)
+            name = self._name(key)
+            tmp = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}")
+            encoded_key = key.encode("utf-8")
+            data = self._HEADER.pack(expires_at, len(encoded_key)) + encoded_key + value
+            with open(tmp, "wb") as f:
+                f.write(self._sign(data))
+                f.write(data)
+            os.replace(tmp, os.path.join(directory, name))  # Readers never see a partial file
+            index = self._index[namespace]
+            index.pop(name, None)
+            index[name] = len(value)
+            total, evicted = sum(index.values()), 0
+            while total > max_bytes and len(index) > 1:
+                old, size = index.popitem(last=False)
+                try:
+                    os.remove(os.path.join(directory, old))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+            return evicted
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            directory = self._dir(namespace)
+            self._index[namespace].pop(self._name(key), None)
+        try:
+            os.remove(os.path.join(directory, self._name(key)))
+        except FileNotFoundError:
+            pass
+
+    def clear(self, namespace: str, prefix: str = "") -> None:
+        with self._lock:
+            directory = self._dir(namespace)
+            for name in list(self._index[namespace]):
+                path = os.path.join(directory, name)
+                if prefix:
+                    entry = self._read(path)
+                    if entry is None or not entry[1].startswith(prefix):
+                        continue  # Another user's entry, or one we cannot verify
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                del self._index[namespace][name]
+
+
+class Cache:
+    """
+    A namespace in a cache backend with its own TTL and byte ceiling.
+
+    Values are pickled, so anything picklable can be cached. Keys may be partitioned
+    per user; the partition is a hash of the user key, so emails and tokens are never
+    written to the backend.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: float, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backend: Optional[CacheBackend] = None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._backend = backend
+        self.metrics = CacheMetrics()
+        self._metrics_lock = threading.Lock()
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend if self._backend is not None else default_backend()
+
+    @staticmethod
+    def _partition(user: str) -> str:
+        return hashlib.sha256(user.encode("utf-8")).hexdigest()[:16] + ":" if user else ":"
+
+    def _count(self, **deltas: int) -> None:
+        with self._metrics_lock:
+            for name, delta in deltas.items():
+                setattr(self.metrics, name, getattr(self.metrics, name) + delta)
+
+    def get(self, key: str, user: str = "") -> Optional[Any]:
+        try:
+            data = self.backend.get(self.namespace, self._partition(user) + key)
+            value = pickle.loads(data) if data is not None else None
+        except Exception as e:
+            # A broken cache only costs a recomputation
+            print(f"Cache '{self.namespace}' read failed: {e}")
+            value = None
+        self._count(hits=value is not None, misses=value is None)
+        return value
+
+    def set(self, key: str, value: Any, user: str = "", ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            evicted = self.backend.set(self.namespace, self._partition(user) + key, data, time.time() + ttl,
+                                       self.max_bytes)
+        except Exception as e:
+            print(f"Cache '{self.namespace}' write failed: {e}")
+            return
+        self._count(writes=1, evictions=evicted)
+
+    def delete(self, key: str, user: str = "") -> None:
+        try:
+            self.backend.delete(self.namespace, self._partition(user) + key)
+        except Exception as e:
+            print(f"Cache '{self.namespace}' delete failed: {e}")
+
+    def clear(self) -> None:
+        try:
+            self.backend.clear(self.namespace)
+        except Exception as e:
+            print(f"Cache '{self.namespace}' clear failed: {e}")
+
+    def clear_user(self, user: str) -> None:
+        try:
+            self.backend.clear(self.namespace, self._partition(user))
+        except Exception as e:
+            print(f"Cache '{self.namespace}' clear failed: {e}")
+
+
+_backend: Optional[CacheBackend] = None
+_caches: Dict[str, Cache] = {}
+_lock = threading.Lock()
+
+
+def default_backend() -> CacheBackend:
+    """
+    The process-wide backend chosen by CACHE_BACKEND: "sqlite" (default; a file in
+    CACHE_DIR, so caches survive restarts), "memory" (per process) or "filesystem" (one file per entry under CACHE_DIR, signed with
+    CACHE_SECRET).
+
+    Read from the environment rather than Settings so caches work in tools that run
+    before (or without) the agent's required settings.
+    """
+    global _backend
+    with _lock:
+        if _backend is None:
+            kind = os.getenv("CACHE_BACKEND", "sqlite").lower()
+            directory = os.getenv("CACHE_DIR") or os.path.join(tempfile.gettempdir(), "meeting-prep-cache")
+            if kind == "memory":
+                _backend = MemoryBackend()
+            elif kind == "sqlite":
+                os.makedirs(directory, exist_ok=True)
+                _backend = SQLiteBackend(os.path.join(directory, "cache.sqlite3"))
+            elif kind == "filesystem":
+                secret = os.getenv("CACHE_SECRET", "")
+                if not secret:
+                    print("CACHE_SECRET is not set; filesystem cache entries are not shared across processes")
+                _backend = FileSystemBackend(directory, secret.encode("utf-8") or None)
+            else:
+                raise ValueError(f"Unknown CACHE_BACKEND: {kind}")
+        return _backend
+
+
+def set_default_backend(backend: Optional[CacheBackend]) -> None:
+    """Replace the process-wide backend (None re-reads CACHE_BACKEND on next use)."""
+    global _backend
+    with _lock:
+        _backend = backend
+
+
+def get_cache(namespace: str, ttl_seconds: float, max_bytes: int = DEFAULT_MAX_BYTES) -> Cache:
+    """The cache for a namespace, created on first use with the given TTL and byte ceiling."""
+    with _lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = _caches[namespace] = Cache(namespace, ttl_seconds, max_bytes)
+        return cache
+
+
+def cache_metrics() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters per namespace, e.g. for logging at the end of a brief."""
+    with _lock:
+        caches = list(_caches.values())
+    return {c.namespace: dict(asdict(c.metrics), hit_rate=round(c.metrics.hit_rate, 3)) for c in caches}
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(slots=True)
+class EventAttendee:
+    email: str
+    response_status: Optional[str] = None
+
+
+def _parse_boundary(value: Dict[str, Any]) -> Tuple[float, int, bool]:
+    """(epoch seconds, UTC offset in seconds, all-day) for an event start/end; all-day dates are UTC midnight."""
+    text = value.get("dateTime") or value.get("date") or ""
+    try:
+        dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return float("inf"), 0, False
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc).timestamp(), 0, "dateTime" not in value
+    return dt.timestamp(), int(dt.utcoffset().total_seconds()), False
+
+
+@dataclass(slots=True)
+class CalendarEvent:
+    """
+    One calendar event, parsed once from the API resource.
+
+    Start and end are kept as epoch seconds (cheap to sort and compare); utc_offset
+    remembers the event's own offset so times can still be shown the way the
+    calendar wrote them.
+    """
+
+    id: str
+    summary: str
+    description: str
+    start_ts: float
+    end_ts: float
+    attendees: List[EventAttendee] = field(default_factory=list)
+    calendar_id: str = "primary"
+    recurring_event_id: Optional[str] = None
+    ical_uid: Optional[str] = None
+    html_link: Optional[str] = None
+    location: Optional[str] = None
+    attachments: List[Dict] = field(default_factory=list)
+    status: str = "confirmed"
+    # The user's own RSVP (None when they are not on the guest list, e.g. personal events)
+    self_response_status: Optional[str] = None
+    transparent: bool = False  # "Show as available"
+    all_day: bool = False
+    utc_offset: int = 0
+
+    @classmethod
+    def from_api(cls, item: Dict[str, Any], calendar_id: str = "primary") -> "CalendarEvent":
+        start_ts, utc_offset, all_day = _parse_boundary(item.get("start", {}))
+        end_ts, _, _ = _parse_boundary(item.get("end", {}))
+        attendees = item.get("attendees", [])
+        own = next((a for a in attendees if a.get("self")), None)
+        return cls(
+            id=item.get("id", ""),
+            summary=item.get("summary", ""),
+            description=item.get("description", "") or "",
+            start_ts=start_ts,
+            end_ts=end_ts if end_ts != float("inf") else start_ts,
+            attendees=[
+                EventAttendee(email=a.get("email", ""), response_status=a.get("responseStatus"))
+                for a in attendees
+            ],
+            calendar_id=calendar_id,
+            recurring_event_id=item.get("recurringEventId"),
+            ical_uid=item.get("iCalUID"),
+            html_link=item.get("htmlLink"),
+            location=item.get("location"),
+            attachments=item.get("attachments", []),
+            status=item.get("status", "confirmed"),
+            self_response_status=own.get("responseStatus") if own else None,
+            transparent=item.get("transparency") == "transparent",
+            all_day=all_day,
+            utc_offset=utc_offset,
+        )
+
+    @property
+    def start(self) -> datetime:
+        return datetime.fromtimestamp(self.start_ts, timezone.utc)
+
+    @property
+    def end(self) -> datetime:
+        return datetime.fromtimestamp(self.end_ts, timezone.utc)
+
+    @property
+    def start_iso(self) -> str:
+        return self.start.isoformat()
+
+    @property
+    def end_iso(self) -> str:
+        return self.end.isoformat()
+
+    def local_start(self) -> datetime:
+        """Start in the offset the event was written in."""
+        return datetime.fromtimestamp(self.start_ts, timezone(timedelta(seconds=self.utc_offset)))
+
+    def overlaps(self, start_ts: float, end_ts: float) -> bool:
+        return self.end_ts > start_ts and self.start_ts < end_ts
+
+
+# The brief pipeline and delivery code call the event a meeting is prepared for its "context"
+EventContext = CalendarEvent
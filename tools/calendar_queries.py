@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from tools.calendar_event import CalendarEvent
+from tools.free_slots import zone_for
+
+# Meetings returned in full per query; counts always cover every match
+MAX_LISTED_MEETINGS = 50
+_MAX_LISTED_ATTENDEES = 20
+
+
+def matches_attendee(event: CalendarEvent, attendee: str) -> bool:
+    """Case-insensitive match on any attendee email, so "alice" finds alice@example.com."""
+    needle = attendee.strip().lower()
+    return not needle or any(needle in a.email.lower() for a in event.attendees)
+
+
+def matches_keyword(event: CalendarEvent, keyword: str) -> bool:
+    needle = keyword.strip().lower()
+    if not needle:
+        return True
+    return any(needle in (text or "").lower() for text in (event.summary, event.description, event.location))
+
+
+def filter_events(events: Sequence[CalendarEvent], attendee: str = "", keyword: str = "",
+                  include_declined: bool = False) -> List[CalendarEvent]:
+    return [
+        e for e in events
+        if (include_declined or e.self_response_status != "declined")
+        and matches_attendee(e, attendee) and matches_keyword(e, keyword)
+    ]
+
+
+def _local_day(event: CalendarEvent, zone) -> str:
+    # All-day events are stored at UTC midnight of their date, whatever the viewer's zone
+    return datetime.fromtimestamp(event.start_ts, timezone.utc if event.all_day else zone).date().isoformat()
+
+
+def event_summary(event: CalendarEvent, zone) -> Dict[str, Any]:
+    """Compact, JSON-ready view of an event for tool results."""
+    attendees = [a.email for a in event.attendees if a.email]
+    summary = {
+        "summary": event.summary or "No title",
+        "start": _local_day(event, zone) if event.all_day else datetime.fromtimestamp(event.start_ts, zone).isoformat(),
+        "end": datetime.fromtimestamp(event.end_ts, timezone.utc).date().isoformat() if event.all_day
+        else datetime.fromtimestamp(event.end_ts, zone).isoformat(),
+        "all_day": event.all_day,
+        "calendar_id": event.calendar_id,
+        "location": event.location or "",
+        "response_status": event.self_response_status,
+        "attendee_count": len(attendees),
+        "attendees": attendees[:_MAX_LISTED_ATTENDEES],
+        "link": event.html_link or "",
+    }
+    if event.recurring_event_id:
+        summary["recurring"] = True
+    return summary
+
+
+def query_events(events: Sequence[CalendarEvent], tz: Optional[str] = None, attendee: str = "",
+                 keyword: str = "", limit: int = MAX_LISTED_MEETINGS) -> Dict[str, Any]:
+    """
+    Count and list the events matching the filters, grouped by local day.
+
+    Answers "how many", "what's on" and "meetings with X" questions straight from
+    calendar data, without any document search or model calls.
+    """
+    zone = zone_for(tz)
+    matches = filter_events(events, attendee=attendee, keyword=keyword)
+    per_day = Counter(_local_day(e, zone) for e in matches)
+    return {
+        "timeZone": tz or "UTC",
+        "count": len(matches),
+        "count_by_day": dict(sorted(per_day.items())),
+        "meetings": [event_summary(e, zone) for e in matches[:limit]],
+        "truncated": len(matches) > limit,
+    }
@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from typing import Callable, Dict, Iterator, List, Optional, Set
+from xml.etree.ElementTree import iterparse
+
+from tools.cache import get_cache
+
+
+PDF_MIME_TYPE = "application/pdf"
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+XLSX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+DEFAULT_MAX_PAGES = 50
+DEFAULT_MAX_CHARS = 200_000
+DEFAULT_TIMEOUT_SECONDS = 30.0
+
+# Cache keys name a file revision, so the TTL only bounds how long unused text is kept
+_CACHE_TTL_SECONDS = 7 * 24 * 3600
+_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+_SLIDE_RE = re.compile(r"ppt/slides/slide(\d+)\.xml$")
+_SHEET_RE = re.compile(r"xl/worksheets/sheet(\d+)\.xml$")
+
+
+class DocumentExtractionError(Exception):
+    pass
+
+
+def is_extractable(mime_type: str) -> bool:
+    """True for the binary formats parsed here; text/* is also accepted by extract_text."""
+    return mime_type in _EXTRACTORS
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class _TextBudget:
+    """Collects extracted text and signals when max_chars has been reached."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.size = 0
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.max_chars
+
+    def add(self, text: str) -> None:
+        if text and not self.full:
+            self.parts.append(text)
+            self.size += len(text)
+
+    def text(self) -> str:
+        return "".join(self.parts)[:self.max_chars].strip()
+
+
+def _xml_paragraphs(stream, paragraph_tag: str) -> Iterator[str]:
+    """Stream paragraphs out of an OOXML part without building the whole tree."""
+    current: List[str] = []
+    for _, elem in iterparse(stream, events=("end",)):
+        name = _local(elem.tag)
+        if name == "t" and elem.text:
+            current.append(elem.text)
+        elif name == "tab":
+            current.append("\t")
+        elif name in ("br", "cr"):
+            current.append("\n")
+        elif name == paragraph_tag:
+            if current:
+                yield "".join(current)
+                current = []
+            elem.clear()
+    if current:
+        yield "".join(current)
+
+
+def _numbered_parts(zf: zipfile.ZipFile, pattern: re.Pattern) -> List[str]:
+    matches = [(int(m.group(1)), name) for name in zf.namelist() if (m := pattern.search(name))]
+    return [name for _, name in sorted(matches)]
+
+
+def _extract_docx(data: bytes, max_pages: int, max_chars: int) -> str:
+    budget = _TextBudget(max_chars)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf, zf.open("word/document.xml") as stream:
+        for paragraph in _xml_paragraphs(stream, "p"):
+            budget.add(paragraph + "\n")
+            if budget.full:
+                break
+    return budget.text()
+
+
+def _extract_pptx(data: bytes, max_pages: int, max_chars: int) -> str:
+    budget = _TextBudget(max_chars)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        for number, name in enumerate(_numbered_parts(zf, _SLIDE_RE)[:max_pages], start=1):
+            budget.add(f"\nSlide {number}:\n")
+            with zf.open(name) as stream:
+                for paragraph in _xml_paragraphs(stream, "p"):
+                    budget.add(paragraph + "\n")
+                    if budget.full:
+                        return budget.text()
+    return budget.text()
+
+
+def _shared_strings(zf: zipfile.ZipFile) -> List[str]:
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings: List[str] = []
+    current: List[str] = []
+    with zf.open("xl/sharedStrings.xml") as stream:
+        for _, elem in iterparse(stream, events=("end",)):
+            name = _local(elem.tag)
+            if name == "t" and elem.text:
+                current.append(elem.text)
+            elif name == "si":
+                strings.append("".join(current))
+                current = []
+                elem.clear()
+    return strings
+
+
+def _extract_xlsx(data: bytes, max_pages: int, max_chars: int) -> str:
+    budget = _TextBudget(max_chars)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        shared = _shared_strings(zf)
+        for number, name in enumerate(_numbered_parts(zf, _SHEET_RE)[:max_pages], start=1):
+            budget.add(f"\nSheet {number}:\n")
+            row: List[str] = []
+            cell_type = None
+            value = None
+            with zf.open(name) as stream:
+                for event, elem in iterparse(stream, events=("start", "end")):
+                    tag = _local(elem.tag)
+                    if event == "start":
+                        if tag == "c":
+                            cell_type, value = elem.get("t"), None
+                        continue
+                    if tag in ("v", "t") and elem.text is not None:
+                        value = elem.text
+                    elif tag == "c":
+                        if value is not None and cell_type == "s":
+                            index = int(value)
+                            value = shared[index] if index < len(shared) else ""
+                        row.append(value or "")
+                    elif tag == "row":
+                        if any(row):
+                            budget.add(",".join(row) + "\n")
+                        row = []
+                        elem.clear()
+                        if budget.full:
+                            return budget.text()
+    return budget.text()
+
+
+def _extract_pdf(data: bytes, max_pages: int, max_chars: int) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:  # optional dependency
+        raise DocumentExtractionError("PDF extraction requires the 'pypdf' package") from e
+
+    budget = _TextBudget(max_chars)
+    reader = PdfReader(io.BytesIO(data))
+    for number, page in enumerate(reader.pages[:max_pages], start=1):
+        budget.add(f"\nPage {number}:\n{page.extract_text() or ''}\n")
+        if budget.full:
+            break
+    return budget.text()
+
+
+_EXTRACTORS: Dict[str, Callable[[bytes, int, int], str]] = {
+    PDF_MIME_TYPE: _extract_pdf,
+    DOCX_MIME_TYPE: _extract_docx,
+    PPTX_MIME_TYPE: _extract_pptx,
+    XLSX_MIME_TYPE: _extract_xlsx,
+}
+
+
+def extract_text(data: bytes, mime_type: str, max_pages: int = DEFAULT_MAX_PAGES,
+                 max_chars: int = DEFAULT_MAX_CHARS) -> str:
+    """Extract plain text from a PDF, Office or text/* document in the current process."""
+    if mime_type.startswith("text/"):
+        return data[:max_chars * 4].decode("utf-8", errors="replace")[:max_chars].strip()
+    extractor = _EXTRACTORS.get(mime_type)
+    if extractor is None:
+        raise DocumentExtractionError(f"Unsupported file type '{mime_type}'")
+    try:
+        return extractor(data, max_pages, max_chars)
+    except DocumentExtractionError:
+        raise
+    except Exception as e:
+        raise DocumentExtractionError(f"Could not parse {mime_type} file: {e}") from e
+
+
+# Parsing is CPU bound and would hold the GIL in the brief pipeline's worker threads, so it
+# runs in a few worker processes, each serving one document at a time over a pipe. A parse
+# that overruns its timeout kills only its own worker. "spawn" avoids forking a process that
+# has live threads.
+_idle_workers: List["_Worker"] = []
+_workers: Set["_Worker"] = set()
+_pool_slots: Optional[threading.BoundedSemaphore] = None
+_pool_lock = threading.Lock()
+
+_cache = get_cache("document_text", _CACHE_TTL_SECONDS, _CACHE_MAX_BYTES)
+
+
+def _pool_size() -> int:
+    # Read from the environment so tools work outside the agent deployment settings
+    return max(1, int(os.getenv("DOCUMENT_EXTRACT_WORKERS", "2")))
+
+
+def _serve(conn) -> None:
+    """Worker process loop: extract_text for each (data, mime_type, max_pages, max_chars) received."""
+    while True:
+        try:
+            args = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, extract_text(*args)))
+        except Exception as e:
+            conn.send((False, str(e)))
+
+
+class _Worker:
+    """One spawned extraction process."""
+
+    def __init__(self):
+        context = multiprocessing.get_context("spawn")
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), name="document-extract", daemon=True)
+        self.process.start()
+        child.close()
+
+    def extract(self, args: tuple, timeout: float) -> str:
+        """Text of one document; raises TimeoutError when the worker has not answered within timeout."""
+        self.conn.send(args)
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        ok, value = self.conn.recv()
+        if not ok:
+            raise DocumentExtractionError(value)
+        return value
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def _slots() -> threading.BoundedSemaphore:
+    global _pool_slots
+    with _pool_lock:
+        if _pool_slots is None:
+            # One document per worker; callers beyond that wait for a free worker (sized once)
+            _pool_slots = threading.BoundedSemaphore(_pool_size())
+        return _pool_slots
+
+
+def _checkout() -> _Worker:
+    """An idle worker, or a new one (a slot is held, so there are never more than _pool_size())."""
+    with _pool_lock:
+        while _idle_workers:
+            worker = _idle_workers.pop()
+            if worker.process.is_alive():
+                return worker
+            _workers.discard(worker)
+            worker.conn.close()
+    worker = _Worker()
+    with _pool_lock:
+        _workers.add(worker)
+    return worker
+
+
+def _release(worker: _Worker) -> None:
+    with _pool_lock:
+        if worker in _workers:  # Not shut down meanwhile
+            _idle_workers.append(worker)
+
+
+def _retire(worker: _Worker) -> None:
+    with _pool_lock:
+        _workers.discard(worker)
+    worker.kill()
+
+
+def shutdown_pool() -> None:
+    global _pool_slots
+    with _pool_lock:
+        workers = list(_workers)
+        _workers.clear()
+        _idle_workers.clear()
+        _pool_slots = None
+    for worker in workers:
+        worker.kill()
+
+
+def extract_text_in_pool(data: bytes, mime_type: str, max_pages: int = DEFAULT_MAX_PAGES,
+                         max_chars: int = DEFAULT_MAX_CHARS, timeout: float = DEFAULT_TIMEOUT_SECONDS) -> str:
+    if not is_extractable(mime_type):
+        raise DocumentExtractionError(f"Unsupported file type '{mime_type}'")
+    slots = _slots()
+    if not slots.acquire(timeout=timeout):
+        raise DocumentExtractionError("Document extraction pool is busy")
+    try:
+        worker = _checkout()
+        try:
+            text = worker.extract((data, mime_type, max_pages, max_chars), timeout)
+        except TimeoutError as e:
+            # Only this worker is stuck; the others keep serving other briefs
+            _retire(worker)
+            raise DocumentExtractionError(f"Extraction timed out after {timeout:.0f}s") from e
+        except (EOFError, OSError) as e:
+            # The worker crashed (e.g. out of memory on a hostile file)
+            _retire(worker)
+            raise DocumentExtractionError("Document extraction worker stopped") from e
+        except DocumentExtractionError:
+            _release(worker)  # The file could not be parsed; the worker is fine
+            raise
+        _release(worker)
+        return text
+    finally:
+        slots.release()
+
+
+def get_cached_text(cache_key: str, user: str = "") -> Optional[str]:
+    return _cache.get(cache_key, user=user)
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def get_document_text(cache_key: Optional[str], mime_type: str, fetch: Callable[[], bytes],
+                      max_pages: int = DEFAULT_MAX_PAGES, max_chars: int = DEFAULT_MAX_CHARS,
+                      timeout: float = DEFAULT_TIMEOUT_SECONDS, user: str = "") -> str:
+    """
+    Return extracted text for a document, downloading and parsing it only on a cache miss.
+
+    cache_key should identify the file revision (e.g. "<fileId>:<version>") so edited
+    files are re-extracted; pass None to skip the cache. user (e.g. a token fingerprint)
+    partitions the cache, so text is only served back to someone who could read the file.
+    """
+    if cache_key is not None:
+        cached = get_cached_text(cache_key, user)
+        if cached is not None:
+            return cached
+
+    if mime_type.startswith("text/"):
+        text = extract_text(fetch(), mime_type, max_pages, max_chars)  # Nothing to parse; skip the pool
+    else:
+        text = extract_text_in_pool(fetch(), mime_type, max_pages, max_chars, timeout)
+
+    if cache_key is not None:
+        _cache.set(cache_key, text, user=user)
+    return text
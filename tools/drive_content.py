@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import codecs
+import io
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+@dataclass
+class DriveText:
+    text: str
+    bytes_read: int
+    truncated: bool
+
+
+def download_bytes(drive_service: Any, file_id: str, export_mime_type: Optional[str] = None,
+                   max_bytes: int = DEFAULT_MAX_BYTES, chunk_size: int = DEFAULT_CHUNK_SIZE) -> tuple[bytes, bool]:
+    """
+    Stream a Drive file (or a Google Docs export) in chunks and stop once max_bytes have arrived.
+
+    Returns (data, truncated). Binary files honour Range requests, so at most one chunk past
+    the ceiling is transferred; exports are served whole by Drive (capped at 10 MB server side)
+    and are only trimmed locally.
+    """
+    from googleapiclient.http import MediaIoBaseDownload
+
+    files = drive_service.files()
+    if export_mime_type:
+        request = files.export_media(fileId=file_id, mimeType=export_mime_type)
+    else:
+        request = files.get_media(fileId=file_id)
+
+    buffer = io.BytesIO()
+    downloader = MediaIoBaseDownload(buffer, request, chunksize=max(1, min(chunk_size, max_bytes)))
+    done = False
+    while not done and buffer.tell() < max_bytes:
+        _, done = downloader.next_chunk()
+
+    data = buffer.getvalue()
+    truncated = len(data) > max_bytes or not done
+    return data[:max_bytes], truncated
+
+
+def download_text(drive_service: Any, file_id: str, export_mime_type: Optional[str] = None,
+                  max_bytes: int = DEFAULT_MAX_BYTES, chunk_size: int = DEFAULT_CHUNK_SIZE) -> DriveText:
+    """Download up to max_bytes of a file and decode it as UTF-8 text."""
+    data, truncated = download_bytes(drive_service, file_id, export_mime_type, max_bytes, chunk_size)
+    # A cut-off download can end mid-character; the incremental decoder drops the partial tail
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    text = decoder.decode(data, final=not truncated)
+    return DriveText(text=text, bytes_read=len(data), truncated=truncated)
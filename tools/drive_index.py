@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from config.settings import load_settings
+
+# Drive is asked for changes at most this often per user; briefs in between read the index as is
+SYNC_INTERVAL_SECONDS = 60
+_PAGE_SIZE = 1000
+_FILE_FIELDS = "id, name, mimeType, modifiedTime, owners(emailAddress, displayName), parents, webViewLink, trashed"
+_FOLDER_MIME = "application/vnd.google-apps.folder"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    mime_type TEXT NOT NULL,
+    modified_time TEXT NOT NULL,
+    parents TEXT NOT NULL,
+    link TEXT NOT NULL,
+    owner_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_modified ON files (modified_time DESC);
+CREATE TABLE IF NOT EXISTS owners (
+    file_id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (email, file_id)
+);
+CREATE INDEX IF NOT EXISTS owners_file ON owners (file_id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+@dataclass
+class IndexedFile:
+    id: str
+    name: str
+    mime_type: str
+    modified_time: str
+    parents: List[str]
+    link: str
+    owner: str
+    owner_emails: List[str]
+
+
+class DriveIndex:
+    """
+    One user's Drive file metadata in SQLite: seeded with a single files.list pass,
+    then kept current from the changes.list page-token feed.
+
+    Name and owner lookups are answered locally; content (fullText) search still
+    needs the Drive API.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._last_sync = 0.0
+        self.seeding = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def seeded(self) -> bool:
+        with self._lock:
+            return self._meta("page_token") is not None
+
+    def _upsert(self, files: Iterable[Dict[str, Any]]) -> None:
+        for f in files:
+            if f.get("trashed"):
+                self._delete(f["id"])
+                continue
+            owners = f.get("owners", [])
+            name = f.get("name", "")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    f["id"], name, name.lower(), f.get("mimeType", ""), f.get("modifiedTime", ""),
+                    " ".join(f.get("parents", [])),
+                    f.get("webViewLink") or f"https://drive.google.com/file/d/{f['id']}/view",
+                    owners[0].get("displayName") or owners[0].get("emailAddress", "") if owners else "",
+                ),
+            )
+            self._conn.execute("DELETE FROM owners WHERE file_id = ?", (f["id"],))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO owners VALUES (?, ?)",
+                [(f["id"], o["emailAddress"].lower()) for o in owners if o.get("emailAddress")],
+            )
+
+    def _delete(self, file_id: str) -> None:
+        self._conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        self._conn.execute("DELETE FROM owners WHERE file_id = ?", (file_id,))
+
+    def seed(self, service) -> int:
+        """Full listing of the user's Drive; the start token is taken first so nothing changed meanwhile is lost."""
+        start_token = service.changes().getStartPageToken().execute()["startPageToken"]
+        count, page_token = 0, None
+        while True:
+            response = service.files().list(
+                q="trashed = false", pageSize=_PAGE_SIZE, pageToken=page_token,
+                fields=f"nextPageToken, files({_FILE_FIELDS})",
+            ).execute()
+            files = response.get("files", [])
+            with self._lock, self._conn:
+                self._upsert(files)
+            count += len(files)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('page_token', ?)", (start_token,))
+        self._last_sync = time.monotonic()
+        return count
+
+    def sync(self, service, force: bool = False, on_remove: Optional[Callable[[str], None]] = None) -> int:
+        """
+        Apply changes since the stored page token; a no-op within SYNC_INTERVAL_SECONDS
+        of the last sync. on_remove is called with each removed or trashed file id.
+        """
+        if not force and time.monotonic() - self._last_sync < SYNC_INTERVAL_SECONDS:
+            return 0
+        with self._lock:
+            page_token = self._meta("page_token")
+        if page_token is None:
+            return 0
+        applied, removed = 0, []
+        while page_token:
+            response = service.changes().list(
+                pageToken=page_token, pageSize=_PAGE_SIZE, includeRemoved=True,
+                fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({_FILE_FIELDS}))",
+            ).execute()
+            with self._lock, self._conn:
+                for change in response.get("changes", []):
+                    file_id = change.get("fileId")
+                    if not file_id:
+                        continue  # Shared drive changes carry no file
+                    if change.get("removed") or "file" not in change:
+                        self._delete(file_id)
+                        removed.append(file_id)
+                    else:
+                        if change["file"].get("trashed"):
+                            removed.append(file_id)
+                        self._upsert([change["file"]])
+                    applied += 1
+                new_start = response.get("newStartPageToken")
+                page_token = response.get("nextPageToken")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('page_token', ?)", (new_start or page_token,)
+                )
+            if new_start:
+                break
+        self._last_sync = time.monotonic()
+        if on_remove is not None:
+            for file_id in removed:
+                on_remove(file_id)
+        return applied
+
+    def _files(self, where: str, params: Sequence[Any], limit: int) -> List[IndexedFile]:
+        sql = (
+            "SELECT id, name, mime_type, modified_time, parents, link, owner_name, "
+            "(SELECT group_concat(email, ' ') FROM owners WHERE file_id = files.id) "
+            f"FROM files WHERE mime_type != ? AND ({where}) ORDER BY modified_time DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, (_FOLDER_MIME, *params, limit)).fetchall()
+        return [
+            IndexedFile(id=r[0], name=r[1], mime_type=r[2], modified_time=r[3], parents=r[4].split(),
+                        link=r[5], owner=r[6], owner_emails=(r[7] or "").split())
+            for r in rows
+        ]
+
+    def get(self, file_id: str) -> Optional[IndexedFile]:
+        found = self._files("id = ?", (file_id,), 1)
+        return found[0] if found else None
+
+    def search_names(self, terms: Sequence[str], match_all: bool = False, limit: int = 15) -> List[IndexedFile]:
+        """Files whose name contains any (or, with match_all, every) of the terms, newest first."""
+        terms = [t.strip().lower() for t in terms if t and t.strip()]
+        if not terms:
+            return []
+        joiner = " AND " if match_all else " OR "
+        where = joiner.join("instr(name_lower, ?) > 0" for _ in terms)
+        return self._files(where, terms, limit)
+
+    def search_owners(self, emails: Sequence[str], limit: int = 15) -> List[IndexedFile]:
+        emails = [e.strip().lower() for e in emails if e and e.strip()]
+        if not emails:
+            return []
+        placeholders = ", ".join("?" for _ in emails)
+        return self._files(f"id IN (SELECT file_id FROM owners WHERE email IN ({placeholders}))", emails, limit)
+
+
+_indexes: Dict[str, DriveIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_path(user_key: str, directory: str, suffix: str) -> str:
+    """Per-user database file; named by a hash so emails do not end up in file names."""
+    directory = directory or os.path.join(tempfile.gettempdir(), "meeting-prep-drive-index")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, hashlib.sha256(user_key.encode("utf-8")).hexdigest()[:32] + suffix)
+
+
+def _resolve_user_key(creds: Any, user_key: str) -> str:
+    if user_key:
+        return user_key
+    from tools.whoami import resolve_identity
+
+    return resolve_identity(creds).email or ""
+
+
+def _open_index(user_key: str, directory: str) -> DriveIndex:
+    with _indexes_lock:
+        index = _indexes.get(user_key)
+        if index is None:
+            index = _indexes[user_key] = DriveIndex(_index_path(user_key, directory, ".sqlite3"))
+        return index
+
+
+def close_indexes() -> None:
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.close()
+        _indexes.clear()
+
+
+def _fulltext_index(creds: Any, user_key: str) -> Any:
+    """The user's full-text index, so documents deleted upstream leave it too; None when it is off or unavailable."""
+    from tools.fulltext_index import index_for as fulltext_index_for
+
+    try:
+        return fulltext_index_for(creds, user_key)
+    except Exception as e:
+        print(f"Full-text index unavailable: {e}")
+        return None
+
+
+def _seed_in_background(index: Any, service_factory: Callable[[], Any], label: str = "Drive index") -> None:
+    """Run index.seed on a daemon thread, unless one already is; index.seeding stays True until it is done."""
+    def run():
+        try:
+            count = index.seed(service_factory())
+            print(f"{label} seeded with {count} entries")
+        except Exception as e:
+            print(f"{label} seeding failed: {e}")
+        finally:
+            index.seeding = False
+
+    with _indexes_lock:
+        if index.seeding:
+            return
+        index.seeding = True
+    threading.Thread(target=run, name="index-seed", daemon=True).start()
+
+
+def index_for(creds: Any, user_key: str = "",
+              service_factory: Optional[Callable[[], Any]] = None) -> Optional[DriveIndex]:
+    """
+    The Drive index of the user identified by user_key (their email), brought up to
+    date from the changes feed.
+
+    Returns None while the index is still being seeded (the first call starts seeding
+    in the background), so callers fall back to live Drive search meanwhile.
+    """
+    settings = load_settings()
+    if not settings.drive_index_enabled:
+        return None
+    if service_factory is None:
+        from agents.oauth_util import build_google_service
+
+        def service_factory():
+            return build_google_service("drive", "v3", creds)
+
+    user_key = _resolve_user_key(creds, user_key)
+    if not user_key:
+        return None
+    index = _open_index(user_key, settings.drive_index_dir)
+    if not index.seeded:
+        _seed_in_background(index, service_factory)
+        return None
+    fulltext = _fulltext_index(creds, user_key)
+    try:
+        index.sync(service_factory(), on_remove=fulltext.remove if fulltext is not None else None)
+    except Exception as e:
+        # A stale index still answers name and owner queries
+        print(f"Drive index sync failed: {e}")
+    return index
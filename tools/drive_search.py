@@ -3,10 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, List, Optional
 
-from googleapiclient.discovery import build
-
 from config.settings import load_settings
-from agents.oauth_util import get_google_creds_from_tool_context
+from agents.oauth_util import build_google_service, get_google_creds_from_tool_context
 
 
 @dataclass
@@ -19,22 +17,49 @@ class DocumentReference:
 
 
 def search_drive(tool_context: Any, query_terms: List[str], page_size: int = 10) -> List[DocumentReference]:
+    """
+    Files whose names contain every term. Answered from the local Drive index when it
+    is ready; the Drive API is only asked (by content, fullText) when the index has no
+    name match, or by name while the index is still being seeded.
+    """
+    from tools.drive_index import index_for
+
     settings = load_settings()
     creds = get_google_creds_from_tool_context(tool_context, settings.auth_id)
-    service = build("drive", "v3", credentials=creds)
+    service = build_google_service("drive", "v3", creds)
 
-    q_parts = ["trashed = false"]
-    for t in query_terms:
-        safe = t.replace("\"", "\"")
-        q_parts.append(f"name contains '{safe}'")
-    q = " and ".join(q_parts)
+    field = "name"
+    try:
+        index = index_for(creds, tool_context.state.get("_user_email") or "")
+    except Exception as e:
+        print(f"Drive index unavailable: {e}")
+        index = None
+    if index is not None:
+        files = index.search_names(query_terms, match_all=True, limit=page_size)
+        if files:
+            return [
+                DocumentReference(id=f.id, title=f.name, link=f.link, mime_type=f.mime_type, source="drive-search")
+                for f in files
+            ]
+        field = "fullText"
 
     results = (
         service.files()
-        .list(q=q, pageSize=page_size, fields="files(id, name, mimeType, webViewLink)")
+        .list(q=_drive_query(query_terms, field), pageSize=page_size, fields="files(id, name, mimeType, webViewLink)")
         .execute()
     )
-    files = results.get("files", [])
+    return _references(results.get("files", []))
+
+
+def _drive_query(query_terms: List[str], field: str) -> str:
+    q_parts = ["trashed = false"]
+    for t in query_terms:
+        safe = t.replace("\\", "\\\\").replace("'", "\\'")
+        q_parts.append(f"{field} contains '{safe}'")
+    return " and ".join(q_parts)
+
+
+def _references(files: List[dict]) -> List[DocumentReference]:
     return [
         DocumentReference(
             id=f["id"],
@@ -45,3 +70,35 @@ def search_drive(tool_context: Any, query_terms: List[str], page_size: int = 10)
         )
         for f in files
     ]
+
+
+async def search_drive_async(tool_context: Any, query_terms: List[str], page_size: int = 10,
+                             client: Any = None) -> List[DocumentReference]:
+    """search_drive for asyncio callers; the local index is read off the event loop."""
+    import asyncio
+
+    from tools.async_clients import AsyncGoogleClient
+    from tools.drive_index import index_for
+
+    settings = load_settings()
+    creds = get_google_creds_from_tool_context(tool_context, settings.auth_id)
+    client = client or AsyncGoogleClient(creds)
+
+    field = "name"
+    try:
+        index = await asyncio.to_thread(index_for, creds, tool_context.state.get("_user_email") or "")
+    except Exception as e:
+        print(f"Drive index unavailable: {e}")
+        index = None
+    if index is not None:
+        files = await asyncio.to_thread(index.search_names, query_terms, True, page_size)
+        if files:
+            return [
+                DocumentReference(id=f.id, title=f.name, link=f.link, mime_type=f.mime_type, source="drive-search")
+                for f in files
+            ]
+        field = "fullText"
+
+    files = await client.list_files(max_items=page_size, q=_drive_query(query_terms, field), pageSize=page_size,
+                                    fields="nextPageToken, files(id, name, mimeType, webViewLink)")
+    return _references(files)
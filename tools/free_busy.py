@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from tools.free_slots import BusyInfo, Interval, merge_intervals, parse_datetime
+
+# freebusy.query limits: 50 calendars per request and a bounded time span per request
+MAX_CALENDARS_PER_REQUEST = 50
+MAX_WINDOW = timedelta(days=60)
+DEFAULT_CACHE_TTL_SECONDS = 120
+# (scope, attendee) entries kept; the least recently stored are dropped first
+MAX_CACHE_ENTRIES = 5000
+
+
+@dataclass
+class _CachedWindow:
+    start: datetime
+    end: datetime
+    expires_at: float
+    intervals: List[Interval]
+    error: Optional[str]
+
+
+# (scope, attendee) -> windows already fetched for that attendee
+_cache: Dict[Tuple[str, str], List[_CachedWindow]] = {}
+_cache_lock = threading.Lock()
+
+
+def _windows(time_min: datetime, time_max: datetime, max_window: timedelta) -> List[Tuple[datetime, datetime]]:
+    """Split the range into windows on whole UTC days, so nearby follow-up ranges hit the cache."""
+    start = time_min.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    end = time_max.astimezone(timezone.utc)
+    if end.time() != datetime.min.time():
+        end = end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    windows = []
+    while start < end:
+        windows.append((start, min(start + max_window, end)))
+        start += max_window
+    return windows
+
+
+def _cache_get(scope: str, email: str, window: Tuple[datetime, datetime], now: float) -> Optional[_CachedWindow]:
+    """A cached window covering the requested one (e.g. from a wider earlier query), if still fresh."""
+    with _cache_lock:
+        entries = [w for w in _cache.get((scope, email), []) if w.expires_at > now]
+        if entries:
+            _cache[(scope, email)] = entries
+        else:
+            _cache.pop((scope, email), None)
+        return next((w for w in entries if w.start <= window[0] and w.end >= window[1]), None)
+
+
+def _cache_put(scope: str, email: str, window: Tuple[datetime, datetime], intervals: List[Interval],
+               error: Optional[str], ttl: float) -> None:
+    now = time.monotonic()
+    with _cache_lock:
+        # Purge on every put, so entries of scopes that are never looked up again do not pile up
+        for key in [k for k, windows in _cache.items() if all(w.expires_at <= now for w in windows)]:
+            del _cache[key]
+        windows = _cache.pop((scope, email), [])
+        windows.append(_CachedWindow(window[0], window[1], now + ttl, intervals, error))
+        _cache[(scope, email)] = windows  # Re-inserted, so dict order is least recently stored first
+        while len(_cache) > MAX_CACHE_ENTRIES:
+            del _cache[next(iter(_cache))]
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def query_busy(
+    creds: Any,
+    attendee_emails: Sequence[str],
+    time_min: datetime,
+    time_max: datetime,
+    service_factory: Optional[Callable[[], Any]] = None,
+    max_workers: int = 8,
+    cache_ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+    cache_scope: Optional[str] = None,
+    calendars_per_request: int = MAX_CALENDARS_PER_REQUEST,
+    max_window: timedelta = MAX_WINDOW,
+) -> BusyInfo:
+    """
+    Busy intervals for every attendee over [time_min, time_max), however many attendees or days.
+
+    The query is sharded into requests of at most `calendars_per_request` calendars and
+    `max_window` of time, which run concurrently (one Calendar service per worker thread)
+    and are merged per attendee. Each attendee's busy blocks per window are cached for
+    cache_ttl_seconds, scoped to the caller (defaults to a fingerprint of the credentials), so follow-up
+    questions in a conversation do not query the API again.
+    """
+    if service_factory is None:
+        from agents.oauth_util import build_google_service
+
+        def service_factory():
+            return build_google_service("calendar", "v3", creds)
+
+    if cache_scope is None:
+        from tools.whoami import token_fingerprint
+
+        # A hash rather than the bearer token itself
+        cache_scope = token_fingerprint(creds)
+    scope = cache_scope
+    emails = list(dict.fromkeys(attendee_emails))  # Dedupe, keep order
+    windows = _windows(time_min, time_max, max_window)
+    now = time.monotonic()
+
+    busy: Dict[str, List[Interval]] = {email: [] for email in emails}
+    errors: Dict[str, str] = {}
+    shards: List[Tuple[Tuple[datetime, datetime], List[str]]] = []
+    for window in windows:
+        missing = []
+        for email in emails:
+            cached = _cache_get(scope, email, window, now)
+            if cached is None:
+                missing.append(email)
+                continue
+            busy[email].extend(cached.intervals)
+            if cached.error:
+                errors[email] = cached.error
+        for i in range(0, len(missing), calendars_per_request):
+            shards.append((window, missing[i:i + calendars_per_request]))
+
+    def _run(shard):
+        (window_start, window_end), shard_emails = shard
+        body = {
+            "timeMin": window_start.isoformat(),
+            "timeMax": window_end.isoformat(),
+            "items": [{"id": email} for email in shard_emails],
+        }
+        try:
+            return shard, service_factory().freebusy().query(body=body).execute(), None
+        except Exception as e:
+            return shard, None, e
+
+    if shards:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(shards)))) as pool:
+            results = list(pool.map(_run, shards))
+    else:
+        results = []
+
+    for (window, shard_emails), response, exception in results:
+        calendars = (response or {}).get("calendars", {})
+        for email in shard_emails:
+            if exception is not None:
+                # Not cached: a failed request should be retried on the next turn
+                errors[email] = f"requestFailed: {exception}"
+                continue
+            calendar = calendars.get(email, {})
+            intervals = [(parse_datetime(b["start"]), parse_datetime(b["end"])) for b in calendar.get("busy", [])]
+            error = ", ".join(e.get("reason", "unknown") for e in calendar.get("errors", [])) or None
+            _cache_put(scope, email, window, intervals, error, cache_ttl_seconds)
+            busy[email].extend(intervals)
+            if error:
+                errors[email] = error
+
+    time_min, time_max = time_min.astimezone(timezone.utc), time_max.astimezone(timezone.utc)
+    clipped = {
+        email: [(max(s, time_min), min(e, time_max)) for s, e in merge_intervals(intervals) if s < time_max and e > time_min]
+        for email, intervals in busy.items()
+    }
+    return BusyInfo(busy=clipped, errors=errors)
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+Interval = Tuple[datetime, datetime]
+
+# Above this many attendees the minute bitmap beats sorting every busy interval
+BITMAP_MIN_ATTENDEES = 20
+
+
+@dataclass(frozen=True)
+class WorkingHours:
+    timezone: str = "UTC"
+    start: time = time(9, 0)
+    end: time = time(17, 0)
+    weekdays: Tuple[int, ...] = (0, 1, 2, 3, 4)  # Monday=0
+
+
+@dataclass
+class FreeSlot:
+    start: datetime
+    end: datetime
+    score: float = 0.0
+
+    def to_dict(self, tz: Optional[str] = None) -> Dict[str, Any]:
+        zone = zone_for(tz) if tz else timezone.utc
+        return {
+            "start": self.start.astimezone(zone).isoformat(),
+            "end": self.end.astimezone(zone).isoformat(),
+            "score": round(self.score, 3),
+        }
+
+
+@dataclass
+class BusyInfo:
+    busy: Dict[str, List[Interval]] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+def zone_for(name: Optional[str]):
+    """The tzinfo for an IANA timezone name; UTC when the name is empty or unknown."""
+    try:
+        return ZoneInfo(name) if name else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def parse_datetime(value: str, tz: Optional[str] = None) -> datetime:
+    """ISO 8601 time as UTC; values without an offset are taken to be in tz (UTC when not given)."""
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=zone_for(tz))
+    return dt.astimezone(timezone.utc)
+
+
+def parse_freebusy(response: Mapping[str, Any]) -> BusyInfo:
+    """Busy intervals (UTC) per calendar from a freebusy.query response"""
+    info = BusyInfo()
+    for calendar_id, calendar in (response.get("calendars") or {}).items():
+        errors = calendar.get("errors") or []
+        if errors:
+            info.errors[calendar_id] = ", ".join(e.get("reason", "unknown") for e in errors)
+        info.busy[calendar_id] = [
+            (parse_datetime(b["start"]), parse_datetime(b["end"])) for b in calendar.get("busy", [])
+        ]
+    return info
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sweep over intervals sorted by start, merging any that overlap or touch."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def working_windows(hours: WorkingHours, range_start: datetime, range_end: datetime) -> List[Interval]:
+    """Working-hour windows (UTC) for one attendee, computed in their own timezone"""
+    zone = zone_for(hours.timezone)
+    day = range_start.astimezone(zone).date() - timedelta(days=1)
+    last_day = range_end.astimezone(zone).date()
+    windows = []
+    while day <= last_day:
+        if day.weekday() in hours.weekdays:
+            start = datetime.combine(day, hours.start, tzinfo=zone).astimezone(timezone.utc)
+            end = datetime.combine(day, hours.end, tzinfo=zone).astimezone(timezone.utc)
+            if end <= start:  # Shift crosses midnight
+                end = datetime.combine(day + timedelta(days=1), hours.end, tzinfo=zone).astimezone(timezone.utc)
+            start, end = max(start, range_start), min(end, range_end)
+            if start < end:
+                windows.append((start, end))
+        day += timedelta(days=1)
+    return windows
+
+
+def _complement(intervals: Sequence[Interval], range_start: datetime, range_end: datetime) -> List[Interval]:
+    gaps = []
+    cursor = range_start
+    for start, end in intervals:
+        if start > cursor:
+            gaps.append((cursor, min(start, range_end)))
+        cursor = max(cursor, end)
+        if cursor >= range_end:
+            break
+    if cursor < range_end:
+        gaps.append((cursor, range_end))
+    return [(s, e) for s, e in gaps if s < e]
+
+
+def _blocked_intervals(busy: Mapping[str, Sequence[Interval]], hours: Mapping[str, WorkingHours],
+                       range_start: datetime, range_end: datetime) -> List[Interval]:
+    blocked: List[Interval] = []
+    for attendee, intervals in busy.items():
+        blocked.extend(intervals)
+        if attendee in hours:
+            windows = merge_intervals(working_windows(hours[attendee], range_start, range_end))
+            blocked.extend(_complement(windows, range_start, range_end))
+    return blocked
+
+
+def _free_by_sweep(blocked: List[Interval], range_start: datetime, range_end: datetime) -> List[Interval]:
+    return _complement(merge_intervals(blocked), range_start, range_end)
+
+
+def _free_by_bitmap(np, blocked: List[Interval], range_start: datetime, range_end: datetime) -> List[Interval]:
+    """Minute-resolution difference array: O(intervals + minutes) regardless of attendee count."""
+    minutes = int((range_end - range_start).total_seconds() // 60)
+    if minutes <= 0:
+        return []
+    base = range_start.timestamp()
+    starts = np.array([s.timestamp() for s, _ in blocked], dtype=np.float64)
+    ends = np.array([e.timestamp() for _, e in blocked], dtype=np.float64)
+    # A partially busy minute counts as busy
+    first = np.clip(np.floor((starts - base) / 60), 0, minutes).astype(np.int64)
+    last = np.clip(np.ceil((ends - base) / 60), 0, minutes).astype(np.int64)
+    diff = np.zeros(minutes + 1, dtype=np.int32)
+    np.add.at(diff, first, 1)
+    np.add.at(diff, last, -1)
+    free = np.cumsum(diff[:-1]) == 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], free, [False])).astype(np.int8)))
+    return [
+        (range_start + timedelta(minutes=int(a)), min(range_start + timedelta(minutes=int(b)), range_end))
+        for a, b in zip(edges[::2], edges[1::2])
+    ]
+
+
+def _numpy():
+    try:
+        import numpy
+        return numpy
+    except ImportError:  # numpy optional; the sweep handles every case
+        return None
+
+
+def free_intervals(busy: Mapping[str, Sequence[Interval]], range_start: datetime, range_end: datetime,
+                   working_hours: Optional[Mapping[str, WorkingHours]] = None) -> List[Interval]:
+    """Intervals when every attendee is free and inside their working hours."""
+    blocked = _blocked_intervals(busy, working_hours or {}, range_start, range_end)
+    np = _numpy() if len(busy) >= BITMAP_MIN_ATTENDEES else None
+    if np is not None and blocked:
+        return _free_by_bitmap(np, blocked, range_start, range_end)
+    return _free_by_sweep(blocked, range_start, range_end)
+
+
+def _ceil_to_step(dt: datetime, step: timedelta) -> datetime:
+    seconds = step.total_seconds()
+    remainder = dt.timestamp() % seconds
+    return dt if remainder == 0 else dt + timedelta(seconds=seconds - remainder)
+
+
+def find_free_slots(
+    busy: Mapping[str, Sequence[Interval]],
+    range_start: datetime,
+    range_end: datetime,
+    duration: timedelta,
+    working_hours: Optional[Union[WorkingHours, Mapping[str, WorkingHours]]] = None,
+    step: timedelta = timedelta(minutes=15),
+    max_slots: int = 5,
+    max_per_day: int = 2,
+    display_tz: Optional[str] = None,
+) -> List[FreeSlot]:
+    """
+    Rank meeting slots of `duration` when all attendees are free.
+
+    working_hours may be one WorkingHours for everybody or a per-attendee mapping;
+    attendees missing from the mapping are only constrained by their busy times.
+    Slots start on `step` boundaries. Earlier days, slots with slack around them and
+    slots near mid-day (in display_tz) rank higher, and at most max_per_day slots are
+    returned per day so the suggestions cover several days.
+    """
+    if isinstance(working_hours, WorkingHours):
+        working_hours = {attendee: working_hours for attendee in busy}
+    free = free_intervals(busy, range_start, range_end, working_hours)
+
+    zone = zone_for(display_tz)
+    first_day = range_start.astimezone(zone).date()
+    candidates: List[FreeSlot] = []
+    for gap_start, gap_end in free:
+        start = _ceil_to_step(gap_start, step)
+        while start + duration <= gap_end:
+            end = start + duration
+            local = start.astimezone(zone)
+            days_out = (local.date() - first_day).days
+            slack_minutes = min((start - gap_start).total_seconds(), (gap_end - end).total_seconds()) / 60
+            hours_from_midday = abs(local.hour + local.minute / 60 - 12.5)
+            score = (
+                0.5 / (1 + days_out)
+                + 0.3 * min(slack_minutes, 60) / 60
+                + 0.2 * max(0.0, 1 - hours_from_midday / 6)
+            )
+            candidates.append(FreeSlot(start, end, score))
+            start += step
+
+    candidates.sort(key=lambda s: (-s.score, s.start))
+    chosen: List[FreeSlot] = []
+    per_day: Dict[Any, int] = {}
+    for slot in candidates:
+        day = slot.start.astimezone(zone).date()
+        if per_day.get(day, 0) >= max_per_day or any(slot.start < c.end and c.start < slot.end for c in chosen):
+            continue
+        chosen.append(slot)
+        per_day[day] = per_day.get(day, 0) + 1
+        if len(chosen) >= max_slots:
+            break
+    return chosen
+
+
+def fetch_attendee_timezones(calendar_service: Any, attendee_emails: Sequence[str],
+                             default_tz: str) -> Dict[str, str]:
+    """Look up each attendee's calendar timezone in one batch request; unreadable calendars get default_tz."""
+    # Batch request ids must be unique
+    attendee_emails = list(dict.fromkeys(attendee_emails))
+    zones = {email: default_tz for email in attendee_emails}
+    if not attendee_emails:
+        return zones
+
+    def _on_response(request_id, response, exception):
+        if exception is None and response.get("timeZone"):
+            zones[request_id] = response["timeZone"]
+
+    batch = calendar_service.new_batch_http_request(callback=_on_response)
+    for email in attendee_emails:
+        batch.add(calendar_service.calendars().get(calendarId=email), request_id=email)
+    try:
+        batch.execute()
+    except Exception as e:
+        print(f"Could not look up attendee timezones: {e}")
+    return zones
+
+
+def suggest_meeting_slots(freebusy: Union[BusyInfo, Mapping[str, Any]], start_time: str, end_time: str,
+                          duration_minutes: int = 30, attendee_timezones: Optional[Mapping[str, str]] = None,
+                          default_tz: str = "UTC", work_start: time = time(9, 0), work_end: time = time(17, 0),
+                          max_slots: int = 5) -> Dict[str, Any]:
+    """Turn busy info (or a raw freebusy.query response) into ranked free slots, ready to return from a tool."""
+    info = freebusy if isinstance(freebusy, BusyInfo) else parse_freebusy(freebusy)
+    attendee_timezones = attendee_timezones or {}
+    hours = {
+        attendee: WorkingHours(timezone=attendee_timezones.get(attendee, default_tz), start=work_start, end=work_end)
+        for attendee in info.busy
+    }
+    slots = find_free_slots(
+        info.busy, parse_datetime(start_time, default_tz), parse_datetime(end_time, default_tz),
+        timedelta(minutes=duration_minutes),
+        working_hours=hours, max_slots=max_slots, display_tz=default_tz,
+    )
+    return {
+        "timeZone": default_tz,
+        "duration_minutes": duration_minutes,
+        "free_slots": [slot.to_dict(default_tz) for slot in slots],
+        "attendee_timezones": {a: h.timezone for a, h in hours.items()},
+        "unavailable_calendars": info.errors,
+    }
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from config.settings import load_settings
+from tools.drive_index import _index_path, _resolve_user_key
+
+# Documents kept per user; the least recently indexed are dropped first
+MAX_DOCUMENTS = 5000
+# Text kept per document; matches past this point are rare and not worth the space
+MAX_BODY_CHARS = 200_000
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    rowid INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL UNIQUE,
+    revision TEXT NOT NULL,
+    source TEXT NOT NULL,
+    title TEXT NOT NULL,
+    link TEXT NOT NULL,
+    mime_type TEXT NOT NULL,
+    last_modified TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    part_id TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_indexed_at ON documents (indexed_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS document_text USING fts5(title, body, tokenize = 'porter unicode61');
+"""
+
+
+@dataclass
+class IndexedDocument:
+    doc_id: str
+    revision: str
+    source: str  # "drive" or "gmail"
+    title: str
+    link: str
+    mime_type: str
+    last_modified: str
+    message_id: str
+    part_id: str
+    body: str
+    score: float = 0.0  # bm25, lower is better
+
+
+class FullTextIndex:
+    """
+    Extracted text of documents the agent has already read (Drive files and Gmail
+    attachments), in an SQLite FTS5 table keyed by document id and revision.
+
+    Ranked local search over this replaces most Drive fullText queries, and also
+    reaches Gmail attachments that Drive search cannot see.
+    """
+
+    def __init__(self, path: str, max_documents: int = MAX_DOCUMENTS):
+        self.path = path
+        self.max_documents = max_documents
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def has(self, doc_id: str, revision: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT revision FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return row is not None and row[0] == revision
+
+    def add(self, doc_id: str, revision: str, title: str, body: str, source: str = "drive", link: str = "",
+            mime_type: str = "", last_modified: str = "", message_id: str = "", part_id: str = "") -> bool:
+        """Index one document; False when this revision is already indexed."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT rowid, revision FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row is not None:
+                if row[1] == revision:
+                    self._conn.execute("UPDATE documents SET indexed_at = ? WHERE rowid = ?", (time.time(), row[0]))
+                    return False
+                self._conn.execute("DELETE FROM document_text WHERE rowid = ?", (row[0],))
+                self._conn.execute("DELETE FROM documents WHERE rowid = ?", (row[0],))
+            cursor = self._conn.execute(
+                "INSERT INTO documents (doc_id, revision, source, title, link, mime_type, last_modified, message_id, "
+                "part_id, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (doc_id, revision, source, title, link, mime_type, last_modified, message_id, part_id, time.time()),
+            )
+            self._conn.execute(
+                "INSERT INTO document_text (rowid, title, body) VALUES (?, ?, ?)",
+                (cursor.lastrowid, title, body[:MAX_BODY_CHARS]),
+            )
+            self._evict()
+        return True
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT count(*) FROM documents").fetchone()
+        if count <= self.max_documents:
+            return
+        stale = [r[0] for r in self._conn.execute(
+            "SELECT rowid FROM documents ORDER BY indexed_at, rowid LIMIT ?", (count - self.max_documents,)
+        )]
+        self._conn.executemany("DELETE FROM document_text WHERE rowid = ?", [(r,) for r in stale])
+        self._conn.executemany("DELETE FROM documents WHERE rowid = ?", [(r,) for r in stale])
+
+    def _remove_where(self, column: str, value: str) -> None:
+        with self._lock, self._conn:
+            rows = [r[0] for r in self._conn.execute(f"SELECT rowid FROM documents WHERE {column} = ?", (value,))]
+            self._conn.executemany("DELETE FROM document_text WHERE rowid = ?", [(r,) for r in rows])
+            self._conn.executemany("DELETE FROM documents WHERE rowid = ?", [(r,) for r in rows])
+
+    def remove(self, doc_id: str) -> None:
+        """Drop a document, e.g. a Drive file the changes feed reports removed or trashed."""
+        self._remove_where("doc_id", doc_id)
+
+    def remove_message(self, message_id: str) -> None:
+        """Drop every attachment of a Gmail message the mailbox history reports deleted."""
+        if message_id:
+            self._remove_where("message_id", message_id)
+
+    def search(self, terms: Sequence[str], limit: int = 15) -> List[IndexedDocument]:
+        """Documents matching any of the terms, best first (BM25, title matches weighted higher)."""
+        words = {w.lower() for t in terms for w in _TERM_RE.findall(t or "")}
+        if not words:
+            return []
+        # Quoted, so words like "and" / "near" are never read as query operators
+        query = " OR ".join(f'"{w}"' for w in sorted(words))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.doc_id, d.revision, d.source, d.title, d.link, d.mime_type, d.last_modified, "
+                "d.message_id, d.part_id, t.body, bm25(document_text, 5.0, 1.0) AS score "
+                "FROM document_text t JOIN documents d ON d.rowid = t.rowid "
+                "WHERE document_text MATCH ? ORDER BY score LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        return [IndexedDocument(*row) for row in rows]
+
+
+_indexes: Dict[str, FullTextIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def close_indexes() -> None:
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.close()
+        _indexes.clear()
+
+
+def index_for(creds: Any, user_key: str = "") -> Optional[FullTextIndex]:
+    """The full-text index of the user identified by user_key (their email); None when disabled."""
+    settings = load_settings()
+    if not settings.fulltext_index_enabled:
+        return None
+    user_key = _resolve_user_key(creds, user_key)
+    if not user_key:
+        return None
+    with _indexes_lock:
+        index = _indexes.get(user_key)
+        if index is None:
+            index = _indexes[user_key] = FullTextIndex(_index_path(user_key, settings.drive_index_dir, ".fts.sqlite3"))
+        return index
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import getaddresses
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from config.settings import load_settings
+from tools.drive_index import _fulltext_index, _index_path, _resolve_user_key, _seed_in_background
+
+# Gmail is asked for new history at most this often per user
+SYNC_INTERVAL_SECONDS = 60
+# Most recent messages with attachments read when the index is first built
+SEED_MAX_MESSAGES = 2000
+# Gmail caps batch requests at 100 calls and rate-limits large ones
+_BATCH_SIZE = 50
+_MESSAGE_FIELDS = "id,internalDate,labelIds,payload"
+# Messages in these are never indexed, and leave the index when moved into them
+_SKIPPED_LABELS = frozenset({"DRAFT", "SPAM", "TRASH"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    internal_date INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    subject_lower TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_date ON messages (internal_date DESC);
+CREATE INDEX IF NOT EXISTS messages_sender ON messages (sender);
+CREATE TABLE IF NOT EXISTS recipients (
+    message_id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (email, message_id)
+);
+CREATE TABLE IF NOT EXISTS attachments (
+    message_id TEXT NOT NULL,
+    part_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    filename_lower TEXT NOT NULL,
+    mime_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    attachment_id TEXT NOT NULL,
+    PRIMARY KEY (message_id, part_id)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+@dataclass
+class IndexedAttachment:
+    part_id: str
+    filename: str
+    mime_type: str
+    size: int
+    attachment_id: str
+
+
+@dataclass
+class IndexedMessage:
+    id: str
+    internal_date: int
+    sender: str
+    subject: str
+    attachments: List[IndexedAttachment] = field(default_factory=list)
+
+
+def _header(headers: Sequence[Dict[str, str]], name: str) -> str:
+    return next((h.get("value", "") for h in headers if h.get("name", "").lower() == name), "")
+
+
+def _attachments(payload: Dict[str, Any]) -> List[IndexedAttachment]:
+    found = []
+
+    def walk(part: Dict[str, Any]) -> None:
+        body = part.get("body", {})
+        if part.get("filename") and body.get("size", 0) > 0:
+            found.append(IndexedAttachment(part_id=part.get("partId", ""), filename=part["filename"],
+                                           mime_type=part.get("mimeType", ""), size=body.get("size", 0),
+                                           attachment_id=body.get("attachmentId", "")))
+        for child in part.get("parts", []):
+            walk(child)
+
+    walk(payload)
+    return found
+
+
+class GmailIndex:
+    """
+    One user's messages with attachments (participants, subject, attachment metadata)
+    in SQLite: seeded from the most recent SEED_MAX_MESSAGES, then kept current from
+    users.history.list, so Gmail traffic follows new mail rather than brief count.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._last_sync = 0.0
+        self.seeding = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_history_id(self, history_id: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('history_id', ?)", (str(history_id),))
+
+    @property
+    def seeded(self) -> bool:
+        with self._lock:
+            return self._meta("history_id") is not None
+
+    def _store(self, messages: Iterable[Dict[str, Any]]) -> None:
+        for msg in messages:
+            if _SKIPPED_LABELS.intersection(msg.get("labelIds", [])):
+                self._delete(msg["id"])
+                continue
+            payload = msg.get("payload", {})
+            attachments = _attachments(payload)
+            if not attachments:
+                continue
+            headers = payload.get("headers", [])
+            senders = getaddresses([_header(headers, "from")])
+            recipients = {addr.lower() for _, addr in getaddresses(
+                [_header(headers, "to"), _header(headers, "cc")]) if addr}
+            subject = _header(headers, "subject")
+            self._delete(msg["id"])
+            self._conn.execute(
+                "INSERT INTO messages VALUES (?, ?, ?, ?, ?)",
+                (msg["id"], int(msg.get("internalDate", 0)), senders[0][1].lower() if senders else "",
+                 subject, subject.lower()),
+            )
+            self._conn.executemany("INSERT OR IGNORE INTO recipients VALUES (?, ?)",
+                                   [(msg["id"], r) for r in recipients])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO attachments VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(msg["id"], a.part_id, a.filename, a.filename.lower(), a.mime_type, a.size, a.attachment_id)
+                 for a in attachments],
+            )
+
+    def _delete(self, message_id: str) -> None:
+        for table, column in (("messages", "id"), ("recipients", "message_id"), ("attachments", "message_id")):
+            self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (message_id,))
+
+    def _fetch(self, service, message_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """messages.get for each id through batch requests; messages that fail (e.g. deleted since) are skipped."""
+        fetched: List[Dict[str, Any]] = []
+
+        def on_response(request_id, response, exception):
+            if exception is None:
+                fetched.append(response)
+
+        for start in range(0, len(message_ids), _BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=on_response)
+            for message_id in message_ids[start:start + _BATCH_SIZE]:
+                batch.add(service.users().messages().get(userId="me", id=message_id, format="full",
+                                                         fields=_MESSAGE_FIELDS), request_id=message_id)
+            batch.execute()
+        return fetched
+
+    def seed(self, service) -> int:
+        """Index recent messages with attachments; the history id is read first so later mail is not missed."""
+        history_id = service.users().getProfile(userId="me").execute()["historyId"]
+        message_ids: List[str] = []
+        page_token = None
+        while len(message_ids) < SEED_MAX_MESSAGES:
+            response = service.users().messages().list(
+                userId="me", q="has:attachment", maxResults=min(500, SEED_MAX_MESSAGES - len(message_ids)),
+                pageToken=page_token,
+            ).execute()
+            message_ids.extend(m["id"] for m in response.get("messages", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        messages = self._fetch(service, message_ids)
+        with self._lock, self._conn:
+            for table in ("messages", "recipients", "attachments"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._store(messages)
+            self._set_history_id(history_id)
+        self._last_sync = time.monotonic()
+        return len(messages)
+
+    def sync(self, service, force: bool = False, on_remove: Optional[Callable[[str], None]] = None) -> int:
+        """
+        Apply mailbox history since the stored history id; a no-op within
+        SYNC_INTERVAL_SECONDS of the last sync. Gmail keeps about a week of history,
+        so an index left idle longer than that is rebuilt. on_remove is called with
+        each deleted message id.
+        """
+        from googleapiclient.errors import HttpError
+
+        if not force and time.monotonic() - self._last_sync < SYNC_INTERVAL_SECONDS:
+            return 0
+        with self._lock:
+            history_id = self._meta("history_id")
+        if history_id is None:
+            return 0
+        added: Dict[str, None] = {}
+        deleted = set()
+        restored = set()
+        page_token = None
+        try:
+            while True:
+                response = service.users().history().list(
+                    userId="me", startHistoryId=history_id, pageToken=page_token,
+                    historyTypes=["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"], maxResults=500,
+                ).execute()
+                for record in response.get("history", []):
+                    for entry in record.get("messagesAdded", []):
+                        added[entry["message"]["id"]] = None
+                    for entry in record.get("messagesDeleted", []):
+                        deleted.add(entry["message"]["id"])
+                    # Trashed or marked spam: gone from the index; taken back out: read again
+                    for entry in record.get("labelsAdded", []):
+                        if _SKIPPED_LABELS.intersection(entry.get("labelIds", [])):
+                            deleted.add(entry["message"]["id"])
+                            restored.discard(entry["message"]["id"])
+                    for entry in record.get("labelsRemoved", []):
+                        message_id = entry["message"]["id"]
+                        if _SKIPPED_LABELS.intersection(entry.get("labelIds", [])) and message_id not in added:
+                            restored.add(message_id)
+                            deleted.discard(message_id)
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    break
+        except HttpError as e:
+            if getattr(e, "status_code", None) == 404 or getattr(getattr(e, "resp", None), "status", None) == 404:
+                print("Gmail history expired; rebuilding the Gmail index in the background")
+                with self._lock, self._conn:
+                    self._conn.execute("DELETE FROM meta WHERE key = 'history_id'")
+                self._last_sync = time.monotonic()
+                _seed_in_background(self, lambda: service, label="Gmail index")
+                return 0
+            raise
+
+        messages = self._fetch(service, [m for m in added if m not in deleted] + sorted(restored))
+        with self._lock, self._conn:
+            for message_id in deleted:
+                self._delete(message_id)
+            self._store(messages)
+            self._set_history_id(response.get("historyId", history_id))
+        self._last_sync = time.monotonic()
+        if on_remove is not None:
+            for message_id in deleted:
+                on_remove(message_id)
+        return len(messages) + len(deleted)
+
+    def _messages(self, where: str, params: Sequence[Any], limit: int) -> List[IndexedMessage]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, internal_date, sender, subject FROM messages WHERE {where} "
+                "ORDER BY internal_date DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+            messages = [IndexedMessage(*row) for row in rows]
+            for message in messages:
+                message.attachments = [
+                    IndexedAttachment(*row) for row in self._conn.execute(
+                        "SELECT part_id, filename, mime_type, size, attachment_id FROM attachments "
+                        "WHERE message_id = ? ORDER BY part_id", (message.id,))
+                ]
+        return messages
+
+    def messages_between(self, first: str, second: str, limit: int = 10) -> List[IndexedMessage]:
+        """Messages one of the two sent to (To or Cc) the other, newest first."""
+        first, second = first.lower(), second.lower()
+        return self._messages(
+            "(sender = ? AND id IN (SELECT message_id FROM recipients WHERE email = ?)) OR "
+            "(sender = ? AND id IN (SELECT message_id FROM recipients WHERE email = ?))",
+            (first, second, second, first), limit,
+        )
+
+    def messages_matching(self, word: str, limit: int = 10) -> List[IndexedMessage]:
+        """Messages whose subject or an attachment's file name contains word."""
+        word = word.lower()
+        return self._messages(
+            "instr(subject_lower, ?) > 0 OR id IN (SELECT message_id FROM attachments WHERE instr(filename_lower, ?) > 0)",
+            (word, word), limit,
+        )
+
+    def recent(self, limit: int = 10) -> List[IndexedMessage]:
+        return self._messages("1", (), limit)
+
+
+_indexes: Dict[str, GmailIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def close_indexes() -> None:
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.close()
+        _indexes.clear()
+
+
+def index_for(creds: Any, user_key: str = "",
+              service_factory: Optional[Callable[[], Any]] = None) -> Optional[GmailIndex]:
+    """
+    The Gmail attachment index of the user identified by user_key (their email),
+    brought up to date from mailbox history.
+
+    Returns None while the index is still being seeded (the first call starts seeding
+    in the background), so callers fall back to live Gmail search meanwhile.
+    """
+    settings = load_settings()
+    if not settings.gmail_index_enabled:
+        return None
+    if service_factory is None:
+        from agents.oauth_util import build_google_service
+
+        def service_factory():
+            return build_google_service("gmail", "v1", creds)
+
+    user_key = _resolve_user_key(creds, user_key)
+    if not user_key:
+        return None
+    with _indexes_lock:
+        index = _indexes.get(user_key)
+        if index is None:
+            index = _indexes[user_key] = GmailIndex(_index_path(user_key, settings.drive_index_dir, ".gmail.sqlite3"))
+    if not index.seeded:
+        _seed_in_background(index, service_factory, label="Gmail index")
+        return None
+    fulltext = _fulltext_index(creds, user_key)
+    try:
+        index.sync(service_factory(), on_remove=fulltext.remove_message if fulltext is not None else None)
+    except Exception as e:
+        # A stale index still answers participant and subject lookups
+        print(f"Gmail index sync failed: {e}")
+    return index
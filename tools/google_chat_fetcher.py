@@ -3,14 +3,17 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, List, Optional
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
+from tools.similarity import cosine_similarities
 from config.settings import load_settings
 
 try:
     from google.oauth2.credentials import Credentials
     from googleapiclient.discovery import build
     from googleapiclient.errors import HttpError
+
+    from agents.oauth_util import build_google_service
 except Exception:  # Google Chat API optional in early stages
     Credentials = None  # type: ignore
     build = None  # type: ignore
@@ -44,23 +47,13 @@ def fetch_google_chat_spaces(credentials: Credentials) -> List[GoogleChatSpace]:
         return []
     
     try:
-        service = build('chat', 'v1', credentials=credentials)
+        service = build_google_service('chat', 'v1', credentials)
         
         # List all spaces
         spaces_result = service.spaces().list().execute()
         spaces_data = spaces_result.get('spaces', [])
         
-        spaces = []
-        for space_data in spaces_data:
-            space = GoogleChatSpace(
-                name=space_data.get('name', ''),
-                display_name=space_data.get('displayName', ''),
-                space_type=space_data.get('type', ''),
-                space_threading_state=space_data.get('spaceThreadingState')
-            )
-            spaces.append(space)
-        
-        return spaces
+        return [_space_from_api(space_data) for space_data in spaces_data]
         
     except HttpError as e:
         print(f"Error fetching Google Chat spaces: {e}")
@@ -97,7 +90,7 @@ def fetch_google_chat_messages(
         return []
     
     try:
-        service = build('chat', 'v1', credentials=credentials)
+        service = build_google_service('chat', 'v1', credentials)
         
         # Get all spaces first
         spaces = fetch_google_chat_spaces(credentials)
@@ -108,7 +101,7 @@ def fetch_google_chat_messages(
         relevant_spaces = _find_relevant_spaces(spaces, meeting_title)
         
         all_messages = []
-        cutoff_time = datetime.now() - timedelta(days=lookback_days)
+        cutoff_time = datetime.now(timezone.utc) - timedelta(days=lookback_days)
         
         for space in relevant_spaces:
             try:
@@ -122,35 +115,8 @@ def fetch_google_chat_messages(
                 messages_data = messages_result.get('messages', [])
                 
                 for msg_data in messages_data:
-                    # Parse message creation time
-                    create_time_str = msg_data.get('createTime', '')
-                    try:
-                        create_time = datetime.fromisoformat(create_time_str.replace('Z', '+00:00'))
-                        if create_time < cutoff_time:
-                            continue  # Skip old messages
-                    except ValueError:
-                        continue  # Skip messages with invalid timestamps
-                    
-                    # Extract message details
-                    sender_info = msg_data.get('sender', {})
-                    sender_name = (
-                        sender_info.get('displayName', '') or 
-                        sender_info.get('name', '').split('/')[-1] or 
-                        'Unknown'
-                    )
-                    
-                    message = GoogleChatMessage(
-                        name=msg_data.get('name', ''),
-                        sender=sender_name,
-                        text=msg_data.get('text', ''),
-                        create_time=create_time_str,
-                        space=space.display_name,
-                        thread_key=msg_data.get('thread', {}).get('name'),
-                        annotations=msg_data.get('annotations', [])
-                    )
-                    
-                    # Filter for messages that might be relevant to the meeting
-                    if _is_message_relevant(message, meeting_title):
+                    message = _message_from_api(msg_data, space, cutoff_time)
+                    if message is not None:
                         all_messages.append(message)
                 
             except HttpError as e:
@@ -160,6 +126,9 @@ def fetch_google_chat_messages(
                 print(f"Unexpected error fetching messages from space {space.display_name}: {e}")
                 continue
         
+        # Filter for messages that might be relevant to the meeting
+        all_messages = _filter_relevant_messages(all_messages, meeting_title)
+        
         # Sort by creation time (newest first) and limit results
         all_messages.sort(key=lambda m: m.create_time, reverse=True)
         return all_messages[:max_messages]
@@ -169,6 +138,53 @@ def fetch_google_chat_messages(
         return []
 
 
+def _space_from_api(space_data: dict) -> GoogleChatSpace:
+    return GoogleChatSpace(
+        name=space_data.get('name', ''),
+        display_name=space_data.get('displayName', ''),
+        space_type=space_data.get('type', ''),
+        space_threading_state=space_data.get('spaceThreadingState')
+    )
+
+
+def _message_from_api(msg_data: dict, space: GoogleChatSpace, cutoff_time: datetime) -> Optional[GoogleChatMessage]:
+    """The message, or None when it is older than cutoff_time or has no valid timestamp"""
+    create_time_str = msg_data.get('createTime', '')
+    try:
+        create_time = datetime.fromisoformat(create_time_str.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if create_time < cutoff_time:
+        return None
+
+    sender_info = msg_data.get('sender', {})
+    sender_name = (
+        sender_info.get('displayName', '') or
+        sender_info.get('name', '').split('/')[-1] or
+        'Unknown'
+    )
+    return GoogleChatMessage(
+        name=msg_data.get('name', ''),
+        sender=sender_name,
+        text=msg_data.get('text', ''),
+        create_time=create_time_str,
+        space=space.display_name,
+        thread_key=msg_data.get('thread', {}).get('name'),
+        annotations=msg_data.get('annotations', [])
+    )
+
+
+def _member_emails(members: List[dict]) -> List[str]:
+    emails = []
+    for member in members:
+        member_info = member.get('member', {})
+        if member_info.get('type') == 'HUMAN':
+            email = member_info.get('name', '').split('/')[-1]
+            if '@' in email:
+                emails.append(email.lower())
+    return emails
+
+
 def _find_relevant_spaces(spaces: List[GoogleChatSpace], meeting_title: str) -> List[GoogleChatSpace]:
     """Find chat spaces that might be relevant to the meeting"""
     relevant_spaces = []
@@ -201,30 +217,25 @@ def _find_relevant_spaces(spaces: List[GoogleChatSpace], meeting_title: str) ->
     return relevant_spaces
 
 
-def _is_message_relevant(message: GoogleChatMessage, meeting_title: str) -> bool:
-    """Check if a message is relevant to the meeting topic"""
-    # Basic relevance check based on content
-    title_words = set(word.lower().strip() for word in meeting_title.split() if len(word) > 2)
-    message_words = set(word.lower().strip() for word in message.text.split())
-    
-    # Check for word overlap
-    if title_words.intersection(message_words):
-        return True
-    
-    # Check for meeting-related keywords
-    meeting_keywords = [
-        'meeting', 'agenda', 'discussion', 'sync', 'review', 
-        'action', 'todo', 'follow', 'next steps', 'decision'
-    ]
-    
-    if any(keyword in message.text.lower() for keyword in meeting_keywords):
-        return True
-    
-    # For very short messages or messages with no relevant content, exclude
-    if len(message.text.strip()) < 10:
-        return False
-    
-    return True
+_MEETING_KEYWORDS = (
+    'meeting', 'agenda', 'discussion', 'sync', 'review',
+    'action', 'todo', 'follow', 'next steps', 'decision'
+)
+
+
+def _filter_relevant_messages(messages: List[GoogleChatMessage], meeting_title: str) -> List[GoogleChatMessage]:
+    """Keep messages relevant to the meeting topic, scoring all of them in one pass"""
+    scores = cosine_similarities(meeting_title, [message.text for message in messages])
+    relevant = []
+    for message, score in zip(messages, scores):
+        text = message.text.lower()
+        if (
+            score > 0  # Shares weighted terms with the meeting title
+            or any(keyword in text for keyword in _MEETING_KEYWORDS)
+            or len(message.text.strip()) >= 10  # Only very short messages carry no content
+        ):
+            relevant.append(message)
+    return relevant
 
 
 def search_google_chat_history(
@@ -254,7 +265,7 @@ def search_google_chat_history(
         return []
     
     try:
-        service = build('chat', 'v1', credentials=credentials)
+        service = build_google_service('chat', 'v1', credentials)
         
         # Get all spaces
         spaces = fetch_google_chat_spaces(credentials)
@@ -262,7 +273,7 @@ def search_google_chat_history(
             return []
         
         relevant_messages = []
-        cutoff_time = datetime.now() - timedelta(days=lookback_days)
+        cutoff_time = datetime.now(timezone.utc) - timedelta(days=lookback_days)
         
         # Search in DMs with attendees
         dm_spaces = [space for space in spaces if space.space_type == 'DM']
@@ -335,4 +346,86 @@ def _space_involves_attendees(service, space: GoogleChatSpace, attendee_emails:
         return any(email.lower() in space_emails for email in attendee_emails)
         
     except HttpError:
-        return False
\ No newline at end of file
+        return False
+
+async def fetch_google_chat_spaces_async(client) -> List[GoogleChatSpace]:
+    try:
+        return [_space_from_api(space_data) for space_data in await client.list_spaces()]
+    except Exception as e:
+        print(f"Error fetching Google Chat spaces: {e}")
+        return []
+
+
+async def _space_messages_async(client, space: GoogleChatSpace, cutoff_time: datetime,
+                                max_messages: int) -> List[GoogleChatMessage]:
+    try:
+        data = await client.list_space_messages(
+            space.name, max_items=max_messages, pageSize=min(max_messages, 100), orderBy='createTime desc',
+            filter=f'createTime > "{cutoff_time.strftime("%Y-%m-%dT%H:%M:%SZ")}"'
+        )
+    except Exception as e:
+        print(f"Error fetching messages from space {space.display_name}: {e}")
+        return []
+    messages = (_message_from_api(msg_data, space, cutoff_time) for msg_data in data)
+    return [m for m in messages if m is not None]
+
+
+async def fetch_google_chat_messages_async(
+    credentials: Credentials,
+    meeting_title: str,
+    lookback_days: int = 7,
+    max_messages: int = 50,
+    client=None,
+) -> List[GoogleChatMessage]:
+    """fetch_google_chat_messages for asyncio callers; every relevant space is read concurrently."""
+    import asyncio
+
+    from tools.async_clients import AsyncGoogleClient
+
+    client = client or AsyncGoogleClient(credentials)
+    spaces = _find_relevant_spaces(await fetch_google_chat_spaces_async(client), meeting_title)
+    cutoff_time = datetime.now(timezone.utc) - timedelta(days=lookback_days)
+    per_space = await asyncio.gather(*(_space_messages_async(client, s, cutoff_time, max_messages) for s in spaces))
+
+    all_messages = _filter_relevant_messages([m for batch in per_space for m in batch], meeting_title)
+    all_messages.sort(key=lambda m: m.create_time, reverse=True)
+    return all_messages[:max_messages]
+
+
+async def search_google_chat_history_async(
+    credentials: Credentials,
+    meeting_title: str,
+    attendee_emails: List[str],
+    lookback_days: int = 14,
+    client=None,
+) -> List[GoogleChatMessage]:
+    """
+    search_google_chat_history for asyncio callers: the members of every DM and group
+    space are checked concurrently, then the spaces involving attendees are read
+    concurrently (each space once).
+    """
+    import asyncio
+
+    from tools.async_clients import AsyncGoogleClient
+
+    client = client or AsyncGoogleClient(credentials)
+    spaces = [s for s in await fetch_google_chat_spaces_async(client) if s.space_type in ('DM', 'ROOM', 'GROUP_DM')]
+    wanted = {email.lower() for email in attendee_emails}
+
+    async def involves_attendees(space: GoogleChatSpace) -> bool:
+        try:
+            return bool(wanted.intersection(_member_emails(await client.list_members(space.name))))
+        except Exception:
+            return False  # Skip spaces we can't access
+
+    involved = await asyncio.gather(*(involves_attendees(space) for space in spaces))
+    cutoff_time = datetime.now(timezone.utc) - timedelta(days=lookback_days)
+    per_space = await asyncio.gather(*(
+        _space_messages_async(client, space, cutoff_time, 20 if space.space_type == 'DM' else 10)
+        for space, ok in zip(spaces, involved) if ok
+    ))
+
+    messages = _filter_relevant_messages([m for batch in per_space for m in batch], meeting_title)
+    unique = list({(m.name, m.create_time): m for m in messages}.values())
+    unique.sort(key=lambda m: m.create_time, reverse=True)
+    return unique[:50]
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+import socket
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httplib2
+    import httpx
+
+# Connections kept per process across every Google API and user; idle ones are kept
+# well past httpx's 5 s default so back-to-back briefs reuse them
+_MAX_CONNECTIONS = 100
+_MAX_KEEPALIVE_CONNECTIONS = 32
+_KEEPALIVE_EXPIRY_SECONDS = 90.0
+_TIMEOUT_SECONDS = 60.0
+_MAX_REDIRECTS = 5
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PooledHttp:
+    """
+    Stand-in for httplib2.Http over one thread-safe httpx.Client, so googleapiclient
+    services built in any thread share keep-alive (and, with h2 installed, HTTP/2
+    multiplexed) connections to googleapis.com instead of each opening their own.
+
+    Holds no credentials: wrap it in google_auth_httplib2.AuthorizedHttp, which adds
+    the caller's token to every request.
+    """
+
+    def __init__(self, client: Optional["httpx.Client"] = None, http2: bool = False):
+        if client is None:
+            import httpx
+
+            client = httpx.Client(
+                http2=http2,
+                limits=httpx.Limits(max_connections=_MAX_CONNECTIONS,
+                                    max_keepalive_connections=_MAX_KEEPALIVE_CONNECTIONS,
+                                    keepalive_expiry=_KEEPALIVE_EXPIRY_SECONDS),
+                timeout=httpx.Timeout(_TIMEOUT_SECONDS, connect=10.0),
+                max_redirects=_MAX_REDIRECTS,
+            )
+        self.client = client
+        # httplib2.Http attributes some callers read or set
+        self.timeout = _TIMEOUT_SECONDS
+        self.follow_redirects = True
+        self.redirect_codes = frozenset({300, 301, 302, 303, 307, 308})
+        self.connections: Dict[str, Any] = {}
+
+    def request(self, uri: str, method: str = "GET", body: Any = None, headers: Optional[Dict[str, str]] = None,
+                redirections: int = _MAX_REDIRECTS, connection_type: Any = None,
+                **kwargs) -> Tuple["httplib2.Response", bytes]:
+        """httplib2.Http.request: returns (response, content) and raises what googleapiclient retries on."""
+        import httplib2
+        import httpx
+
+        try:
+            response = self.client.request(method, uri, content=body, headers=headers,
+                                           follow_redirects=self.follow_redirects and redirections > 0)
+        except httpx.TimeoutException as e:
+            raise socket.timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
+
+        info = dict(response.headers.items())
+        # The body is already decompressed, as httplib2 would leave it
+        if "content-encoding" in info:
+            info["-content-encoding"] = info.pop("content-encoding")
+            info["content-length"] = str(len(response.content))
+        info["status"] = str(response.status_code)
+        resp = httplib2.Response(info)
+        resp.reason = response.reason_phrase
+        resp.version = 20 if response.http_version == "HTTP/2" else 11
+        return resp, response.content
+
+    def close(self) -> None:
+        # Shared by every service; closed with close_shared_transport()
+        pass
+
+
+_shared: Optional[PooledHttp] = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport() -> PooledHttp:
+    """The process-wide pooled transport; HTTP/2 when GOOGLE_HTTP2_ENABLED and the h2 package is installed."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            http2 = os.getenv("GOOGLE_HTTP2_ENABLED", "true").lower() == "true"
+            if http2 and not http2_available():
+                print("h2 is not installed; Google API calls use HTTP/1.1 keep-alive")
+                http2 = False
+            _shared = PooledHttp(http2=http2)
+        return _shared
+
+
+def close_shared_transport() -> None:
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.client.close()
+            _shared = None
+
+
+def authorized_http(creds: Any, transport: Optional[PooledHttp] = None):
+    """An httplib2-compatible http for googleapiclient build(http=...), bound to creds over the shared pool."""
+    from google_auth_httplib2 import AuthorizedHttp
+
+    return AuthorizedHttp(creds, http=transport or shared_transport())
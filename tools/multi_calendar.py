@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from tools.calendar_event import CalendarEvent
+
+# Delta syncs are cheap, but refetch everything now and then to drop any drift
+FULL_SYNC_INTERVAL_SECONDS = 15 * 60
+_MAX_SYNC_STATES = 512
+# Ranges remembered per calendar, e.g. the week ahead and the recent past for history
+_MAX_RANGES_PER_CALENDAR = 4
+_CLOCK_SKEW = timedelta(minutes=1)
+_START = attrgetter("start_ts")
+
+
+def list_calendars(calendar_service: Any, selection: str = "selected") -> List[Dict[str, Any]]:
+    """
+    Calendars to read for the user.
+
+    selection: "primary", "selected" (calendars shown in the user's Calendar UI, plus
+    primary), "all" (every non-hidden calendar) or a comma-separated list of calendar IDs.
+    """
+    selection = (selection or "selected").strip()
+    if selection == "primary":
+        return [{"id": "primary", "primary": True}]
+    if selection not in ("selected", "all"):
+        return [{"id": cal_id.strip()} for cal_id in selection.split(",") if cal_id.strip()]
+
+    calendars, page_token = [], None
+    while True:
+        result = calendar_service.calendarList().list(pageToken=page_token, showHidden=False).execute()
+        calendars.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            break
+    if selection == "selected":
+        calendars = [c for c in calendars if c.get("selected") or c.get("primary")]
+    # Read the primary calendar as "primary" so event ids line up with single-calendar code
+    return [dict(c, id="primary") if c.get("primary") else c for c in calendars] or [{"id": "primary", "primary": True}]
+
+
+@dataclass
+class _SyncState:
+    range_start: datetime
+    range_end: datetime
+    synced_at: datetime  # Server-relative watermark for the next updatedMin
+    full_sync_at: float
+    events: Dict[str, CalendarEvent] = field(default_factory=dict)
+
+
+# (scope, calendar id) -> ranges of that calendar we have synced
+_sync_states: Dict[Tuple[str, str], List[_SyncState]] = {}
+_sync_lock = threading.Lock()
+
+
+def clear_sync_state() -> None:
+    with _sync_lock:
+        _sync_states.clear()
+
+
+def _list_pages(service: Any, **params) -> Iterable[Dict[str, Any]]:
+    page_token = None
+    while True:
+        result = service.events().list(pageToken=page_token, **params).execute()
+        yield from result.get("items", [])
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return
+
+
+def _apply_changes(state: _SyncState, changes: Sequence[Dict[str, Any]], calendar_id: str) -> bool:
+    """
+    Apply changed events (unexpanded, singleEvents=False) to a synced range; False when a
+    recurring series itself changed, whose instances can only be re-listed in full.
+    Events moved out of the range are dropped. Call with _sync_lock held.
+    """
+    min_ts, max_ts = state.range_start.timestamp(), state.range_end.timestamp()
+    for item in changes:
+        event_id = item.get("id")
+        if item.get("status") == "cancelled":
+            state.events.pop(event_id, None)
+            # A cancelled series takes its expanded instances with it
+            for other_id in [i for i, e in state.events.items() if e.recurring_event_id == event_id]:
+                del state.events[other_id]
+            continue
+        if item.get("recurrence"):
+            return False
+        event = CalendarEvent.from_api(item, calendar_id)
+        if event.overlaps(min_ts, max_ts):
+            state.events[event_id] = event
+        else:
+            state.events.pop(event_id, None)
+    return True
+
+
+def _sync_calendar(service: Any, scope: str, calendar_id: str, time_min: datetime,
+                   time_max: datetime) -> List[CalendarEvent]:
+    """
+    Events on one calendar overlapping [time_min, time_max), sorted by start.
+
+    The first read lists the range in full. While the stored range still covers the request,
+    later reads only ask for events changed since the last sync (updatedMin, not bounded
+    by time, so events moved out of the range are seen and dropped) and apply them, which
+    for most calendars is an empty response.
+    """
+    key = (scope, calendar_id)
+    with _sync_lock:
+        state = next(
+            (s for s in _sync_states.get(key, []) if s.range_start <= time_min and s.range_end >= time_max), None
+        )
+    # Leave a margin for clock skew against the server's update timestamps
+    synced_at = datetime.now(timezone.utc) - _CLOCK_SKEW
+    base = dict(calendarId=calendar_id, maxResults=250)
+
+    reusable = state is not None and time.monotonic() - state.full_sync_at < FULL_SYNC_INTERVAL_SECONDS
+    if reusable:
+        try:
+            # Unexpanded, so a changed recurring series is one item rather than every future instance
+            changes = list(_list_pages(service, updatedMin=state.synced_at.isoformat(), showDeleted=True,
+                                       singleEvents=False, **base))
+            with _sync_lock:
+                reusable = _apply_changes(state, changes, calendar_id)
+                if reusable:
+                    state.synced_at = max(state.synced_at, synced_at)
+        except Exception as e:
+            print(f"Delta sync failed for calendar {calendar_id}, refetching: {e}")
+            reusable = False
+
+    if not reusable:
+        stale = state
+        # Fetch whole UTC days so small shifts of the window (e.g. "now") stay covered
+        range_start = time_min.replace(hour=0, minute=0, second=0, microsecond=0)
+        range_end = time_max.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        events = _list_pages(service, timeMin=range_start.isoformat(), timeMax=range_end.isoformat(),
+                             singleEvents=True, **base)
+        state = _SyncState(range_start, range_end, synced_at, time.monotonic(),
+                           {e["id"]: CalendarEvent.from_api(e, calendar_id) for e in events if e.get("status") != "cancelled"})
+        with _sync_lock:
+            ranges = [s for s in _sync_states.pop(key, []) if s is not stale]
+            if len(_sync_states) >= _MAX_SYNC_STATES:
+                _sync_states.pop(next(iter(_sync_states)))
+            _sync_states[key] = [state] + ranges[:_MAX_RANGES_PER_CALENDAR - 1]
+
+    min_ts, max_ts = time_min.timestamp(), time_max.timestamp()
+    with _sync_lock:
+        selected = [e for e in state.events.values() if e.overlaps(min_ts, max_ts)]
+    selected.sort(key=_START)
+    return selected
+
+
+def list_events(
+    creds: Any,
+    time_min: datetime,
+    time_max: datetime,
+    selection: str = "selected",
+    calendars: Optional[Sequence[str]] = None,
+    service_factory: Optional[Callable[[], Any]] = None,
+    max_workers: int = 8,
+    max_results: Optional[int] = None,
+    cache_scope: Optional[str] = None,
+) -> List[CalendarEvent]:
+    """
+    Events from all of the user's calendars in one time-ordered list.
+
+    Calendars are read concurrently (one Calendar service per worker thread) and their
+    sorted event lists are combined with a heap merge. An event that appears on several
+    calendars (e.g. a meeting on both your primary and a team calendar) is returned once,
+    with calendar_id set to the calendar it was read from.
+    """
+    if service_factory is None:
+        from agents.oauth_util import build_google_service
+
+        def service_factory():
+            return build_google_service("calendar", "v3", creds)
+
+    time_min, time_max = time_min.astimezone(timezone.utc), time_max.astimezone(timezone.utc)
+    if cache_scope is None:
+        from tools.whoami import token_fingerprint
+
+        cache_scope = token_fingerprint(creds)
+    calendar_ids = list(calendars) if calendars else [c["id"] for c in list_calendars(service_factory(), selection)]
+
+    def _read(calendar_id: str) -> Tuple[List[CalendarEvent], Optional[Exception]]:
+        try:
+            return _sync_calendar(service_factory(), cache_scope, calendar_id, time_min, time_max), None
+        except Exception as e:
+            return [], e
+
+    if len(calendar_ids) == 1:
+        results = [_read(calendar_ids[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calendar_ids)))) as pool:
+            results = list(pool.map(_read, calendar_ids))
+
+    # Only other calendars may be skipped: a failing primary (e.g. revoked credentials) is an error,
+    # not an empty schedule
+    failures = {cal_id: e for cal_id, (_, e) in zip(calendar_ids, results) if e is not None}
+    if "primary" in failures:
+        raise failures["primary"]
+    if failures and len(failures) == len(calendar_ids):
+        raise next(iter(failures.values()))
+    for cal_id, e in failures.items():
+        print(f"Could not list events for calendar {cal_id}: {e}")
+    return _merge([events for events, _ in results], max_results)
+
+
+def _merge(streams: Sequence[List[CalendarEvent]], max_results: Optional[int]) -> List[CalendarEvent]:
+    merged, seen = [], set()
+    for event in heapq.merge(*streams, key=_START):
+        identity = (event.ical_uid or event.id, event.start_ts)
+        if identity in seen:
+            continue
+        seen.add(identity)
+        merged.append(event)
+        if max_results is not None and len(merged) >= max_results:
+            break
+    return merged
+
+
+async def list_events_async(
+    creds: Any,
+    time_min: datetime,
+    time_max: datetime,
+    selection: str = "selected",
+    calendars: Optional[Sequence[str]] = None,
+    client: Any = None,
+    max_results: Optional[int] = None,
+) -> List[CalendarEvent]:
+    """
+    list_events for asyncio callers: every calendar is read concurrently on the shared
+    connection pool. Ranges are listed in full each time (no delta sync state).
+    """
+    import asyncio
+
+    from tools.async_clients import AsyncGoogleClient
+
+    client = client or AsyncGoogleClient(creds)
+    time_min, time_max = time_min.astimezone(timezone.utc), time_max.astimezone(timezone.utc)
+    if calendars:
+        calendar_ids = list(calendars)
+    elif (selection or "selected").strip() in ("selected", "all"):
+        listed = await client.calendar_list()
+        if selection.strip() == "selected":
+            listed = [c for c in listed if c.get("selected") or c.get("primary")]
+        calendar_ids = ["primary" if c.get("primary") else c["id"] for c in listed] or ["primary"]
+    else:
+        calendar_ids = [c["id"] for c in list_calendars(None, selection)]
+
+    async def _read(calendar_id: str) -> List[CalendarEvent]:
+        try:
+            items = await client.list_events(
+                calendar_id, timeMin=time_min.isoformat(), timeMax=time_max.isoformat(),
+                singleEvents=True, orderBy="startTime", maxResults=250, max_items=max_results,
+            )
+        except Exception as e:
+            print(f"Could not list events for calendar {calendar_id}: {e}")
+            return []
+        events = [CalendarEvent.from_api(e, calendar_id) for e in items if e.get("status") != "cancelled"]
+        events.sort(key=_START)
+        return events
+
+    streams = await asyncio.gather(*(_read(calendar_id) for calendar_id in calendar_ids))
+    return _merge(streams, max_results)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from tools.calendar_event import CalendarEvent
+from tools.free_slots import WorkingHours, free_intervals, zone_for
+
+# Meetings separated by at most this much count as back to back
+BACK_TO_BACK_GAP = timedelta(minutes=5)
+# Shortest run of back-to-back meetings worth reporting
+MIN_CHAIN_LENGTH = 3
+# Shortest free block inside working hours that counts as focus time
+MIN_FOCUS_GAP = timedelta(minutes=90)
+# Events listed per overlap; very dense clusters are summarised by their count
+_MAX_EVENTS_PER_OVERLAP = 10
+
+
+def _event_dict(event: CalendarEvent, zone) -> Dict[str, Any]:
+    return {
+        "summary": event.summary or "No title",
+        "start": datetime.fromtimestamp(event.start_ts, zone).isoformat(),
+        "end": datetime.fromtimestamp(event.end_ts, zone).isoformat(),
+        "calendar_id": event.calendar_id,
+        "response_status": event.self_response_status,
+    }
+
+
+@dataclass
+class Overlap:
+    """A cluster of events that overlap one another (directly or through a chain of overlaps)."""
+    start: datetime  # First moment two events run at once
+    end: datetime  # Last moment two events run at once
+    events: List[CalendarEvent]
+    max_concurrent: int
+    # At least two overlapping events the user has committed to (accepted or owns)
+    double_booked: bool = False
+
+    def to_dict(self, zone) -> Dict[str, Any]:
+        return {
+            "start": self.start.astimezone(zone).isoformat(),
+            "end": self.end.astimezone(zone).isoformat(),
+            "event_count": len(self.events),
+            "max_concurrent": self.max_concurrent,
+            "double_booked": self.double_booked,
+            "events": [_event_dict(e, zone) for e in self.events[:_MAX_EVENTS_PER_OVERLAP]],
+        }
+
+
+@dataclass
+class BackToBackChain:
+    events: List[CalendarEvent]
+
+    @property
+    def start(self) -> datetime:
+        return self.events[0].start
+
+    @property
+    def end(self) -> datetime:
+        return datetime.fromtimestamp(max(e.end_ts for e in self.events), timezone.utc)
+
+    def to_dict(self, zone) -> Dict[str, Any]:
+        return {
+            "start": self.start.astimezone(zone).isoformat(),
+            "end": self.end.astimezone(zone).isoformat(),
+            "meeting_count": len(self.events),
+            "minutes": int((self.end - self.start).total_seconds() // 60),
+            "meetings": [e.summary or "No title" for e in self.events],
+        }
+
+
+@dataclass
+class ScheduleInsights:
+    range_start: datetime
+    range_end: datetime
+    event_count: int = 0
+    busy_minutes: int = 0
+    overlaps: List[Overlap] = field(default_factory=list)
+    back_to_back: List[BackToBackChain] = field(default_factory=list)
+    focus_gaps: List[Tuple[datetime, datetime]] = field(default_factory=list)
+
+    @property
+    def double_bookings(self) -> List[Overlap]:
+        return [o for o in self.overlaps if o.double_booked]
+
+    def to_dict(self, tz: Optional[str] = None) -> Dict[str, Any]:
+        zone = zone_for(tz)
+        return {
+            "timeZone": tz or "UTC",
+            "range": {"start": self.range_start.astimezone(zone).isoformat(),
+                      "end": self.range_end.astimezone(zone).isoformat()},
+            "event_count": self.event_count,
+            "busy_minutes": self.busy_minutes,
+            "conflict_count": len(self.overlaps),
+            "double_booking_count": len(self.double_bookings),
+            "conflicts": [o.to_dict(zone) for o in self.overlaps],
+            "back_to_back": [c.to_dict(zone) for c in self.back_to_back],
+            "focus_gaps": [
+                {"start": s.astimezone(zone).isoformat(), "end": e.astimezone(zone).isoformat(),
+                 "minutes": int((e - s).total_seconds() // 60)}
+                for s, e in self.focus_gaps
+            ],
+        }
+
+
+def _blocks_time(event: CalendarEvent) -> bool:
+    """Timed, not declined and not marked "available"."""
+    return not event.all_day and not event.transparent and event.self_response_status != "declined"
+
+
+def _committed(event: CalendarEvent) -> bool:
+    """
+    Accepted, or with no RSVP on the user's primary calendar (events they created
+    there). On other calendars no RSVP means the user is not a guest at all, e.g. a
+    colleague's shared calendar, so those never count as double bookings.
+    """
+    if event.self_response_status is None:
+        return event.calendar_id == "primary"
+    return event.self_response_status == "accepted"
+
+
+def find_overlaps(events: Sequence[CalendarEvent]) -> List[Overlap]:
+    """
+    Sweep events in start order with a min-heap of active end times: O(n log n).
+
+    Each event only pops finished events off the heap and compares against the running
+    cluster end, so dense calendars never turn into pairwise comparisons.
+    """
+    ordered = sorted(events, key=lambda e: (e.start_ts, e.end_ts))
+    overlaps: List[Overlap] = []
+    active: List[Tuple[float, bool]] = []  # (end_ts, committed) of events still running
+    committed_active = 0
+    cluster: List[CalendarEvent] = []
+    cluster_end = float("-inf")
+    window: Optional[List[float]] = None
+    peak = 0
+    double_booked = False
+
+    def close_cluster():
+        if window is not None:
+            overlaps.append(Overlap(
+                datetime.fromtimestamp(window[0], timezone.utc), datetime.fromtimestamp(window[1], timezone.utc),
+                list(cluster), peak, double_booked,
+            ))
+
+    for event in ordered:
+        while active and active[0][0] <= event.start_ts:
+            _, was_committed = heapq.heappop(active)
+            committed_active -= was_committed
+        if event.start_ts >= cluster_end:
+            close_cluster()
+            cluster, window, peak, double_booked = [], None, 0, False
+        if active:
+            # The longest-running active event is the one that set cluster_end
+            overlap_end = min(event.end_ts, cluster_end)
+            if window is None:
+                window = [event.start_ts, overlap_end]
+            else:
+                window[1] = max(window[1], overlap_end)
+            if _committed(event) and committed_active:
+                double_booked = True
+        is_committed = _committed(event)
+        heapq.heappush(active, (event.end_ts, is_committed))
+        committed_active += is_committed
+        peak = max(peak, len(active))
+        cluster.append(event)
+        cluster_end = max(cluster_end, event.end_ts)
+    close_cluster()
+    return overlaps
+
+
+def find_back_to_back(events: Sequence[CalendarEvent], gap: timedelta = BACK_TO_BACK_GAP,
+                      min_length: int = MIN_CHAIN_LENGTH) -> List[BackToBackChain]:
+    """Runs of at least min_length meetings with no more than `gap` between one ending and the next starting."""
+    chains: List[BackToBackChain] = []
+    current: List[CalendarEvent] = []
+    current_end = float("-inf")
+    max_gap = gap.total_seconds()
+    for event in sorted(events, key=lambda e: e.start_ts):
+        if current and event.start_ts - current_end > max_gap:
+            if len(current) >= min_length:
+                chains.append(BackToBackChain(current))
+            current = []
+        current.append(event)
+        current_end = max(current_end, event.end_ts) if len(current) > 1 else event.end_ts
+    if len(current) >= min_length:
+        chains.append(BackToBackChain(current))
+    return chains
+
+
+def analyze_schedule(
+    events: Sequence[CalendarEvent],
+    range_start: datetime,
+    range_end: datetime,
+    timezone_name: str = "UTC",
+    work_start: time = time(9, 0),
+    work_end: time = time(17, 0),
+    min_focus_gap: timedelta = MIN_FOCUS_GAP,
+) -> ScheduleInsights:
+    """
+    Conflicts, double bookings, back-to-back chains and focus-time gaps for one user.
+
+    Declined, all-day and "show as available" events do not block time. Focus gaps are
+    free stretches of at least min_focus_gap inside working hours in timezone_name.
+    """
+    busy = [e for e in events if _blocks_time(e)]
+    busy_intervals = [(e.start, e.end) for e in busy]
+    hours = WorkingHours(timezone=timezone_name, start=work_start, end=work_end)
+    free = free_intervals({"me": busy_intervals}, range_start, range_end, {"me": hours})
+
+    insights = ScheduleInsights(range_start, range_end, event_count=len(busy))
+    insights.overlaps = find_overlaps(busy)
+    insights.back_to_back = find_back_to_back(busy)
+    insights.focus_gaps = [(s, e) for s, e in free if e - s >= min_focus_gap]
+    range_start_ts, range_end_ts = range_start.timestamp(), range_end.timestamp()
+    covered, cursor = 0.0, range_start_ts
+    for event in sorted(busy, key=lambda e: e.start_ts):
+        start, end = max(event.start_ts, cursor), min(event.end_ts, range_end_ts)
+        if end > start:
+            covered += end - start
+            cursor = end
+    insights.busy_minutes = int(covered // 60)
+    return insights
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import List, Sequence
+
+# Hashed feature space; collisions at this size are negligible for brief-sized corpora
+N_FEATURES = 1 << 18
+# Words too common to say what a text is about
+STOPWORDS = frozenset({
+    "the", "and", "for", "with", "that", "this", "from", "have", "will", "are", "was", "were", "but",
+    "not", "you", "your", "our", "can", "all", "any", "has", "had", "its", "into", "about", "they",
+    "them", "then", "than", "there", "their", "what", "when", "which", "who", "would", "should",
+    "could", "been", "also", "just", "more", "some", "such", "only", "over", "very", "meeting",
+})
+
+_TOKEN_RE = re.compile(r"\w\w+")
+
+_np = None
+
+
+def _numpy():
+    """Import numpy on first use (keeps it off the cold-start path); None if not installed."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:  # numpy optional; fall back to pure Python scoring
+            _np = False
+    return _np or None
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def cosine_similarities(query: str, texts: Sequence[str], n_features: int = N_FEATURES) -> List[float]:
+    """
+    Cosine similarity between the query and each text over hashed TF-IDF vectors.
+
+    Terms are hashed into n_features buckets (no vocabulary to build), term frequencies are
+    log-scaled and IDF is computed over `texts`. With numpy every text is scored in one
+    sparse matrix-vector product; without it the same math runs in pure Python.
+    """
+    if not texts:
+        return []
+    # Stopwords only need dropping from the query; IDF already discounts them in the texts
+    query_tokens = [t for t in tokenize(query) if t not in STOPWORDS]
+    docs_tokens = [tokenize(text or "") for text in texts]
+    if not query_tokens:
+        return [0.0] * len(texts)
+    np = _numpy()
+    if np:
+        return _cosine_numpy(np, query_tokens, docs_tokens, n_features)
+    return _cosine_python(query_tokens, docs_tokens, n_features)
+
+
+def _cosine_numpy(np, query_tokens: List[str], docs_tokens: List[List[str]], n_features: int) -> List[float]:
+    n_docs = len(docs_tokens)
+    mask = n_features - 1
+    lengths = np.fromiter((len(tokens) for tokens in docs_tokens), dtype=np.int64, count=n_docs)
+    total = int(lengths.sum())
+    if total == 0:
+        return [0.0] * n_docs
+
+    # COO entries (doc, feature), collapsed into term counts with one unique() pass
+    rows = np.repeat(np.arange(n_docs, dtype=np.int64), lengths)
+    cols = np.fromiter((hash(t) & mask for tokens in docs_tokens for t in tokens), dtype=np.int64, count=total)
+    keys, tf = np.unique(rows * n_features + cols, return_counts=True)
+    rows, cols = keys // n_features, keys % n_features
+
+    df = np.bincount(cols, minlength=n_features)
+    idf = np.log((1 + n_docs) / (1 + df)) + 1.0
+    weights = (1.0 + np.log(tf)) * idf[cols]
+    doc_norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n_docs))
+
+    query_cols = np.fromiter((hash(t) & mask for t in query_tokens), dtype=np.int64, count=len(query_tokens))
+    q_cols, q_tf = np.unique(query_cols, return_counts=True)
+    query = np.zeros(n_features)
+    query[q_cols] = (1.0 + np.log(q_tf)) * idf[q_cols]
+    query_norm = np.sqrt(np.dot(query[q_cols], query[q_cols]))
+
+    dots = np.bincount(rows, weights=weights * query[cols], minlength=n_docs)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(doc_norms > 0, dots / (doc_norms * query_norm), 0.0)
+    return scores.tolist()
+
+
+def _cosine_python(query_tokens: List[str], docs_tokens: List[List[str]], n_features: int) -> List[float]:
+    mask = n_features - 1
+    n_docs = len(docs_tokens)
+    doc_counts = [Counter(hash(t) & mask for t in tokens) for tokens in docs_tokens]
+    df: Counter = Counter()
+    for counts in doc_counts:
+        df.update(counts.keys())
+
+    def idf(feature: int) -> float:
+        return math.log((1 + n_docs) / (1 + df.get(feature, 0))) + 1.0
+
+    query = {f: (1.0 + math.log(c)) * idf(f) for f, c in Counter(hash(t) & mask for t in query_tokens).items()}
+    query_norm = math.sqrt(sum(w * w for w in query.values()))
+
+    scores = []
+    for counts in doc_counts:
+        weights = {f: (1.0 + math.log(c)) * idf(f) for f, c in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        dot = sum(w * query[f] for f, w in weights.items() if f in query)
+        scores.append(dot / (norm * query_norm) if norm else 0.0)
+    return scores
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, List
-import os
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
 from config.settings import load_settings
 
@@ -23,41 +26,241 @@ class SlackMessage:
     permalink: str
 
 
-def fetch_slack_messages(title: str, lookback_days: int = 7, max_messages: int = 50) -> List[SlackMessage]:
-    settings = load_settings()
-    if not settings.slack_bot_token or WebClient is None:
-        return []
+# Channels read per meeting, and attendees whose channel memberships are looked up
+MAX_CHANNELS = 5
+MAX_ATTENDEES = 5
+_PAGE_LIMIT = 200
+_CHANNEL_TYPES = "public_channel,private_channel"
+_STOP_WORDS = frozenset({"meeting", "call", "sync", "weekly", "daily", "with", "and", "the", "for", "team"})
+
+
+def _slug(text: str) -> str:
+    return "-".join(re.findall(r"\w+", text.lower()))
+
+
+def _title_keywords(title: str) -> List[str]:
+    return [w for w in dict.fromkeys(re.findall(r"\w+", title.lower())) if len(w) > 3 and w not in _STOP_WORDS]
+
+
+def _rank_channels(channels: List[Dict[str, Any]], title: str, keywords: Sequence[str],
+                   shared: Dict[str, int], limit: int = MAX_CHANNELS) -> List[Dict[str, Any]]:
+    """
+    Candidate channels for a meeting, best first: the title's slug as the channel
+    name, then names containing it, then names containing title keywords, then
+    channels several attendees are in. Scores shrink with channel size (1 / (1 +
+    log10(num_members))), so company-wide channels every attendee is in rank below
+    a small team channel.
+    """
+    slug = _slug(title)
+    scored = []
+    for ch in channels:
+        name = ch.get("name", "").lower()
+        score = 0.0
+        if slug and name == slug:
+            score += 100
+        elif slug and slug in name:
+            score += 50
+        score += 10 * sum(1 for k in keywords if k in name)
+        score += 5 * shared.get(ch.get("id", ""), 0)
+        if score:
+            scored.append((score / (1 + math.log10(max(1, ch.get("num_members") or 1))), ch))
+    scored.sort(key=lambda pair: -pair[0])
+    return [ch for _, ch in scored[:limit]]
+
+
+def _shared_channel_counts(memberships: Sequence[Sequence[str]]) -> Dict[str, int]:
+    """Channel id -> number of attendees in it, keeping channels at least two share (or the only attendee's)."""
+    counts: Dict[str, int] = {}
+    for channel_ids in memberships:
+        for channel_id in set(channel_ids):
+            counts[channel_id] = counts.get(channel_id, 0) + 1
+    minimum = 1 if len(memberships) == 1 else 2
+    return {channel_id: n for channel_id, n in counts.items() if n >= minimum}
+
+
+def _fill_by_rank(streams: Sequence[Sequence[SlackMessage]], max_messages: int) -> List[SlackMessage]:
+    """
+    Up to max_messages from per-channel streams (best channel first, each newest
+    first), grouped by channel in rank order. Channels get equal shares; what a
+    channel cannot fill goes to the others, best first.
+    """
+    taken = [0] * len(streams)
+    remaining = max_messages
+    while remaining > 0:
+        open_streams = [i for i, stream in enumerate(streams) if taken[i] < len(stream)]
+        if not open_streams:
+            break
+        share = max(1, remaining // len(open_streams))
+        for i in open_streams:
+            n = min(share, len(streams[i]) - taken[i], remaining)
+            taken[i] += n
+            remaining -= n
+    return [m for i, stream in enumerate(streams) for m in stream[:taken[i]]]
+
+
+def _to_message(m: Dict[str, Any], channel_id: str, channel_name: str) -> SlackMessage:
+    return SlackMessage(
+        ts=m.get("ts", ""),
+        user=m.get("user", ""),
+        text=m.get("text", ""),
+        channel=f"#{channel_name}",
+        permalink=f"https://slack.com/app_redirect?channel={channel_id}&message_ts={m.get('ts','')}",
+    )
+
+
+def _paginate(method: Callable[..., Any], items_key: str, max_items: Optional[int] = None,
+              **params) -> List[Dict[str, Any]]:
+    """Items across the cursor-paginated pages of a slack_sdk WebClient method."""
+    items: List[Dict[str, Any]] = []
+    cursor = None
+    while True:
+        res = method(cursor=cursor, **params) if cursor else method(**params)
+        items.extend(res.get(items_key, []) or [])
+        cursor = (res.get("response_metadata") or {}).get("next_cursor")
+        if not cursor or (max_items is not None and len(items) >= max_items):
+            return items[:max_items] if max_items is not None else items
+
+
+def _channel_history(client: Any, channel_id: str, oldest: float, latest: float,
+                     max_messages: int) -> List[Dict[str, Any]]:
+    """
+    Messages in [oldest, latest], newest first. Paging stops once Slack reports
+    nothing older inside the window (has_more false) or max_messages are read.
+    """
+    messages: List[Dict[str, Any]] = []
+    cursor = None
+    while len(messages) < max_messages:
+        params = dict(channel=channel_id, oldest=f"{oldest:.6f}", latest=f"{latest:.6f}", inclusive=True,
+                      limit=min(_PAGE_LIMIT, max_messages - len(messages)))
+        if cursor:
+            params["cursor"] = cursor
+        res = client.conversations_history(**params)
+        messages.extend(res.get("messages", []) or [])
+        cursor = (res.get("response_metadata") or {}).get("next_cursor")
+        if not res.get("has_more") or not cursor:
+            break
+    return messages[:max_messages]
 
-    client = WebClient(token=settings.slack_bot_token)
 
-    channel_cand = f"#" + title.lower().replace(" ", "-")
-    channels = []
+def _attendee_channels(client: Any, email: str) -> List[str]:
     try:
-        res = client.conversations_list(limit=1000)
-        channels = res.get("channels", [])
+        user_id = client.users_lookupByEmail(email=email)["user"]["id"]
+        channels = _paginate(client.users_conversations, "channels", user=user_id, types=_CHANNEL_TYPES,
+                             exclude_archived=True, limit=1000)
     except SlackApiError:
         return []
+    return [ch["id"] for ch in channels if ch.get("id")]
 
-    channel_id = None
-    for ch in channels:
-        if ch.get("name", "").lower() == channel_cand.strip("#"):
-            channel_id = ch.get("id")
-            break
 
-    messages: List[SlackMessage] = []
-    if channel_id:
+def fetch_slack_messages(
+    title: str,
+    lookback_days: int = 7,
+    max_messages: int = 50,
+    keywords: Optional[Sequence[str]] = None,
+    attendee_emails: Optional[Sequence[str]] = None,
+    latest: Optional[float] = None,
+    token: str = "",
+    client: Any = None,
+    max_workers: int = 8,
+) -> List[SlackMessage]:
+    """
+    Recent messages about a meeting from up to MAX_CHANNELS candidate channels (title
+    slug, keyword matches, channels attendees share), grouped by channel from the
+    best match down, newest first within each; every channel gets a share of
+    max_messages.
+
+    Each channel's history is read concurrently, bounded to the last lookback_days
+    before latest (default now) and paged with cursors until the window is covered.
+    """
+    if client is None:
+        token = token or load_settings().slack_bot_token
+        if not token or WebClient is None:
+            return []
+        from tools.slack_rate_limit import slack_client
+
+        client = slack_client(token)
+
+    keywords = list(keywords) if keywords is not None else _title_keywords(title)
+    emails = [e for e in dict.fromkeys(e.lower() for e in attendee_emails or [] if e)][:MAX_ATTENDEES]
+    latest = latest if latest is not None else time.time()
+    oldest = latest - lookback_days * 86400
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(emails) + 1))) as pool:
+        channels_future = pool.submit(_paginate, client.conversations_list, "channels", types=_CHANNEL_TYPES,
+                                      exclude_archived=True, limit=1000)
+        memberships = list(pool.map(lambda e: _attendee_channels(client, e), emails))
         try:
-            res = client.conversations_history(channel=channel_id, limit=max_messages)
-            for m in res.get("messages", []):
-                msg = SlackMessage(
-                    ts=m.get("ts", ""),
-                    user=m.get("user", ""),
-                    text=m.get("text", ""),
-                    channel=channel_cand,
-                    permalink=f"https://slack.com/app_redirect?channel={channel_id}&message_ts={m.get('ts','')}",
-                )
-                messages.append(msg)
+            channels = channels_future.result()
         except SlackApiError:
             return []
 
-    return messages
+    candidates = _rank_channels(channels, title, keywords, _shared_channel_counts(memberships) if emails else {})
+    if not candidates:
+        return []
+
+    def _read(ch: Dict[str, Any]) -> List[SlackMessage]:
+        try:
+            history = _channel_history(client, ch["id"], oldest, latest, max_messages)
+        except SlackApiError as e:
+            print(f"Could not read Slack channel {ch.get('name', ch['id'])}: {e}")
+            return []
+        return [_to_message(m, ch["id"], ch.get("name", "")) for m in history]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(candidates)))) as pool:
+        streams = list(pool.map(_read, candidates))
+    return _fill_by_rank(streams, max_messages)
+
+
+async def fetch_slack_messages_async(
+    title: str,
+    lookback_days: int = 7,
+    max_messages: int = 50,
+    keywords: Optional[Sequence[str]] = None,
+    attendee_emails: Optional[Sequence[str]] = None,
+    latest: Optional[float] = None,
+    client: Any = None,
+) -> List[SlackMessage]:
+    """fetch_slack_messages for asyncio callers, on the shared connection pool."""
+    import asyncio
+
+    from tools.async_clients import AsyncApiError, AsyncSlackClient
+
+    if client is None:
+        settings = load_settings()
+        if not settings.slack_bot_token:
+            return []
+        client = AsyncSlackClient(settings.slack_bot_token)
+
+    keywords = list(keywords) if keywords is not None else _title_keywords(title)
+    emails = [e for e in dict.fromkeys(e.lower() for e in attendee_emails or [] if e)][:MAX_ATTENDEES]
+    latest = latest if latest is not None else time.time()
+    oldest = latest - lookback_days * 86400
+
+    async def attendee_channels(email: str) -> List[str]:
+        try:
+            user_id = (await client.call("users.lookupByEmail", email=email))["user"]["id"]
+            channels = await client.paginate("users.conversations", "channels", user=user_id,
+                                             types=_CHANNEL_TYPES, exclude_archived=True, limit=1000)
+        except AsyncApiError:
+            return []
+        return [ch["id"] for ch in channels if ch.get("id")]
+
+    results = await asyncio.gather(client.conversations_list(), *(attendee_channels(e) for e in emails),
+                                   return_exceptions=True)
+    channels = results[0]
+    memberships = [m for m in results[1:] if not isinstance(m, BaseException)]
+    if isinstance(channels, BaseException):
+        return []
+    candidates = _rank_channels(channels, title, keywords, _shared_channel_counts(memberships) if emails else {})
+
+    async def read(ch: Dict[str, Any]) -> List[SlackMessage]:
+        try:
+            history = await client.conversations_history(ch["id"], oldest=f"{oldest:.6f}", latest=f"{latest:.6f}",
+                                                         max_items=max_messages)
+        except AsyncApiError as e:
+            print(f"Could not read Slack channel {ch.get('name', ch['id'])}: {e}")
+            return []
+        return [_to_message(m, ch["id"], ch.get("name", "")) for m in history]
+
+    streams = await asyncio.gather(*(read(ch) for ch in candidates))
+    return _fill_by_rank(streams, max_messages)
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Requests per minute Slack allows each app per workspace, by method tier
+TIER_LIMITS = {1: 1, 2: 20, 3: 50, 4: 100}
+METHOD_TIERS = {
+    "conversations.list": 2,
+    "users.list": 2,
+    "search.messages": 2,
+    "conversations.history": 3,
+    "conversations.replies": 3,
+    "conversations.info": 3,
+    "users.conversations": 3,
+    "users.lookupByEmail": 3,
+    "conversations.members": 4,
+    "users.info": 4,
+    "chat.getPermalink": 4,
+}
+DEFAULT_TIER = 3
+# Read-only methods whose identical concurrent calls share one request
+COALESCED_METHODS = frozenset(m for m in METHOD_TIERS if m not in {"search.messages"})
+# A bucket holds this many seconds of its tier's budget, so short bursts go out at once
+_BURST_SECONDS = 10.0
+_MAX_RETRIES = 3
+_DEFAULT_RETRY_AFTER = 30.0
+
+
+class TierLimiter:
+    """
+    One workspace's Slack request budget: a token bucket per method, refilled at its
+    tier's per-minute rate, and paused for every caller when Slack answers ratelimited.
+    """
+
+    def __init__(self, tier_limits: Optional[Dict[int, int]] = None, method_tiers: Optional[Dict[str, int]] = None):
+        self.tier_limits = tier_limits or TIER_LIMITS
+        self.method_tiers = method_tiers or METHOD_TIERS
+        self._lock = threading.Lock()
+        # method -> [tokens, last refill, paused until]
+        self._buckets: Dict[str, list] = {}
+
+    def _rate(self, method: str) -> float:
+        """Requests per second allowed for method."""
+        return self.tier_limits[self.method_tiers.get(method, DEFAULT_TIER)] / 60.0
+
+    def reserve(self, method: str) -> float:
+        """Book one call to method; returns the seconds to wait before making it."""
+        rate = self._rate(method)
+        capacity = max(1.0, rate * _BURST_SECONDS)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(method, [capacity, now, 0.0])
+            tokens, updated, paused_until = bucket
+            tokens = min(capacity, tokens + (now - updated) * rate) - 1
+            bucket[0], bucket[1] = tokens, now
+        return max(paused_until - now, -tokens / rate if tokens < 0 else 0.0, 0.0)
+
+    def pause(self, method: str, seconds: float) -> None:
+        """Hold every call to method for seconds (Slack's Retry-After)."""
+        until = time.monotonic() + seconds
+        with self._lock:
+            bucket = self._buckets.setdefault(method, [0.0, time.monotonic(), 0.0])
+            bucket[2] = max(bucket[2], until)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds Slack asked us to wait, or None when error is not a rate limit."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    status = getattr(response, "status_code", None)
+    try:
+        ratelimited = response.get("error") == "ratelimited"
+    except Exception:
+        ratelimited = False
+    if status != 429 and not ratelimited:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return _DEFAULT_RETRY_AFTER
+
+
+def _freeze(params: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+
+
+class RateLimitedSlackClient:
+    """
+    Wraps a slack_sdk WebClient: every method call waits for its tier budget, is
+    retried after Retry-After when Slack rate-limits it, and identical read calls
+    already in flight (e.g. concurrent briefs listing the same workspace's channels)
+    share one request. Call methods as on WebClient, e.g. client.conversations_list(limit=1000).
+    """
+
+    def __init__(self, client: Any, limiter: Optional[TierLimiter] = None, max_retries: int = _MAX_RETRIES):
+        self.client = client
+        self.limiter = limiter or TierLimiter()
+        self.max_retries = max_retries
+        self._inflight: Dict[Tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        method = name.replace("_", ".")
+
+        def call(**params):
+            return self.call(method, attr, **params)
+
+        return call
+
+    def call(self, method: str, fn: Callable[..., Any], **params) -> Any:
+        if method not in COALESCED_METHODS:
+            return self._call(method, fn, params)
+        key = (method, _freeze(params))
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = self._call(method, fn, params)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _call(self, method: str, fn: Callable[..., Any], params: Dict[str, Any]) -> Any:
+        for attempt in range(self.max_retries + 1):
+            delay = self.limiter.reserve(method)
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                return fn(**params)
+            except Exception as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempt == self.max_retries:
+                    raise
+                print(f"Slack {method} rate limited; retrying in {retry_after:.0f}s")
+                self.limiter.pause(method, retry_after)
+        raise AssertionError("unreachable")
+
+
+_limiters: Dict[str, TierLimiter] = {}
+_clients: Dict[str, RateLimitedSlackClient] = {}
+_registry_lock = threading.Lock()
+
+
+def limiter_for(token: str) -> TierLimiter:
+    """The request budget shared by every client using this workspace token."""
+    with _registry_lock:
+        limiter = _limiters.get(token)
+        if limiter is None:
+            limiter = _limiters[token] = TierLimiter()
+        return limiter
+
+
+def slack_client(token: str) -> RateLimitedSlackClient:
+    """The process-wide rate-limited WebClient for a workspace token, so concurrent briefs share budgets and in-flight calls."""
+    from slack_sdk import WebClient
+
+    limiter = limiter_for(token)
+    with _registry_lock:
+        client = _clients.get(token)
+        if client is None:
+            client = _clients[token] = RateLimitedSlackClient(WebClient(token=token), limiter)
+        return client
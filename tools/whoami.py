@@ -1,27 +1,93 @@
 from __future__ import annotations
 
-from typing import Any
-
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+import hashlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, MutableMapping, Optional
 
 from config.settings import load_settings
-from agents.oauth_util import get_google_creds_from_tool_context
+from tools.cache import get_cache
 
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
 
-def whoami(tool_context: Any) -> dict:
+# Access tokens last about an hour, so a user's identity is re-checked no more often
+IDENTITY_TTL_SECONDS = 3600
+_CACHE_MAX_BYTES = 1024 * 1024
+# Session state key recording which token the identity in state was resolved for
+IDENTITY_TOKEN_STATE_KEY = "_identity_token"
+
+
+@dataclass(frozen=True)
+class UserIdentity:
+    email: Optional[str]
+    timezone: Optional[str]
+
+
+# Keyed by token fingerprint, so raw tokens are never written to the cache
+_cache = get_cache("identity", IDENTITY_TTL_SECONDS, _CACHE_MAX_BYTES)
+
+
+def token_fingerprint(creds: Any) -> str:
+    """Stable id for the credentials: the refresh token when there is one (it survives access-token refreshes)."""
+    secret = getattr(creds, "refresh_token", None) or getattr(creds, "token", None) or ""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:32]
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def resolve_identity(creds: Credentials,
+                     service_factory: Optional[Callable[[str, str], Any]] = None) -> UserIdentity:
+    """Email (OAuth2 userinfo) and primary-calendar timezone, fetched once per token and cached."""
+    key = token_fingerprint(creds)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    if service_factory is None:
+        from agents.oauth_util import build_google_service
+
+        def service_factory(api: str, version: str):
+            return build_google_service(api, version, creds)
+
+    email = service_factory("oauth2", "v2").userinfo().get().execute().get("email")
+    calendar = service_factory("calendar", "v3").calendarList().get(calendarId="primary").execute()
+    identity = UserIdentity(email=email, timezone=calendar.get("timeZone"))
+
+    _cache.set(key, identity)
+    return identity
+
+
+def session_identity(state: MutableMapping[str, Any], creds: Credentials, email_key: str = "_user_email",
+                     tz_key: Optional[str] = "_user_tz",
+                     service_factory: Optional[Callable[[str, str], Any]] = None) -> UserIdentity:
     """
-    Returns user email and primary calendar timezone using AgentSpace-managed token.
+    Identity for an agent session, written to state under email_key / tz_key.
+
+    While the session's token is unchanged the values already in state are reused
+    without any API call; a new token (another user, or re-authentication) resolves
+    the identity again.
     """
-    settings = load_settings()
-    creds: Credentials = get_google_creds_from_tool_context(tool_context, settings.auth_id)
+    fingerprint = token_fingerprint(creds)
+    if state.get(IDENTITY_TOKEN_STATE_KEY) == fingerprint and state.get(email_key) is not None:
+        return UserIdentity(email=state.get(email_key), timezone=state.get(tz_key) if tz_key else None)
 
-    user_info_service = build("oauth2", "v2", credentials=creds)
-    user_info = user_info_service.userinfo().get().execute()
-    email = user_info.get("email")
+    identity = resolve_identity(creds, service_factory)
+    state[email_key] = identity.email
+    if tz_key:
+        state[tz_key] = identity.timezone
+    state[IDENTITY_TOKEN_STATE_KEY] = fingerprint
+    return identity
 
-    calendar_service = build("calendar", "v3", credentials=creds)
-    calendar_list_entry = calendar_service.calendarList().get(calendarId="primary").execute()
-    user_timezone = calendar_list_entry.get("timeZone")
 
-    return {"email": email, "timezone": user_timezone}
+def whoami(tool_context: Any) -> dict:
+    """
+    Returns user email and primary calendar timezone using AgentSpace-managed token.
+    """
+    from agents.oauth_util import get_google_creds_from_tool_context
+
+    settings = load_settings()
+    creds = get_google_creds_from_tool_context(tool_context, settings.auth_id)
+    identity = session_identity(tool_context.state, creds)
+    return {"email": identity.email, "timezone": identity.timezone}